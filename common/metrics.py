@@ -0,0 +1,251 @@
+import asyncio
+import functools
+import inspect
+import json
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds; wide enough for both a page parse and a slow model call.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+QUANTILES = (0.5, 0.95, 0.99)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class Histogram:
+    """Observation counts per bucket (``le`` upper bounds, as Prometheus histograms have)
+    plus their sum, count and extremes."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate by linear interpolation inside the bucket holding the ``q``-th observation."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.min if i == 0 else max(self.buckets[i - 1], self.min)
+                upper = self.max if i == len(self.buckets) else min(self.buckets[i], self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "count": self.count,
+                "sum": round(self.sum, 6),
+                "min": self.min,
+                "max": self.max,
+                "mean": self.sum / self.count if self.count else None,
+                **{f"p{q * 100:g}": self.quantile(q) for q in QUANTILES},
+            }
+
+
+class Timer:
+    """Times a block, a function or a coroutine function into the ``<name>_seconds`` histogram;
+    a failure is also counted in ``<name>_errors_total`` under the exception's type.
+
+    Use as ``with registry.timer("crawler_fetch", site="roostanet"): ...`` or as a decorator.
+    A decorated function that returns a generator is timed while the generator runs too, so
+    lazy parsers are charged for their work and not for the consumer's.
+    """
+
+    def __init__(self, registry: "Registry", name: str, labels: Dict[str, Any]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.elapsed = 0.0
+        self._started = None
+
+    def record(self, seconds: float, error: Optional[BaseException] = None):
+        self.registry.histogram(f"{self.name}_seconds", **self.labels).observe(seconds)
+        if error is not None and not isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+            self.registry.counter(f"{self.name}_errors_total", error=type(error).__name__, **self.labels).inc()
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.elapsed = time.perf_counter() - self._started
+        self.record(self.elapsed, exc)
+
+    def _timed_generator(self, generator: Iterator, elapsed: float) -> Iterator:
+        error = None
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(generator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - started
+                yield item
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.record(elapsed, error)
+
+    def __call__(self, function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def timed(*args, **kwargs):
+                with self.registry.timer(self.name, **self.labels):
+                    return await function(*args, **kwargs)
+            return timed
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except BaseException as e:
+                self.record(time.perf_counter() - started, e)
+                raise
+            if inspect.isgenerator(result):
+                return self._timed_generator(result, time.perf_counter() - started)
+            self.record(time.perf_counter() - started)
+            return result
+        return timed
+
+
+class Registry:
+    """Named counters and histograms, each series identified by its name and labels.
+
+    Metrics are created on first use, so instrumented code needs no setup; a run ends by
+    writing ``snapshot()`` as JSON or ``prometheus()`` in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], Counter] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Labels]:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def counter(self, name: str, **labels: Any) -> Counter:
+        key = self._key(name, labels)
+        metric = self.counters.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self.counters.setdefault(key, Counter())
+        return metric
+
+    def histogram(self, name: str, buckets: Sequence[float] = LATENCY_BUCKETS, **labels: Any) -> Histogram:
+        key = self._key(name, labels)
+        metric = self.histograms.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self.histograms.setdefault(key, Histogram(buckets))
+        return metric
+
+    def timer(self, name: str, **labels: Any) -> Timer:
+        return Timer(self, name, labels)
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def _sorted(self, metrics: Dict[Tuple[str, Labels], Any]) -> List[Tuple[Tuple[str, Labels], Any]]:
+        with self._lock:
+            return sorted(metrics.items(), key=lambda item: item[0])
+
+    def snapshot(self) -> Dict[str, Any]:
+        """``{"counters": {name: [{"labels": .., "value": ..}]}, "histograms": {name: [...]}}``."""
+        result = {"counters": {}, "histograms": {}}
+        for section, metrics in (("counters", self.counters), ("histograms", self.histograms)):
+            for (name, labels), metric in self._sorted(metrics):
+                value = metric.snapshot()
+                result[section].setdefault(name, []).append(
+                    {"labels": dict(labels), **(value if isinstance(value, dict) else {"value": value})})
+        return result
+
+    def prometheus(self) -> str:
+        lines = []
+        for section, kind in ((self.counters, "counter"), (self.histograms, "histogram")):
+            named = None
+            for (name, labels), metric in self._sorted(section):
+                if name != named:
+                    lines.append(f"# TYPE {name} {kind}")
+                    named = name
+                if kind == "counter":
+                    lines.append(f"{name}{_labels(labels)} {_number(metric.value)}")
+                    continue
+                with metric._lock:
+                    cumulative = 0
+                    for bound, count in zip([f"{bound:g}" for bound in metric.buckets] + ["+Inf"], metric.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(metric.sum)}")
+                    lines.append(f"{name}_count{_labels(labels)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write the snapshot to ``path``: Prometheus text for ``.prom``/``.txt``, JSON otherwise."""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith((".prom", ".txt")):
+                f.write(self.prometheus())
+            else:
+                json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+
+def _number(value: float) -> str:
+    """A sample value at full precision (``:g`` would keep six digits of a byte count)."""
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer() and abs(value) < 2 ** 53):
+        return str(int(value))
+    if math.isinf(value) or math.isnan(value):
+        return {"inf": "+Inf", "-inf": "-Inf"}.get(str(value), "NaN")
+    return repr(float(value))
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+# The process-wide registry the pipeline scripts record into.
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+timer = REGISTRY.timer
@@ -0,0 +1,22 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from metrics import Registry
+
+
+def samples(registry):
+    return dict(line.rsplit(" ", 1) for line in registry.prometheus().splitlines() if not line.startswith("#"))
+
+
+def test_prometheus_keeps_full_precision():
+    registry = Registry()
+    registry.counter("crawler_downloaded_bytes_total", host="example.com").inc(123456789)
+    registry.counter("llm_prompt_tokens_total").inc(9876543210)
+    registry.histogram("llm_request_seconds").observe(1234.56789)
+    values = samples(registry)
+    assert values['crawler_downloaded_bytes_total{host="example.com"}'] == "123456789"
+    assert values["llm_prompt_tokens_total"] == "9876543210"
+    assert values["llm_request_seconds_sum"] == "1234.56789"
+    assert values["llm_request_seconds_count"] == "1"
+    assert values['llm_request_seconds_bucket{le="+Inf"}'] == "1"
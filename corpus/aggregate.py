@@ -0,0 +1,48 @@
+import argparse
+import glob
+import os
+import time
+
+from corpus import Corpus, CorpusWriter
+from jsonstream import iter_records
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output")
+DEFAULT_INPUTS = sorted(path for path in glob.glob(os.path.join(OUTPUT_DIR, "output_*.json"))
+                        if not path.endswith("output_aggregate.json"))
+
+
+def aggregate(inputs, output):
+    """Stream every record of ``inputs`` into the corpus at ``output``; returns the writer's counts."""
+    with CorpusWriter(output) as writer:
+        for path in inputs:
+            for record in iter_records(path):
+                writer.add(record)
+    return writer.written, writer.duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge per-province outputs into a deduplicated JSONL corpus with content-hash ids.")
+    parser.add_argument("inputs", nargs="*", default=DEFAULT_INPUTS,
+                        help="JSON array or JSONL files (default: output/output_<province>.json)")
+    parser.add_argument("--output", default=os.path.join(OUTPUT_DIR, "corpus.jsonl"))
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    written, duplicates = aggregate(args.inputs, args.output)
+    print(f"Aggregated {written + duplicates} records from {len(args.inputs)} files in "
+          f"{time.perf_counter() - started:.2f}s: {written} unique, {duplicates} duplicates dropped")
+    print(f"Corpus: {args.output} ({os.path.getsize(args.output) / 1024:.0f} KiB), "
+          f"index: {args.output}.idx ({os.path.getsize(args.output + '.idx') / 1024:.0f} KiB)")
+
+    # Read the first record back through the id index: a mismatch means the index is unusable.
+    corpus = Corpus(args.output)
+    first = next(iter(corpus), None)
+    mismatch = first is not None and corpus.get(first["id"]) != first
+    corpus.close()
+    if mismatch:
+        raise ValueError(f"{args.output}.idx does not find record {first['id']} where the corpus has it")
+
+
+if __name__ == '__main__':
+    main()
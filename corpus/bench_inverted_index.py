@@ -0,0 +1,86 @@
+"""Build time, size and query latency of the inverted index on a synthetic JSONL corpus.
+
+Records are real aggregate records with their title words, ingredient names and
+locations reshuffled, so term frequencies follow the real corpus.
+
+    python bench_inverted_index.py --records 1000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from inverted_index import DEFAULT_INPUT, InvertedIndex, build_index
+from jsonstream import iter_records
+
+QUERIES = [
+    "contains گوشت چرخ کرده AND province=اردبیل",
+    "contains برنج AND contains زعفران",
+    "province=گیلان AND (occasion=ناهار OR occasion=شام)",
+    "city=تبر* AND NOT title:کباب",
+    "title:آش* AND unit=پیمانه",
+    "کباب",
+    "instructions:زعفران AND NOT contains گوشت",
+    "NOT province=اردبیل",
+]
+
+
+def synthetic_records(templates, count, seed=0):
+    rng = random.Random(seed)
+    title_words = [word for record in templates for word in str(record.get("title") or "").split()]
+    ingredients = [item for record in templates for item in record.get("ingredients") or []]
+    for position in range(count):
+        record = dict(rng.choice(templates))
+        record["id"] = position
+        record["title"] = " ".join(rng.choices(title_words, k=rng.randint(1, 4)))
+        record["location"] = rng.choice(templates).get("location")
+        record["ingredients"] = rng.sample(ingredients, k=min(len(ingredients), rng.randint(3, 15)))
+        yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", default=DEFAULT_INPUT, help="real aggregate the synthetic records come from")
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per query")
+    parser.add_argument("--query", nargs="+", default=QUERIES)
+    args = parser.parse_args()
+
+    templates = list(iter_records(args.templates))
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "corpus.jsonl")
+        with open(source, "w", encoding="utf-8") as f:
+            for record in synthetic_records(templates, args.records):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"{args.records:,} records, {os.path.getsize(source) / 2 ** 20:.1f} MiB JSONL")
+
+        started = time.perf_counter()
+        summary = build_index(source, os.path.join(directory, "corpus.inv"))
+        elapsed = time.perf_counter() - started
+        print(f"build: {elapsed:8.2f}s  {args.records / elapsed:10,.0f} records/s  {summary['terms']:,} terms, "
+              f"{summary['postings']:,} postings, {summary['bytes'] / 2 ** 20:.1f} MiB")
+
+        started = time.perf_counter()
+        index = InvertedIndex(os.path.join(directory, "corpus.inv"))
+        print(f"open:  {(time.perf_counter() - started) * 1e3:8.3f}ms")
+        for query in args.query:
+            found = index.search(query)
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                index.search(query)
+                timings.append((time.perf_counter() - started) * 1e3)
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            print(f"{len(found):>9,} matches  p50 {statistics.median(timings):8.3f}ms  p95 {p95:8.3f}ms  {query}")
+        if len(found):
+            started = time.perf_counter()
+            record = index.record(int(found[0]))
+            print(f"fetch: {(time.perf_counter() - started) * 1e3:8.3f}ms  {record['title']}")
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
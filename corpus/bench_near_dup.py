@@ -0,0 +1,88 @@
+"""Throughput and accuracy of near-duplicate clustering on a synthetic corpus.
+
+Originals are random recipes drawn from the real corpus vocabulary; a share of them get
+copies with a few words replaced, which must land in their original's cluster.
+
+    python bench_near_dup.py --records 1000000
+"""
+import argparse
+import os
+import random
+import time
+import tracemalloc
+from collections import Counter
+
+from jsonstream import iter_records
+from near_dup import NUM_PERM, THRESHOLD, NearDuplicateIndex, recipe_text
+
+DEFAULT_TEMPLATES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output",
+                                 "aggregated_with_id.json")
+
+
+def synthetic_corpus(vocabulary, lengths, count, duplicate_share, edit_rate, seed=0):
+    """``count`` ``(origin, record)`` pairs; copies carry the position of their original."""
+    rng = random.Random(seed)
+    originals = []
+    for position in range(count):
+        if originals and rng.random() < duplicate_share:
+            origin, words = rng.choice(originals)
+            words = [rng.choice(vocabulary) if rng.random() < edit_rate else word for word in words]
+        else:
+            origin, words = position, rng.choices(vocabulary, k=rng.choice(lengths))
+            originals.append((origin, words))
+            if len(originals) > 10000:
+                originals.pop(rng.randrange(len(originals)))
+        yield origin, {"title": " ".join(words[:3]), "instructions": [" ".join(words[3:])]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", default=DEFAULT_TEMPLATES, help="corpus the vocabulary and lengths come from")
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="share of records that copy an earlier one")
+    parser.add_argument("--edit-rate", type=float, default=0.03, help="share of words replaced in a copy")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--num-perm", type=int, default=NUM_PERM)
+    parser.add_argument("--memory", action="store_true", help="trace peak memory (slower)")
+    args = parser.parse_args()
+
+    texts = [recipe_text(record).split() for record in iter_records(args.templates)]
+    vocabulary = sorted({word for words in texts for word in words})
+    lengths = [len(words) for words in texts]
+    print(f"{args.records:,} records, {args.duplicates:.0%} near-copies with {args.edit_rate:.0%} of words "
+          f"replaced; vocabulary {len(vocabulary):,}, mean length {sum(lengths) / len(lengths):.0f} words")
+
+    if args.memory:
+        tracemalloc.start()
+    index = NearDuplicateIndex(args.num_perm, args.threshold)
+    origins = []
+    started = time.perf_counter()
+    for origin, record in synthetic_corpus(vocabulary, lengths, args.records, args.duplicates, args.edit_rate):
+        origins.append(origin)
+        index.add(record)
+    hashed = time.perf_counter()
+    labels = index.clusters()
+    clustered = time.perf_counter()
+    if args.memory:
+        print(f"peak traced memory {tracemalloc.get_traced_memory()[1] / 2 ** 20:.1f} MiB")
+        tracemalloc.stop()
+
+    print(f"signatures: {hashed - started:8.2f}s  {args.records / (hashed - started):10,.0f} records/s "
+          f"(including generation)")
+    print(f"clustering: {clustered - hashed:8.2f}s  {args.records / (clustered - hashed):10,.0f} records/s "
+          f"({index.bands} bands x {index.rows} rows)")
+
+    copies = [(position, origin) for position, origin in enumerate(origins) if origin != position]
+    found = sum(labels[position] == labels[origin] for position, origin in copies)
+    cluster_origins = {}
+    for label, origin in zip(labels.tolist(), origins):
+        cluster_origins.setdefault(label, set()).add(origin)
+    merged = sum(len(found_origins) > 1 for found_origins in cluster_origins.values())
+    sizes = Counter(Counter(labels.tolist()).values())
+    print(f"recall: {found}/{len(copies)} copies clustered with their original "
+          f"({found / max(len(copies), 1):.2%}); clusters mixing distinct originals: {merged}")
+    print(f"{len(cluster_origins):,} clusters; sizes {dict(sorted(sizes.items())[:8])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Size, load time and access latency of the packed corpus against the JSON it replaces.
+
+Records are real aggregate records with titles, ingredients and locations reshuffled (as in
+``bench_inverted_index``); the baselines are the pipeline's ``indent=2`` JSON array, loaded
+whole, and compact JSONL, streamed.
+
+    python bench_packed.py --records 50000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from bench_inverted_index import synthetic_records
+from inverted_index import DEFAULT_INPUT
+from jsonstream import iter_jsonl, iter_records
+from packed import PackedCorpus, pack
+
+
+def timed(label, function, count=None):
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    rate = f"  {count / elapsed:12,.0f} /s" if count else ""
+    print(f"{label:<44} {elapsed * 1e3:10.2f}ms{rate}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", default=DEFAULT_INPUT, help="real aggregate the synthetic records come from")
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=10_000, help="random single-record reads")
+    args = parser.parse_args()
+
+    templates = list(iter_records(args.templates))
+    records = list(synthetic_records(templates, args.records))
+    with tempfile.TemporaryDirectory() as directory:
+        pretty, jsonl, packed = (os.path.join(directory, name) for name in ("corpus.json", "corpus.jsonl", "corpus.rpk"))
+        with open(pretty, "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+        with open(jsonl, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        timed("pack", lambda: pack(records, packed), args.records)
+        sizes = {path: os.path.getsize(path) for path in (pretty, jsonl, packed)}
+        print(f"{args.records:,} records: JSON {sizes[pretty] / 2 ** 20:.1f} MiB, JSONL {sizes[jsonl] / 2 ** 20:.1f} MiB, "
+              f"packed {sizes[packed] / 2 ** 20:.1f} MiB ({sizes[pretty] / sizes[packed]:.1f}x / "
+              f"{sizes[jsonl] / sizes[packed]:.1f}x smaller)")
+        del records
+
+        def load_json():
+            with open(pretty, encoding="utf-8") as f:
+                return json.load(f)
+
+        loaded = timed("load: json.load of the JSON array", load_json)
+        corpus = timed("load: open the packed corpus", lambda: PackedCorpus(packed))
+        assert corpus[len(corpus) - 1] == loaded[-1] and len(corpus) == len(loaded)
+        del loaded
+
+        positions = random.Random(0).choices(range(len(corpus)), k=args.lookups)
+        timed("random record reads", lambda: [corpus[i] for i in positions], args.lookups)
+        timed("random field reads (location.province)",
+              lambda: [corpus.field(i, "location.province") for i in positions], args.lookups)
+        timed("column scan: ingredients[].unit, packed", lambda: sum(1 for _ in corpus.column("ingredients[].unit")),
+              args.records)
+        timed("column scan: ingredients[].unit, JSONL",
+              lambda: sum(1 for record in iter_jsonl(jsonl) for _ in record["ingredients"]), args.records)
+        timed("full scan: every record, packed", lambda: sum(1 for _ in corpus), args.records)
+        timed("full scan: every record, JSONL", lambda: sum(1 for _ in iter_jsonl(jsonl)), args.records)
+        corpus.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import mmap
+import os
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from jsonstream import iter_jsonl
+from offset_index import OffsetIndex
+
+Record = Dict[str, Any]
+
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def content_id(record: Record) -> int:
+    """64-bit id derived from the record's content (ignoring any existing ``id``), so the same
+    recipe gets the same id on every run and identical recipes from different sources collide."""
+    return _content(record)[0]
+
+
+def _content(record: Record) -> Tuple[int, str]:
+    content = canonical_json({key: value for key, value in record.items() if key != "id"})
+    return int.from_bytes(hashlib.sha256(content.encode("utf-8")).digest()[:8], "big"), content
+
+
+def format_id(record_id: int) -> str:
+    return f"{record_id:016x}"
+
+
+class CorpusWriter:
+    """Writes a newline-delimited corpus plus its ``.idx`` offset index, skipping duplicates.
+
+    Records are stored as canonical JSON (sorted keys, no spaces) so reruns are byte-identical.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.written = 0
+        self.duplicates = 0
+        for stale in (path, path + ".idx"):
+            if os.path.exists(stale):
+                os.remove(stale)
+        self._out = open(path, "wb")
+        self._index = OffsetIndex(path + ".idx", writable=True)
+
+    def add(self, record: Record) -> Tuple[str, bool]:
+        """Append ``record`` under its content id unless an identical one is already in;
+        returns the id and whether it was written."""
+        record_id, content = _content(record)
+        if self._index.get(record_id) is not None:
+            self.duplicates += 1
+            return format_id(record_id), False
+        # The canonical form doubles as the stored line, with the id spliced in as first key.
+        separator = "," if content != "{}" else ""
+        line = f'{{"id":"{format_id(record_id)}"{separator}{content[1:]}\n'.encode("utf-8")
+        self._index.put(record_id, self._out.tell(), len(line))
+        self._out.write(line)
+        self.written += 1
+        return format_id(record_id), True
+
+    def close(self):
+        self._out.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Corpus:
+    """Read side of a corpus written by ``CorpusWriter``: streaming iteration and lookup by id."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._index = OffsetIndex(path + ".idx")
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b""
+
+    def get(self, record_id: str) -> Optional[Record]:
+        location = self._index.get(int(record_id, 16))
+        if location is None:
+            return None
+        offset, length = location
+        return json.loads(self._map[offset:offset + length])
+
+    def __iter__(self) -> Iterator[Record]:
+        return iter_jsonl(self.path)
+
+    def __len__(self):
+        return len(self._index)
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+        self._index.close()
@@ -0,0 +1,391 @@
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "llm"))
+from jsonstream import _unwrap, is_json_array, iter_json_array
+from persian import ZWNJ, normalize
+
+DEFAULT_INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output", "aggregated_with_id.json")
+
+MAGIC = b"RINV1\0\0\0"
+HEADER = struct.Struct("<8sIIQQQQI")  # magic, docs, terms, term table, postings, doc table, strings, source length
+TERM = struct.Struct("<IHQI")  # key offset and length in the strings, postings offset, posting count
+DOC = struct.Struct("<qQIII")  # record id (-1 if none), source offset, source length, title offset and length
+SEPARATOR = "\x1f"  # between field and term in a key; sorts below every printable character
+
+# Keyword fields match whole normalized values; text fields match words.
+KEYWORD_FIELDS = {
+    "province": ("location", "province"),
+    "city": ("location", "city"),
+    "meal_type": ("meal_type",),
+    "occasion": ("occasion",),
+    "unit": ("ingredients", "unit"),
+}
+TEXT_FIELDS = ("title", "ingredient", "instructions")
+# Ingredient postings hold ``doc << 8 | ingredient position`` so several words can be
+# required to appear in the same ingredient line; later lines share the last slot.
+SLOT_BITS = 8
+MAX_DOCS = 1 << (32 - SLOT_BITS)
+
+
+WORD = re.compile(r"\w+")
+QUERY_WORD = re.compile(r"\w+\*?")
+MAX_CACHED_WORDS = 1 << 20
+
+
+def normalize_term(text: Any) -> str:
+    """Index form of a value: Persian letters and ASCII digits, ZWNJ as space, lower case."""
+    return normalize(str(text)).lower() if text is not None else ""
+
+
+def query_words(text: str) -> List[str]:
+    """Normalized words of a query clause; a trailing ``*`` marks a prefix."""
+    return QUERY_WORD.findall(normalize_term(text))
+
+
+def _values(record: Dict[str, Any], path: Tuple[str, ...]) -> List[Any]:
+    values = [record]
+    for key in path:
+        found = []
+        for value in values:
+            child = value.get(key) if isinstance(value, dict) else None
+            found.extend(child if isinstance(child, list) else [] if child is None else [child])
+        values = found
+    return values
+
+
+class Tokenizer:
+    """Index terms of records.
+
+    Normalization works character by character, so each distinct raw word is normalized
+    once and remembered; recipe vocabularies are small next to the corpus, and this is
+    where index building spends most of its time otherwise.
+    """
+
+    def __init__(self, max_words: int = MAX_CACHED_WORDS):
+        self.max_words = max_words
+        self._words: Dict[str, List[str]] = {}
+        self._keywords: Dict[Any, str] = {}
+
+    def words(self, text: Any) -> List[str]:
+        found = []
+        for raw in str(text).replace(ZWNJ, " ").split():
+            cached = self._words.get(raw)
+            if cached is None:
+                if len(self._words) >= self.max_words:
+                    self._words.clear()
+                cached = self._words[raw] = WORD.findall(normalize_term(raw))
+            found.extend(cached)
+        return found
+
+    def keyword(self, value: Any) -> str:
+        cached = self._keywords.get(value) if isinstance(value, (str, int, float)) else None
+        if cached is None:
+            cached = normalize_term(value)
+            if isinstance(value, (str, int, float)) and len(self._keywords) < self.max_words:
+                self._keywords[value] = cached
+        return cached
+
+    def document_terms(self, record: Dict[str, Any]) -> Tuple[set, Dict[str, set]]:
+        """Doc-level keys of a record, and ingredient keys by ingredient position."""
+        keys = set()
+        for field, path in KEYWORD_FIELDS.items():
+            keys.update(f"{field}{SEPARATOR}{term}" for term in map(self.keyword, _values(record, path)) if term)
+        keys.update(f"title{SEPARATOR}{word}" for word in self.words(record.get("title") or ""))
+        for step in _values(record, ("instructions",)):
+            keys.update(f"instructions{SEPARATOR}{word}" for word in self.words(step))
+        ingredients = {}
+        for position, name in enumerate(_values(record, ("ingredients", "name"))):
+            for word in self.words(name):
+                ingredients.setdefault(f"ingredient{SEPARATOR}{word}", set()).add(min(position, (1 << SLOT_BITS) - 1))
+        return keys, ingredients
+
+
+def iter_located(path: str) -> Iterable[Tuple[Dict[str, Any], int, int]]:
+    """Records of ``path`` with their byte offset and length when the file is JSONL (else 0, 0)."""
+    if is_json_array(path):
+        for record in iter_json_array(path):
+            yield _unwrap(record), 0, 0
+        return
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                yield _unwrap(json.loads(line)), offset, len(line)
+            offset += len(line)
+
+
+def build_index(source: str, output: str) -> Dict[str, int]:
+    """Write the inverted index of ``source`` (JSON array or JSONL) to ``output``.
+
+    Postings are sorted ``uint32`` arrays laid out back to back, so a reader can map them
+    straight into NumPy without decoding; the term table is sorted by key for binary and
+    prefix search. Records of a JSONL source can be fetched by their stored byte range.
+    """
+    tokenizer = Tokenizer()
+    postings: Dict[str, array] = {}
+    docs = array("q")
+    titles = []
+    for doc, (record, offset, length) in enumerate(iter_located(source)):
+        if doc >= MAX_DOCS:
+            raise ValueError(f"{source} has more than {MAX_DOCS} records")
+        keys, ingredients = tokenizer.document_terms(record)
+        for key in keys:
+            postings.setdefault(key, array("I")).append(doc)
+        for key, positions in ingredients.items():
+            postings.setdefault(key, array("I")).extend(sorted(doc << SLOT_BITS | p for p in positions))
+        record_id = record.get("id")
+        docs.extend((record_id if isinstance(record_id, int) else -1, offset, length))
+        titles.append(str(record.get("title") or ""))
+
+    strings = bytearray(os.path.abspath(source).encode("utf-8"))
+    source_length = len(strings)
+    terms = sorted((key.encode("utf-8"), key) for key in postings)
+    term_table = bytearray()
+    postings_blob = bytearray()
+    for encoded, key in terms:
+        term_table += TERM.pack(len(strings), len(encoded), len(postings_blob), len(postings[key]))
+        strings += encoded
+        postings_blob += postings[key].tobytes()
+    doc_table = bytearray()
+    for doc, title in enumerate(titles):
+        encoded = title.encode("utf-8")
+        doc_table += DOC.pack(docs[3 * doc], docs[3 * doc + 1], docs[3 * doc + 2], len(strings), len(encoded))
+        strings += encoded
+
+    term_start = HEADER.size
+    postings_start = term_start + len(term_table)
+    docs_start = postings_start + len(postings_blob)
+    strings_start = docs_start + len(doc_table)
+    with open(output, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(titles), len(terms), term_start, postings_start, docs_start,
+                            strings_start, source_length))
+        for section in (term_table, postings_blob, doc_table, strings):
+            f.write(section)
+    return {"docs": len(titles), "terms": len(terms), "postings": len(postings_blob) // 4,
+            "bytes": os.path.getsize(output)}
+
+
+class QueryError(ValueError):
+    pass
+
+
+class InvertedIndex:
+    """Memory-mapped reader of an index written by ``build_index``.
+
+    Opening only reads the header; a query binary-searches the term table and intersects
+    or unions posting arrays viewed directly in the map. Query syntax::
+
+        contains گوشت چرخ کرده AND province=اردبیل
+        (meal_type=شام OR occasion=مهمانی) AND NOT title:کباب
+        city=تبر* AND instructions:زعفران
+
+    ``contains`` requires all its words in one ingredient name, ``field=value`` matches a
+    whole keyword value (province, city, meal_type, occasion, unit), ``field:words`` matches
+    words of title, ingredient or instructions, and bare words match any text field. A
+    trailing ``*`` turns a word or value into a prefix. ``AND`` binds tighter than ``OR``;
+    ``NOT`` and parentheses work as usual.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.docs, self.terms, self._term_start, self._postings_start, self._docs_start,
+         self._strings_start, source_length) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a recipe inverted index")
+        self.source = self._string(0, source_length)
+        self._all = None
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_start + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def _key(self, position: int) -> bytes:
+        offset, length, _, _ = TERM.unpack_from(self._map, self._term_start + position * TERM.size)
+        start = self._strings_start + offset
+        return self._map[start:start + length]
+
+    def _bisect(self, key: bytes) -> int:
+        low, high = 0, self.terms
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _postings(self, position: int) -> np.ndarray:
+        _, _, offset, count = TERM.unpack_from(self._map, self._term_start + position * TERM.size)
+        return np.frombuffer(self._map, dtype=np.uint32, count=count, offset=self._postings_start + offset)
+
+    def postings(self, field: str, term: str) -> np.ndarray:
+        """Sorted postings of ``term`` in ``field``; a trailing ``*`` unions every term with that prefix."""
+        prefix = term.endswith("*")
+        key = f"{field}{SEPARATOR}{term.rstrip('*')}".encode("utf-8")
+        start = self._bisect(key)
+        if not prefix:
+            found = start < self.terms and self._key(start) == key
+            return self._postings(start) if found else np.empty(0, dtype=np.uint32)
+        end = self._bisect(key + b"\xff")
+        if end - start == 1:
+            return self._postings(start)
+        return np.unique(np.concatenate([self._postings(p) for p in range(start, end)] or [np.empty(0, np.uint32)]))
+
+    def _words(self, field: str, terms: List[str]) -> np.ndarray:
+        """Docs whose ``field`` has every term (all in one ingredient line for ``ingredient``)."""
+        result = None
+        for word in terms:
+            found = self.postings(field, word)
+            result = found if result is None else np.intersect1d(result, found, assume_unique=True)
+        if result is None or field != "ingredient":
+            return np.empty(0, dtype=np.uint32) if result is None else result
+        # Slots are sorted, so a document's slots are adjacent once shifted away.
+        docs = result >> SLOT_BITS
+        return docs[np.concatenate(([True], docs[1:] != docs[:-1]))] if len(docs) else docs
+
+    def _any_text(self, word: str) -> np.ndarray:
+        found = [self._words(field, [word]) for field in TEXT_FIELDS]
+        return np.unique(np.concatenate(found))
+
+    def _clause(self, tokens: List[str]) -> np.ndarray:
+        head, rest = tokens[0], " ".join(tokens[1:])
+        if head.lower() == "contains":
+            terms = query_words(rest)
+            if not terms:
+                raise QueryError("'contains' needs at least one word")
+            return self._words("ingredient", terms)
+        field, equals, value = head.partition("=")
+        if equals:
+            if field not in KEYWORD_FIELDS:
+                raise QueryError(f"Unknown keyword field '{field}'; expected one of {sorted(KEYWORD_FIELDS)}")
+            return self.postings(field, normalize_term(f"{value} {rest}"))
+        field, colon, value = head.partition(":")
+        if colon:
+            if field not in TEXT_FIELDS:
+                raise QueryError(f"Unknown text field '{field}'; expected one of {list(TEXT_FIELDS)}")
+            return self._words(field, query_words(f"{value} {rest}"))
+        terms = query_words(" ".join(tokens))
+        if not terms:
+            raise QueryError(f"No words in '{' '.join(tokens)}'")
+        result = self._any_text(terms[0])
+        for word in terms[1:]:
+            result = np.intersect1d(result, self._any_text(word), assume_unique=True)
+        return result
+
+    def all_docs(self) -> np.ndarray:
+        if self._all is None:
+            self._all = np.arange(self.docs, dtype=np.uint32)
+        return self._all
+
+    def search(self, query: str) -> np.ndarray:
+        """Sorted document numbers matching ``query``."""
+        tokens = re.findall(r"\(|\)|[^\s()]+", query)
+        result, position = self._or(tokens, 0)
+        if position != len(tokens):
+            raise QueryError(f"Unexpected '{tokens[position]}' in query")
+        return result
+
+    def _or(self, tokens: List[str], position: int) -> Tuple[np.ndarray, int]:
+        result, position = self._and(tokens, position)
+        while position < len(tokens) and tokens[position] == "OR":
+            other, position = self._and(tokens, position + 1)
+            result = np.union1d(result, other)
+        return result, position
+
+    def _and(self, tokens: List[str], position: int) -> Tuple[np.ndarray, int]:
+        result, position = self._not(tokens, position)
+        while position < len(tokens) and tokens[position] == "AND":
+            other, position = self._not(tokens, position + 1)
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result, position
+
+    def _not(self, tokens: List[str], position: int) -> Tuple[np.ndarray, int]:
+        if position >= len(tokens):
+            raise QueryError("Query ends where a term was expected")
+        if tokens[position] == "NOT":
+            result, position = self._not(tokens, position + 1)
+            return np.setdiff1d(self.all_docs(), result, assume_unique=True), position
+        if tokens[position] == "(":
+            result, position = self._or(tokens, position + 1)
+            if position >= len(tokens) or tokens[position] != ")":
+                raise QueryError("Missing ')'")
+            return result, position + 1
+        end = position
+        while end < len(tokens) and tokens[end] not in ("AND", "OR", "NOT", "(", ")"):
+            end += 1
+        if end == position:
+            raise QueryError(f"Unexpected '{tokens[position]}' in query")
+        return self._clause(tokens[position:end]), end
+
+    def doc(self, doc: int) -> Dict[str, Any]:
+        """The stored id and title of a document, without touching the source."""
+        record_id, _, _, title_offset, title_length = DOC.unpack_from(self._map, self._docs_start + doc * DOC.size)
+        return {"doc": doc, "id": None if record_id < 0 else record_id, "title": self._string(title_offset, title_length)}
+
+    def record(self, doc: int) -> Optional[Dict[str, Any]]:
+        """The full record, read from its byte range in a JSONL source (None for a JSON array source)."""
+        _, offset, length, _, _ = DOC.unpack_from(self._map, self._docs_start + doc * DOC.size)
+        if not length:
+            return None
+        with open(self.source, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def close(self):
+        # Query results may still be views into the map; it is unmapped once the last goes away.
+        self._map = None
+        self._all = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query an inverted index over the recipe aggregate.")
+    parser.add_argument("query", nargs="?", help="query to run; without one the index is (re)built")
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="JSON array or JSONL aggregate to index")
+    parser.add_argument("--index", default=None, help="index file (default: <input>.inv)")
+    parser.add_argument("--limit", type=int, default=20, help="matches to print")
+    parser.add_argument("--records", action="store_true", help="print whole records (JSONL sources only)")
+    args = parser.parse_args()
+    index_path = args.index or args.input + ".inv"
+
+    if args.query is None:
+        started = time.perf_counter()
+        summary = build_index(args.input, index_path)
+        print(f"Indexed {summary['docs']} records ({summary['terms']} terms, {summary['postings']} postings) "
+              f"in {time.perf_counter() - started:.2f}s: {index_path} ({summary['bytes'] / 1024:.0f} KiB)")
+        return
+
+    with InvertedIndex(index_path) as index:
+        started = time.perf_counter()
+        try:
+            docs = index.search(args.query)
+        except QueryError as e:
+            parser.error(str(e))
+        elapsed = time.perf_counter() - started
+        print(f"{len(docs)} matches in {elapsed * 1e3:.2f}ms")
+        for doc in docs[:args.limit].tolist():
+            record = index.record(doc) if args.records else None
+            print(json.dumps(record or index.doc(doc), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from packed import PackedCorpus, is_packed
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = " \t\r\n"
+
+
+def iter_json_array(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array one at a time, reading ``chunk_size``
+    characters at a time, so memory stays bounded by the largest single element."""
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer = f.read(chunk_size).lstrip(WHITESPACE)
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} does not contain a JSON array")
+        buffer = buffer[1:]
+        eof = False
+        expect_value = True
+        after_comma = False
+        while True:
+            buffer = buffer.lstrip(WHITESPACE)
+            if buffer.startswith("]"):
+                if after_comma:
+                    raise ValueError(f"{path}: trailing ',' before ']'")
+                return
+            if not expect_value and buffer.startswith(","):
+                buffer = buffer[1:].lstrip(WHITESPACE)
+                expect_value = after_comma = True
+            if expect_value and buffer:
+                try:
+                    value, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # A number cut at the chunk boundary decodes too early; wait for its end.
+                    if end < len(buffer) or eof:
+                        yield value
+                        buffer = buffer[end:]
+                        expect_value = after_comma = False
+                        continue
+            elif buffer and not buffer.startswith(","):
+                raise ValueError(f"{path}: expected ',' or ']' but found {buffer[:20]!r}")
+            if eof:
+                raise ValueError(f"{path}: unterminated JSON array")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+
+
+def iter_jsonl(path: str, start: int = 0, end: Optional[int] = None) -> Iterator[Any]:
+    """Yield the JSON lines of ``path`` that start within the byte range ``[start, end)``.
+
+    Ranges that cut through a line leave it to the range its first byte falls in, so
+    consecutive ranges together yield every line exactly once.
+    """
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()  # finish the line the previous range started
+        while end is None or f.tell() < end:
+            line = f.readline()
+            if not line:
+                return
+            if line.strip():
+                yield json.loads(line)
+
+
+def jsonl_ranges(path: str, parts: int) -> List[Tuple[int, int]]:
+    """Split ``path`` into up to ``parts`` byte ranges of about equal size for ``iter_jsonl``."""
+    size = os.path.getsize(path)
+    step = max(-(-size // max(parts, 1)), 1)
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def is_json_array(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(CHUNK_SIZE).lstrip(WHITESPACE.encode()).startswith(b"[")
+
+
+def _unwrap(value: Any) -> Any:
+    """Lines written by the LLM stage's checkpointed ``--jsonl`` mode, ``{"index": ..,
+    "record": ..}``, are unwrapped to their record."""
+    if isinstance(value, dict) and value.keys() == {"index", "record"}:
+        return value["record"]
+    return value
+
+
+def iter_records(path: str, start: int = 0, end: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Stream the records of a JSON array, JSONL or packed file; a byte range selects part of
+    a JSONL or packed file and is ignored for a JSON array, which can only be read whole."""
+    if is_packed(path):
+        with PackedCorpus(path) as corpus:
+            yield from corpus.iter_range(start, end)
+        return
+    values = iter_json_array(path) if is_json_array(path) else iter_jsonl(path, start, end)
+    for value in values:
+        yield _unwrap(value)
@@ -0,0 +1,341 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import zlib
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "llm"))
+from jsonstream import iter_records
+from persian import ZWNJ, normalize
+
+CRAWLER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "crawler")
+DEFAULT_INPUTS = sorted(path for site in ("ghazaland", "roostanet", "wiki_book")
+                        for path in glob.glob(os.path.join(CRAWLER_DIR, site, "*_recipes.json")))
+
+MAX_HASH = np.uint64((1 << 32) - 1)
+SHINGLE_WORDS = 3
+MAX_CACHED_WORDS = 1 << 20
+NUM_PERM = 128
+THRESHOLD = 0.7
+FALSE_NEGATIVE_WEIGHT = 0.9
+# Buckets up to this size have all their pairs verified; larger ones are split in leader rounds.
+PAIRWISE_BUCKET = 32
+
+
+def recipe_text(record: Dict[str, Any]) -> str:
+    """Title, ingredients and instructions of a crawled or transformed recipe as one string."""
+    parts = [record.get("title") or record.get("name") or ""]
+    for field in ("ingredients", "instructions"):
+        values = record.get(field) or []
+        for value in [values] if isinstance(values, str) else values:
+            if isinstance(value, dict):
+                parts.extend(str(part) for part in value.values() if part is not None)
+            else:
+                parts.append(str(value))
+    return " ".join(parts)
+
+
+class Shingler:
+    """Hashes of the distinct word ``k``-grams of a text, after Persian normalization.
+
+    Each distinct raw word is normalized and hashed once and remembered, since recipe
+    vocabularies are small next to the corpus; the ``k``-gram hashes are then combined from
+    the word hashes with array arithmetic instead of building ``k``-gram strings.
+    """
+
+    def __init__(self, k: int = SHINGLE_WORDS, max_words: int = MAX_CACHED_WORDS):
+        self.k = k
+        self.max_words = max_words
+        self._words: Dict[str, int] = {}
+        self._mixers = np.random.RandomState(3).randint(1, 1 << 62, size=k, dtype=np.uint64) | np.uint64(1)
+
+    def word_hash(self, word: str) -> int:
+        cached = self._words.get(word)
+        if cached is None:
+            if len(self._words) >= self.max_words:
+                self._words.clear()
+            normalized = normalize(word)
+            cached = self._words[word] = zlib.crc32(normalized.encode("utf-8")) if normalized else -1
+        return cached
+
+    def __call__(self, text: str) -> np.ndarray:
+        words = np.array([h for h in map(self.word_hash, text.replace(ZWNJ, " ").split()) if h >= 0], dtype=np.uint64)
+        if not len(words):
+            return words
+        span = min(self.k, len(words))
+        grams = np.zeros(len(words) - span + 1, dtype=np.uint64)
+        for offset in range(span):
+            grams = grams + words[offset:len(words) - span + 1 + offset] * self._mixers[offset]
+        return np.unique(grams >> np.uint64(32))
+
+
+class MinHasher:
+    """MinHash signatures under ``num_perm`` random multiply-shift hash functions
+    ``(a * x + b) >> 32`` over 32-bit shingle hashes.
+
+    The fraction of equal positions in two signatures estimates the Jaccard similarity of
+    the shingle sets they came from. Parameters derive from ``seed`` only, so signatures
+    computed in different runs or processes are comparable.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        if not len(hashes):
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        permuted = (np.multiply.outer(hashes, self.a) + self.b) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+def lsh_parameters(num_perm: int, threshold: float,
+                   false_negative_weight: float = FALSE_NEGATIVE_WEIGHT) -> Tuple[int, int]:
+    """Bands and rows per band whose S-curve ``1 - (1 - s^r)^b`` best separates pairs above
+    ``threshold`` from pairs below it, minimizing the weighted false-positive plus
+    false-negative areas. Candidates are verified on the full signature afterwards, so
+    missed pairs cost more than extra candidates and are weighted accordingly."""
+    similarities = np.linspace(0, 1, 201)
+    below = similarities < threshold
+    best, best_error = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        probability = 1 - (1 - similarities ** rows) ** bands
+        error = ((1 - false_negative_weight) * probability[below].sum()
+                 + false_negative_weight * (1 - probability[~below]).sum())
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class DisjointSets:
+    def __init__(self, size: int):
+        self.parent = np.arange(size)
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+    def labels(self) -> np.ndarray:
+        """Root of every item, by pointer jumping over the whole parent array at once."""
+        while True:
+            grandparents = self.parent[self.parent]
+            if (grandparents == self.parent).all():
+                return self.parent
+            self.parent = grandparents
+
+
+def _verified(signatures: np.ndarray, left: np.ndarray, right: np.ndarray,
+              threshold: float) -> Iterator[Tuple[int, int]]:
+    similar = (signatures[left] == signatures[right]).mean(axis=1) >= threshold
+    return zip(left[similar].tolist(), right[similar].tolist())
+
+
+def near_duplicate_pairs(signatures: np.ndarray, bands: int, rows: int, threshold: float,
+                         pairwise_bucket: int = PAIRWISE_BUCKET) -> Iterator[Tuple[int, int]]:
+    """Pairs of rows of ``signatures`` whose estimated similarity reaches ``threshold``.
+
+    Each band's rows are hashed to one 64-bit key per record and the keys sorted, so the
+    records of a bucket are contiguous. Buckets of up to ``pairwise_bucket`` records, nearly
+    all of them, have every pair compared, a step of one offset at a time over all buckets;
+    a candidate that falls below the threshold cannot hide the true pairs around it. Larger
+    buckets are split in leader rounds: each remaining record is compared with the first
+    one, its matches are joined to it, and the rest go on to the next round. There a pair
+    whose members disagree about an earlier leader can be missed in this band.
+    """
+    mixers = np.random.RandomState(2).randint(1, 1 << 62, size=rows, dtype=np.uint64) | np.uint64(1)
+    for band in range(bands):
+        keys = np.zeros(len(signatures), dtype=np.uint64)
+        for row in range(rows):
+            keys = keys * mixers[row] + signatures[:, band * rows + row]
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        sizes = np.diff(np.r_[starts, len(order)])
+
+        small = (sizes > 1) & (sizes <= pairwise_bucket)
+        if small.any():
+            small_starts, small_sizes = starts[small], sizes[small]
+            offsets = np.arange(small_sizes.sum()) - np.repeat(np.cumsum(small_sizes) - small_sizes, small_sizes)
+            members = order[np.repeat(small_starts, small_sizes) + offsets]
+            bucket = np.repeat(np.arange(len(small_sizes)), small_sizes)
+            for step in range(1, int(small_sizes.max())):
+                same = bucket[step:] == bucket[:-step]
+                yield from _verified(signatures, members[:-step][same], members[step:][same], threshold)
+
+        for start, size in zip(starts[sizes > pairwise_bucket].tolist(), sizes[sizes > pairwise_bucket].tolist()):
+            remaining = order[start:start + size]
+            while len(remaining) > 1:
+                leader, rest = remaining[0], remaining[1:]
+                similar = (signatures[rest] == signatures[leader]).mean(axis=1) >= threshold
+                yield from ((int(leader), member) for member in rest[similar].tolist())
+                remaining = rest[~similar]
+
+
+class NearDuplicateIndex:
+    """Streams records into MinHash signatures and clusters the near-duplicates among them.
+
+    Only the signature (``4 * num_perm`` bytes) and shingle count of each record are kept,
+    so millions of records fit in memory; records themselves are read again to write output.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, threshold: float = THRESHOLD, seed: int = 1):
+        self.shingler = Shingler()
+        self.hasher = MinHasher(num_perm, seed)
+        self.threshold = threshold
+        self.bands, self.rows = lsh_parameters(num_perm, threshold)
+        self._signatures = array("I")
+        self._sizes = array("i")
+
+    def add(self, record: Dict[str, Any]):
+        hashes = self.shingler(recipe_text(record))
+        self._signatures.frombytes(self.hasher.signature(hashes).tobytes())
+        self._sizes.append(len(hashes))
+
+    def add_all(self, records: Iterable[Dict[str, Any]]) -> "NearDuplicateIndex":
+        for record in records:
+            self.add(record)
+        return self
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def clusters(self) -> np.ndarray:
+        """Cluster label of every record: the position of the cluster's canonical record,
+        the one with the most shingles (earliest on ties)."""
+        signatures = np.frombuffer(self._signatures, dtype=np.uint32).reshape(-1, self.hasher.num_perm)
+        sets = DisjointSets(len(signatures))
+        for a, b in near_duplicate_pairs(signatures, self.bands, self.rows, self.threshold):
+            sets.union(a, b)
+        roots = sets.labels()
+        sizes = np.frombuffer(self._sizes, dtype=np.int32)
+        # Sort by root, then most shingles first, then position: the first of each root wins.
+        order = np.lexsort((np.arange(len(roots)), -sizes, roots))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = roots[order[1:]] != roots[order[:-1]]
+        canonical = np.empty(len(roots), dtype=np.int64)
+        canonical[roots[order[first]]] = order[first]
+        return canonical[roots]
+
+
+def cluster_summary(labels: np.ndarray, sources: List[str]) -> Dict[str, Any]:
+    members = Counter(labels.tolist())
+    sizes = Counter(size for size in members.values() if size > 1)
+    sites: Dict[int, set] = {}
+    for label, source in zip(labels.tolist(), sources):
+        if members[label] > 1:
+            sites.setdefault(label, set()).add(source)
+    cross_site = Counter(len(names) for names in sites.values())
+    return {
+        "records": len(labels),
+        "clusters": len(members),
+        "duplicates_dropped": len(labels) - len(members),
+        "cluster_sizes": dict(sorted(sizes.items())),
+        "clusters_by_site_count": dict(sorted(cross_site.items())),
+    }
+
+
+def iter_inputs(paths: List[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for path in paths:
+        for record in iter_records(path):
+            yield path, record
+
+
+def source_site(path: str) -> str:
+    return os.path.basename(os.path.dirname(os.path.abspath(path)))
+
+
+def write_records(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Write ``records`` as JSONL when ``path`` ends in ``.jsonl``, else as a JSON array, one at a time."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        jsonl = path.endswith(".jsonl")
+        f.write("" if jsonl else "[")
+        for record in records:
+            line = json.dumps(record, ensure_ascii=False)
+            f.write(line + "\n" if jsonl else ("," if count else "") + "\n  " + line)
+            count += 1
+        f.write("" if jsonl else "\n]\n")
+    return count
+
+
+def deduplicate(inputs: List[str], output: str, clusters_file: Optional[str] = None,
+                num_perm: int = NUM_PERM, threshold: float = THRESHOLD) -> Dict[str, Any]:
+    """Write one canonical record per near-duplicate cluster of ``inputs`` to ``output``.
+
+    Two passes over the inputs: signatures first, then the records again to write the
+    canonical ones (and, with ``clusters_file``, every multi-record cluster's members).
+    """
+    started = time.perf_counter()
+    index = NearDuplicateIndex(num_perm, threshold)
+    sources = []
+    for path, record in iter_inputs(inputs):
+        index.add(record)
+        sources.append(source_site(path))
+    hashed = time.perf_counter()
+    labels = index.clusters()
+    clustered = time.perf_counter()
+
+    counts = Counter(labels.tolist())
+    members: Dict[int, List[Dict[str, Any]]] = {}
+
+    def canonical_records():
+        for position, (path, record) in enumerate(iter_inputs(inputs)):
+            label = int(labels[position])
+            if clusters_file and counts[label] > 1:
+                members.setdefault(label, []).append({
+                    "file": os.path.relpath(path), "position": position,
+                    "title": record.get("title") or record.get("name"),
+                    "url": record.get("url") or record.get("source"), "canonical": label == position})
+            if label == position:
+                yield record
+
+    written = write_records(output, canonical_records())
+    if clusters_file:
+        with open(clusters_file, "w", encoding="utf-8") as f:
+            json.dump(list(members.values()), f, ensure_ascii=False, indent=2)
+
+    summary = cluster_summary(labels, sources)
+    summary.update(written=written, bands=index.bands, rows=index.rows,
+                   signature_seconds=round(hashed - started, 3), cluster_seconds=round(clustered - hashed, 3))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drop near-duplicate recipes across crawler outputs before the "
+                                                 "LLM step, keeping one canonical record per cluster.")
+    parser.add_argument("inputs", nargs="*", default=DEFAULT_INPUTS,
+                        help="JSON array or JSONL files (default: crawler/<site>/*_recipes.json)")
+    parser.add_argument("--output", default="deduplicated_recipes.json", help="JSON array, or JSONL if .jsonl")
+    parser.add_argument("--clusters", default=None, help="write the members of every duplicate cluster here")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="estimated Jaccard similarity")
+    parser.add_argument("--num-perm", type=int, default=NUM_PERM, help="MinHash signature length")
+    args = parser.parse_args()
+    if not args.inputs:
+        parser.error("no inputs given and no crawler outputs found")
+
+    summary = deduplicate(args.inputs, args.output, args.clusters, args.num_perm, args.threshold)
+    print(f"{summary['records']} records -> {summary['written']} canonical in {args.output} "
+          f"({summary['duplicates_dropped']} near-duplicates dropped)")
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import mmap
+import os
+import struct
+from typing import Iterator, Optional, Tuple
+
+MAGIC = b"RIDX1\0\0\0"
+HEADER = struct.Struct("<8sQQ")  # magic, capacity, count
+SLOT = struct.Struct("<QQI")  # key, offset, length; key 0 marks an empty slot
+MIN_CAPACITY = 1024
+MAX_LOAD = 0.5
+
+
+class OffsetIndex:
+    """On-disk open-addressing hash table from 64-bit record ids to ``(offset, length)``.
+
+    The table is memory-mapped, so a lookup touches one or two slots whatever the corpus
+    size and building it needs no memory beyond the map. It doubles (rehashing into a new
+    file) whenever it gets more than half full.
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        self.writable = writable
+        if writable and not os.path.exists(path):
+            self._create(path, MIN_CAPACITY)
+        self._open()
+
+    @staticmethod
+    def _create(path: str, capacity: int):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, capacity, 0))
+            f.truncate(HEADER.size + capacity * SLOT.size)
+
+    def _open(self):
+        self._file = open(self.path, "r+b" if self.writable else "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ)
+        magic, self.capacity, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a record offset index")
+        self._mask = self.capacity - 1
+
+    def _slot(self, key: int) -> Tuple[int, int]:
+        """Position of ``key``'s slot (or of the empty slot it would go in) and the key found there."""
+        i = key & self._mask
+        while True:
+            position = HEADER.size + i * SLOT.size
+            found = int.from_bytes(self._map[position:position + 8], "little")
+            if found == key or found == 0:
+                return position, found
+            i = (i + 1) & self._mask
+
+    @staticmethod
+    def _key(record_id: int) -> int:
+        return record_id or 1  # 0 is the empty-slot marker
+
+    def get(self, record_id: int) -> Optional[Tuple[int, int]]:
+        position, found = self._slot(self._key(record_id))
+        if not found:
+            return None
+        _, offset, length = SLOT.unpack_from(self._map, position)
+        return offset, length
+
+    def put(self, record_id: int, offset: int, length: int) -> bool:
+        """Store the location of ``record_id`` unless it is already indexed; returns whether it was new."""
+        key = self._key(record_id)
+        position, found = self._slot(key)
+        if found:
+            return False
+        SLOT.pack_into(self._map, position, key, offset, length)
+        self.count += 1
+        HEADER.pack_into(self._map, 0, MAGIC, self.capacity, self.count)
+        if self.count > self.capacity * MAX_LOAD:
+            self._grow()
+        return True
+
+    def items(self) -> Iterator[Tuple[int, int, int]]:
+        """``(key, offset, length)`` of every entry, in slot order."""
+        for i in range(self.capacity):
+            key, offset, length = SLOT.unpack_from(self._map, HEADER.size + i * SLOT.size)
+            if key:
+                yield key, offset, length
+
+    def _grow(self):
+        grown = self.path + ".grow"
+        self._create(grown, self.capacity * 2)
+        bigger = OffsetIndex(grown, writable=True)
+        for key, offset, length in self.items():
+            bigger.put(key, offset, length)
+        bigger.close()
+        self.close()
+        os.replace(grown, self.path)
+        self._open()
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._map.close()
+        self._file.close()
@@ -0,0 +1,441 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b"RPACK1\0\0"
+HEADER = struct.Struct("<8sQQQQQQ")  # magic, records, symbols, offset table, symbol table, dictionary
+DOUBLE = struct.Struct("<d")
+
+# Value tags. Containers carry their encoded size so a reader can step over them.
+NULL, FALSE, TRUE, INT, FLOAT, STRING, SYMBOL, ARRAY, OBJECT, BIG_INT, TEXT = range(11)
+
+# String values at these paths repeat across records and are stored once in the symbol
+# table; keys always are. Paths use the ``Field`` notation of the report scripts.
+INTERNED_FIELDS = frozenset({
+    "location.province",
+    "location.city",
+    "ingredients[].name",
+    "ingredients[].unit",
+    "meal_type[]",
+    "occasion[]",
+})
+MAX_SYMBOL_BYTES = 255
+# Other strings of at least this many bytes (instructions, long names) are deflated one by
+# one against a preset dictionary sampled from the first records, so each stays decodable
+# on its own; most of a recipe's bytes are such text.
+COMPRESS_MIN_BYTES = 32
+DICTIONARY_BYTES = 32 << 10  # the deflate window
+SAMPLE_RECORDS = 1000
+
+
+def _varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _strings(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+
+
+def build_dictionary(records: Iterable[Any], size: int = DICTIONARY_BYTES) -> bytes:
+    """Preset deflate dictionary from the long strings of sample records; deflate finds
+    matches nearer the end cheaper, so the latest records' text is kept."""
+    texts = [text.encode("utf-8") for record in records for text in _strings(record)]
+    return b"\n".join(text for text in texts if len(text) >= COMPRESS_MIN_BYTES)[-size:]
+
+
+def _read_varint(data: bytes, position: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def is_packed(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class PackedWriter:
+    """Writes records to a packed corpus: length-prefixed binary records, an offset table and
+    a table of interned strings, so a reader can map the file and decode single records or
+    fields. Object key order and number types survive, so unpacking reproduces the JSON.
+    """
+
+    def __init__(self, path: str, interned: Iterable[str] = INTERNED_FIELDS, dictionary: bytes = b""):
+        self.path = path
+        self.interned = frozenset(interned)
+        self.dictionary = dictionary
+        self.records = 0
+        self._symbols: Dict[str, int] = {}
+        self._offsets = array("Q")
+        # Copying a primed compressor is far cheaper than loading the dictionary per string.
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, -15, 8, zdict=dictionary) if dictionary else None
+        self._out = open(path, "wb")
+        self._out.write(HEADER.pack(MAGIC, 0, 0, 0, 0, 0, 0))
+
+    def _symbol(self, text: str) -> int:
+        return self._symbols.setdefault(text, len(self._symbols))
+
+    def _encode(self, out: bytearray, value: Any, path: str):
+        if value is None:
+            out.append(NULL)
+        elif value is True or value is False:
+            out.append(TRUE if value else FALSE)
+        elif isinstance(value, int):
+            if -(1 << 63) <= value < 1 << 63:
+                out.append(INT)
+                _varint(out, (value << 1) ^ (value >> 63))
+            else:
+                encoded = str(value).encode("ascii")
+                out.append(BIG_INT)
+                _varint(out, len(encoded))
+                out += encoded
+        elif isinstance(value, float):
+            out.append(FLOAT)
+            out += DOUBLE.pack(value)
+        elif isinstance(value, str):
+            self._encode_string(out, value, path)
+        elif isinstance(value, (list, tuple)):
+            body = bytearray()
+            _varint(body, len(value))
+            for item in value:
+                self._encode(body, item, path + "[]")
+            out.append(ARRAY)
+            _varint(out, len(body))
+            out += body
+        elif isinstance(value, dict):
+            body = bytearray()
+            _varint(body, len(value))
+            for key, item in value.items():
+                _varint(body, self._symbol(key))
+                self._encode(body, item, f"{path}.{key}" if path else key)
+            out.append(OBJECT)
+            _varint(out, len(body))
+            out += body
+        else:
+            raise TypeError(f"Cannot pack a {type(value).__name__}")
+
+    def _encode_string(self, out: bytearray, value: str, path: str):
+        encoded = value.encode("utf-8")
+        if path in self.interned and len(encoded) <= MAX_SYMBOL_BYTES:
+            out.append(SYMBOL)
+            _varint(out, self._symbol(value))
+            return
+        if self._compressor and len(encoded) >= COMPRESS_MIN_BYTES:
+            compressor = self._compressor.copy()
+            deflated = compressor.compress(encoded) + compressor.flush()
+            if len(deflated) < len(encoded):
+                out.append(TEXT)
+                _varint(out, len(deflated))
+                out += deflated
+                return
+        out.append(STRING)
+        _varint(out, len(encoded))
+        out += encoded
+
+    def add(self, record: Any):
+        out = bytearray()
+        self._encode(out, record, "")
+        self._offsets.append(self._out.tell())
+        self._out.write(out)
+        self.records += 1
+
+    def add_all(self, records: Iterable[Any]) -> "PackedWriter":
+        for record in records:
+            self.add(record)
+        return self
+
+    def close(self):
+        if self._out.closed:
+            return
+        offsets_start = self._out.tell()
+        self._offsets.append(offsets_start)
+        self._out.write(self._offsets.tobytes())
+        symbols_start = self._out.tell()
+        encoded = [symbol.encode("utf-8") for symbol in self._symbols]
+        ends = array("I", [0])
+        for symbol in encoded:
+            ends.append(ends[-1] + len(symbol))
+        self._out.write(ends.tobytes())
+        self._out.write(b"".join(encoded))
+        dictionary_start = self._out.tell()
+        self._out.write(self.dictionary)
+        self._out.seek(0)
+        self._out.write(HEADER.pack(MAGIC, self.records, len(encoded), offsets_start, symbols_start,
+                                    dictionary_start, len(self.dictionary)))
+        self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PackedCorpus:
+    """Memory-mapped reader of a corpus written by ``PackedWriter``.
+
+    Opening reads only the header; ``corpus[i]`` decodes one record and ``field(i, path)``
+    only the bytes of one field, stepping over the others by their stored sizes. Paths are
+    dotted keys with ``[]`` mapping over an array, e.g. ``location.province`` or
+    ``ingredients[].unit``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.records, symbols, offsets_start, self._symbols_start, dictionary_start,
+         dictionary_length) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a packed corpus")
+        self._view = memoryview(self._map)
+        self._offsets = self._view[offsets_start:offsets_start + (self.records + 1) * 8].cast("Q")
+        self._symbol_ends = self._view[self._symbols_start:self._symbols_start + (symbols + 1) * 4].cast("I")
+        self._symbol_data = self._symbols_start + (symbols + 1) * 4
+        self._symbol_cache: List[Optional[str]] = [None] * symbols
+        self.dictionary = self._map[dictionary_start:dictionary_start + dictionary_length]
+
+    def symbol(self, index: int) -> str:
+        text = self._symbol_cache[index]
+        if text is None:
+            start = self._symbol_data + self._symbol_ends[index]
+            text = self._symbol_cache[index] = str(self._map[start:self._symbol_data + self._symbol_ends[index + 1]],
+                                                   "utf-8")
+        return text
+
+    def _decode(self, data, position: int) -> Tuple[Any, int]:
+        """The value encoded at ``position`` of ``data`` and the position after it."""
+        tag = data[position]
+        position += 1
+        if tag <= TRUE:
+            return (None, False, True)[tag], position
+        if tag == FLOAT:
+            return DOUBLE.unpack_from(data, position)[0], position + DOUBLE.size
+        # Every other tag is followed by a varint; most fit in one byte.
+        number = data[position]
+        if number < 0x80:
+            position += 1
+        else:
+            number, position = _read_varint(data, position)
+        if tag == SYMBOL:
+            return self._symbol_cache[number] or self.symbol(number), position
+        if tag == INT:
+            return (number >> 1) ^ -(number & 1), position
+        if tag == TEXT:
+            inflated = zlib.decompressobj(-15, zdict=self.dictionary).decompress(data[position:position + number])
+            return str(inflated, "utf-8"), position + number
+        if tag == STRING:
+            return str(data[position:position + number], "utf-8"), position + number
+        if tag == OBJECT or tag == ARRAY:
+            count = data[position]
+            if count < 0x80:
+                position += 1
+            else:
+                count, position = _read_varint(data, position)
+            decode = self._decode
+            symbols = self._symbol_cache
+            if tag == ARRAY:
+                items = []
+                for _ in range(count):
+                    # Interned strings are most of the corpus; read one-byte symbols inline.
+                    if data[position] == SYMBOL and data[position + 1] < 0x80:
+                        items.append(symbols[data[position + 1]] or self.symbol(data[position + 1]))
+                        position += 2
+                    else:
+                        item, position = decode(data, position)
+                        items.append(item)
+                return items, position
+            value = {}
+            for _ in range(count):
+                key = data[position]
+                if key < 0x80:
+                    position += 1
+                else:
+                    key, position = _read_varint(data, position)
+                if data[position] == SYMBOL and data[position + 1] < 0x80:
+                    value[symbols[key] or self.symbol(key)] = symbols[data[position + 1]] or self.symbol(data[position + 1])
+                    position += 2
+                else:
+                    value[symbols[key] or self.symbol(key)], position = decode(data, position)
+            return value, position
+        if tag == BIG_INT:
+            return int(data[position:position + number]), position + number
+        raise ValueError(f"{self.path}: unknown tag {tag}")
+
+    @staticmethod
+    def _skip(data, position: int) -> int:
+        tag = data[position]
+        position += 1
+        if tag <= TRUE:
+            return position
+        if tag == FLOAT:
+            return position + DOUBLE.size
+        number, position = _read_varint(data, position)
+        return position if tag == INT or tag == SYMBOL else position + number
+
+    def _select(self, data, position: int, parts: List[str]) -> Any:
+        if not parts:
+            return self._decode(data, position)[0]
+        part, rest = parts[0], parts[1:]
+        tag = data[position]
+        if tag != (ARRAY if part == "[]" else OBJECT):
+            return None
+        _, position = _read_varint(data, position + 1)
+        count, position = _read_varint(data, position)
+        if part == "[]":
+            items = []
+            for _ in range(count):
+                items.append(self._select(data, position, rest))
+                position = self._skip(data, position)
+            return items
+        for _ in range(count):
+            key, position = _read_varint(data, position)
+            if (self._symbol_cache[key] or self.symbol(key)) == part:
+                return self._select(data, position, rest)
+            position = self._skip(data, position)
+        return None
+
+    @staticmethod
+    def _parts(path: str) -> List[str]:
+        parts = []
+        for key in path.split("."):
+            name = key.rstrip("[]")
+            if name:
+                parts.append(name)
+            parts.extend(["[]"] * ((len(key) - len(name)) // 2))
+        return parts
+
+    def __len__(self) -> int:
+        return self.records
+
+    def _record_check(self, index: int):
+        if not -self.records <= index < self.records:
+            raise IndexError(f"record {index} out of range")
+
+    def _record(self, index: int) -> bytes:
+        """The encoded bytes of record ``index``, copied out of the map once: a whole record
+        decodes faster from ``bytes``, while single fields are read from the map in place."""
+        self._record_check(index)
+        index %= self.records
+        return self._map[self._offsets[index]:self._offsets[index + 1]]
+
+    def __getitem__(self, index: int) -> Any:
+        return self._decode(self._record(index), 0)[0]
+
+    def field(self, index: int, path: str) -> Any:
+        """One field of record ``index`` (None where the path does not exist)."""
+        self._record_check(index)
+        return self._select(self._map, self._offsets[index % self.records], self._parts(path))
+
+    def column(self, path: str) -> Iterator[Any]:
+        """``field(i, path)`` for every record, in order."""
+        parts = self._parts(path)
+        for index in range(self.records):
+            yield self._select(self._map, self._offsets[index], parts)
+
+    def iter_range(self, start: int = 0, end: Optional[int] = None) -> Iterator[Any]:
+        """Records whose encoding starts within the byte range ``[start, end)``, like
+        ``iter_jsonl``, so byte ranges from ``jsonl_ranges`` shard a packed file too."""
+        first = bisect_left(self._offsets, start, 0, self.records)
+        last = self.records if end is None else bisect_left(self._offsets, end, first, self.records)
+        for index in range(first, last):
+            yield self._decode(self._record(index), 0)[0]
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.iter_range()
+
+    def close(self):
+        self._offsets.release()
+        self._symbol_ends.release()
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def pack(records: Iterable[Any], path: str, interned: Iterable[str] = INTERNED_FIELDS,
+         compress: bool = True) -> int:
+    """Write ``records`` to a packed corpus at ``path``, with a text dictionary built from
+    the first ``SAMPLE_RECORDS`` unless not ``compress``; returns how many were written."""
+    records = iter(records)
+    sample = list(islice(records, SAMPLE_RECORDS))
+    with PackedWriter(path, interned, build_dictionary(sample) if compress else b"") as writer:
+        writer.add_all(chain(sample, records))
+    return writer.records
+
+
+def unpack(path: str, output: str, jsonl: bool = False) -> int:
+    """Convert a packed corpus back to an ``indent=2`` JSON array (as the pipeline writes
+    them) or to compact JSONL, one record at a time."""
+    count = 0
+    with PackedCorpus(path) as corpus, open(output, "w", encoding="utf-8") as f:
+        for record in corpus:
+            if jsonl:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            else:
+                f.write(",\n  " if count else "[\n  ")
+                f.write(json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+            count += 1
+        if not jsonl:
+            f.write("\n]" if count else "[]")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert recipe corpora between JSON and the packed binary format.")
+    parser.add_argument("command", choices=["pack", "unpack", "show"])
+    parser.add_argument("input", help="JSON array/JSONL to pack, or a packed corpus")
+    parser.add_argument("output", nargs="?", help="destination of pack/unpack (default: input with .rpk/.json)")
+    parser.add_argument("--jsonl", action="store_true", help="unpack to JSONL instead of a JSON array")
+    parser.add_argument("--no-compress", action="store_true", help="store long strings as they are")
+    parser.add_argument("--record", type=int, default=0, help="record to show")
+    parser.add_argument("--field", default=None, help="show only this field, e.g. ingredients[].unit")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "pack":
+        from jsonstream import iter_records  # jsonstream reads packed files through this module
+        output = args.output or os.path.splitext(args.input)[0] + ".rpk"
+        count = pack(iter_records(args.input), output, compress=not args.no_compress)
+        print(f"Packed {count} records in {time.perf_counter() - started:.2f}s: "
+              f"{os.path.getsize(args.input) / 1024:.0f} KiB -> {os.path.getsize(output) / 1024:.0f} KiB ({output})")
+    elif args.command == "unpack":
+        output = args.output or os.path.splitext(args.input)[0] + (".jsonl" if args.jsonl else ".json")
+        count = unpack(args.input, output, args.jsonl)
+        print(f"Unpacked {count} records in {time.perf_counter() - started:.2f}s to {output}")
+    else:
+        with PackedCorpus(args.input) as corpus:
+            value = corpus.field(args.record, args.field) if args.field else corpus[args.record]
+            print(json.dumps(value, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from jsonstream import iter_json_array
+
+DOCUMENTS = ['[]', '[ ]', '[{"a": 1}]', '[{"a": 1},]', '[1, 2 ,\n]', '[1, 2]', '[1 , ]', '[1,,2]', '[12345]']
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 1 << 16])
+def test_arrays_parse_as_json_load_would(tmp_path, document, chunk_size):
+    path = tmp_path / "records.json"
+    path.write_text(document, encoding="utf-8")
+    try:
+        expected = json.loads(document)
+    except ValueError:
+        with pytest.raises(ValueError):
+            list(iter_json_array(str(path), chunk_size))
+    else:
+        assert list(iter_json_array(str(path), chunk_size)) == expected
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from near_dup import near_duplicate_pairs
+
+
+def bucket_with_an_outsider():
+    """Records 0 and 2 agree on 7 of 8 values; record 1 shares only their first band, so it
+    lands between them in that band's bucket and nowhere near them in the second band."""
+    shared = [1, 2, 3, 4]
+    return np.array([
+        shared + [10, 11, 12, 13],
+        shared + [20, 21, 22, 23],
+        shared + [10, 11, 12, 99],
+    ], dtype=np.uint32)
+
+
+def test_outsider_in_a_bucket_does_not_hide_a_pair():
+    pairs = {tuple(sorted(pair)) for pair in near_duplicate_pairs(bucket_with_an_outsider(), 2, 4, 0.7)}
+    assert pairs == {(0, 2)}
+
+
+def test_large_buckets_are_split_in_leader_rounds():
+    signatures = np.vstack([bucket_with_an_outsider()] * 2)
+    pairs = {tuple(sorted(pair)) for pair in near_duplicate_pairs(signatures, 2, 4, 0.7, pairwise_bucket=2)}
+    # First band, one bucket of six: record 0 leads and takes 2, 3 and 5; the outsiders 1
+    # and 4 form the next round. Second band: pairs of copies, compared pairwise.
+    assert pairs == {(0, 2), (0, 3), (0, 5), (1, 4), (2, 5)}
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import sys
+import time
+from typing import Optional, Dict
+from urllib.parse import urlsplit
+
+import httpx
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from metrics import REGISTRY
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/122.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+class FetchError(Exception):
+    pass
+
+
+def record_response(url: str, status: int, size: int):
+    """Count a response and its body size per host; bodies of 304s are empty."""
+    host = urlsplit(url).netloc
+    REGISTRY.counter("crawler_responses_total", host=host, status=status).inc()
+    REGISTRY.counter("crawler_downloaded_bytes_total", host=host).inc(size)
+
+
+class TokenBucket:
+    """Allows ``rate`` requests per second on average with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncFetcher:
+    """Pooled keep-alive HTTP client with a per-host concurrency limit and request rate.
+
+    Use as ``async with AsyncFetcher() as fetcher: html = await fetcher.fetch(url)``.
+    """
+
+    def __init__(
+            self,
+            headers: Optional[Dict[str, str]] = None,
+            per_host_concurrency: int = 4,
+            rate: float = 2.0,
+            burst: float = 2,
+            timeout: float = 30.0,
+            max_connections: int = 32
+    ):
+        self.headers = headers or DEFAULT_HEADERS
+        self.per_host_concurrency = per_host_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.requests = 0
+        self.bytes = 0
+        self._client = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+
+    def _host(self, url: str) -> str:
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return host
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        host = self._host(url)
+        async with self._semaphores[host]:
+            await self._buckets[host].acquire()
+            try:
+                with REGISTRY.timer("crawler_http", host=host):
+                    response = await self._client.get(url, headers=headers)
+            except httpx.HTTPError as e:
+                raise FetchError(f"Request to {url} failed: {e}") from e
+        self.requests += 1
+        self.bytes += len(response.content)
+        record_response(url, response.status_code, len(response.content))
+        return response
+
+    async def fetch(self, url: str) -> str:
+        response = await self.get(url)
+        if response.status_code != 200:
+            raise FetchError(f"Request failed with status code {response.status_code}")
+        return response.text
@@ -0,0 +1,97 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlsplit, unquote
+
+CRAWLER_DIR = os.path.dirname(os.path.abspath(__file__))
+for site_dir in ("ghazaland", "roostanet", "wiki_book"):
+    sys.path.append(os.path.join(CRAWLER_DIR, site_dir))
+
+import crawler_ghazaland
+import crawler_roostanet
+import crawler_wiki_book
+from html_backend import BACKENDS
+from page_store import PageStore
+
+
+def is_ghazaland_listing(url):
+    return urlsplit(url).netloc.endswith("ghazaland.com") and "/recipe-cuisine/" in url
+
+
+# site -> (does this stored URL belong to it, {backend: parser(url, html)})
+SITES = {
+    "ghazaland listing": (
+        is_ghazaland_listing,
+        {backend: (lambda url, html, b=backend: crawler_ghazaland.parse_foods_urls(html, b)) for backend in BACKENDS}),
+    "ghazaland recipe": (
+        lambda url: urlsplit(url).netloc.endswith("ghazaland.com") and not is_ghazaland_listing(url),
+        {backend: (lambda url, html, b=backend: crawler_ghazaland.parse_recipe(html, b)) for backend in BACKENDS}),
+    "roostanet": (
+        lambda url: urlsplit(url).netloc.endswith("roostanet.ir"),
+        {backend: (lambda url, html, b=backend: crawler_roostanet.parse_recipes(html, b)) for backend in BACKENDS}),
+    "wiki_book": (
+        lambda url: urlsplit(url).netloc.endswith("wikibooks.org"),
+        {backend: (lambda url, html, b=backend: crawler_wiki_book.parse_recipe_html(html, url, b))
+         for backend in BACKENDS}),
+}
+
+
+def run(parser, pages):
+    """Parse every page, turning exceptions into comparable results the way the crawlers skip them."""
+    results = []
+    for url, html in pages:
+        try:
+            results.append(parser(url, html))
+        except Exception as e:
+            results.append(f"{type(e).__name__}: {e}")
+    return results
+
+
+def bench(parser, pages, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        results = run(parser, pages)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    run(parser, pages)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return results, len(pages) * repeat / elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time each site's HTML parser per backend on pages kept in a crawler page store.")
+    parser.add_argument("--store", default="pages", help="page store directory filled by the crawlers' --store")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the pages for the timing run")
+    parser.add_argument("--site", choices=list(SITES), action="append", help="only benchmark these sites")
+    args = parser.parse_args()
+
+    stored = list(PageStore(args.store).pages())
+    if not stored:
+        parser.error(f"no pages in {args.store}; crawl with --store {args.store} first")
+
+    print("Peak memory is Python-heap allocations seen by tracemalloc; libxml2's own buffers are not counted.")
+    print(f"{'site':<18} {'backend':<8} {'pages':>6} {'pages/s':>9} {'ms/page':>8} {'peak KiB':>9}  same as bs4")
+    for site in args.site or SITES:
+        belongs, parsers = SITES[site]
+        pages = [(url, html) for url, html in stored if belongs(url)]
+        if not pages:
+            continue
+        reference = None
+        for backend in ("bs4", *(b for b in BACKENDS if b != "bs4")):
+            results, rate, peak = bench(parsers[backend], pages, args.repeat)
+            if reference is None:
+                reference = results
+            mismatches = [url for (url, _), got, want in zip(pages, results, reference) if got != want]
+            print(f"{site:<18} {backend:<8} {len(pages):>6} {rate:>9,.0f} {1000 / rate:>8.2f} {peak / 1024:>9,.0f}"
+                  f"  {len(pages) - len(mismatches)}/{len(pages)}")
+            for url in mismatches[:3]:
+                print(f"    differs: {unquote(url)}")
+
+
+if __name__ == '__main__':
+    main()
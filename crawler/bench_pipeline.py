@@ -0,0 +1,55 @@
+import argparse
+import asyncio
+import os
+import time
+
+from bench_parsers import SITES
+from html_backend import DEFAULT_BACKEND
+from page_store import PageStore
+from pipeline import ParseStage
+
+
+def parse_stored(site, url, html):
+    return SITES[site][1][DEFAULT_BACKEND](url, html)
+
+
+async def replay(pages, processes, queue_size):
+    results = {}
+
+    def collect(url, result, error):
+        results[url] = result if error is None else f"{type(error).__name__}: {error}"
+
+    started = time.perf_counter()
+    async with ParseStage(parse_stored, collect, processes, queue_size) as stage:
+        for site, url, html in pages:
+            await stage.put(url, site, url, html)
+    return time.perf_counter() - started, results, stage
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay a page store through the parser process pool at several pool sizes.")
+    parser.add_argument("--store", default="pages", help="page store directory filled by the crawlers' --store")
+    parser.add_argument("--processes", type=int, nargs="+",
+                        default=sorted({0, 1, 2, 4, os.cpu_count() or 1}), help="pool sizes to try")
+    parser.add_argument("--queue-size", type=int, default=None)
+    args = parser.parse_args()
+
+    pages = [(site, url, html) for url, html in PageStore(args.store).pages()
+             for site, (belongs, _) in SITES.items() if belongs(url)]
+    if not pages:
+        parser.error(f"no pages of a known site in {args.store}")
+
+    print(f"{len(pages)} pages, {os.cpu_count()} cores, {DEFAULT_BACKEND} backend")
+    baseline, reference = None, None
+    for processes in args.processes:
+        elapsed, results, stage = asyncio.run(replay(pages, processes, args.queue_size))
+        reference = reference or results
+        baseline = baseline or elapsed
+        print(f"processes={processes}: {len(pages) / elapsed:,.0f} pages/s, {baseline / elapsed:.2f}x of "
+              f"processes={args.processes[0]}, same results: {results == reference}")
+        print("  " + stage.summary().replace("\n", "\n  "))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+class FixtureServer:
+    """Serves fixed pages on a local port and logs when each request started and ended.
+
+    ``pages`` maps a path to its HTML and ``delays`` a path to seconds to wait before
+    answering (``default_delay`` otherwise); unknown paths get a 404. The log and the peak
+    number of requests in flight let a crawl's concurrency, rate and ordering be checked.
+
+        with FixtureServer(ghazaland_pages()) as server:
+            html = requests.get(server.url("/recipe-cuisine/ardabil/")).text
+    """
+
+    def __init__(self, pages: Dict[str, str], delays: Optional[Dict[str, float]] = None,
+                 default_delay: float = 0.0, port: int = 0):
+        self.pages = pages
+        self.delays = delays or {}
+        self.default_delay = default_delay
+        self.log: List[Tuple[str, float, float]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                started = time.monotonic()
+                with server._lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    time.sleep(server.delays.get(self.path, server.default_delay))
+                    html = server.pages.get(self.path)
+                    body = (html or "not found").encode("utf-8")
+                    self.send_response(200 if html is not None else 404)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+                        server.log.append((self.path, started, time.monotonic()))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def requests(self, prefix: str = "") -> List[Tuple[str, float, float]]:
+        """``(path, started, ended)`` of the answered requests under ``prefix``, by start time."""
+        with self._lock:
+            return sorted((entry for entry in self.log if entry[0].startswith(prefix)), key=lambda e: e[1])
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+def ghazaland_listing(recipe_urls: List[str]) -> str:
+    """A listing page in ghazaland's markup: the second link of each grid item is the recipe."""
+    items = "".join(
+        f'<li class="post"><div class="grid-content"><a href="{url}#image"><img></a>'
+        f'<a href="{url}">Recipe</a></div></li>' for url in recipe_urls)
+    return f'<html><body><ul class="grid_list js-masonry">{items}</ul></body></html>'
+
+
+def ghazaland_recipe(name: str, city: str, url: str) -> str:
+    return (
+        f'<html><head><link rel="canonical" href="{url}"></head><body>'
+        f'<h1 class="article-title">{name}</h1>'
+        f'<div class="entry"><a href="/recipe-cuisine/{city}/">{city}</a></div>'
+        f'<div class="single-category"><a href="/category/lunch/">Lunch</a></div>'
+        f'<div class="ingredients-box"><ul><li>rice</li><li>{name} spices</li></ul></div>'
+        f'<div class="cooking-steps-box"><ul><li>Wash the rice. Cook {name}.</li></ul></div>'
+        f'<div class="entry-content"><p>About {name}.</p></div>'
+        f'</body></html>')
+
+
+def ghazaland_pages(base_url: str = "", city: str = "ardabil", listings: int = 2,
+                    recipes_per_listing: int = 5) -> Dict[str, str]:
+    """Listing pages ``/recipe-cuisine/<city>/page/<n>/`` linking to recipe pages
+    ``/recipe/<city>-<n>-<i>/`` (absolute when ``base_url`` is given, as on the real site)."""
+    pages = {}
+    for n in range(1, listings + 1):
+        recipe_urls = []
+        for i in range(recipes_per_listing):
+            path = f"/recipe/{city}-{n}-{i}/"
+            pages[path] = ghazaland_recipe(f"{city} {n}-{i}", city, base_url + path)
+            recipe_urls.append(base_url + path)
+        pages[f"/recipe-cuisine/{city}/page/{n}/"] = ghazaland_listing(recipe_urls)
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve ghazaland-style fixture pages locally.")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--listings", type=int, default=2)
+    parser.add_argument("--recipes", type=int, default=5, help="recipes per listing page")
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds before each response")
+    args = parser.parse_args()
+    base_url = f"http://127.0.0.1:{args.port}"
+    pages = ghazaland_pages(base_url, listings=args.listings, recipes_per_listing=args.recipes)
+    with FixtureServer(pages, default_delay=args.delay, port=args.port) as server:
+        for path in sorted(pages):
+            if path.startswith("/recipe-cuisine/"):
+                print(server.url(path))
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import json
+import sqlite3
+import time
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used to deduplicate URLs: lower-case scheme and host, no fragment."""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", parts.query, ""))
+
+
+class Frontier:
+    """Persistent SQLite queue of crawl URLs and their outcome.
+
+    Every URL is stored once (after ``normalize_url``) with the site and page kind that
+    should handle it, a ``sort_key`` that orders it among its siblings, its state
+    (pending/done/failed) and, once done, the JSON records parsed from it. State is
+    committed as soon as it changes, so reopening after a crash resumes the pending URLs.
+    """
+
+    def __init__(self, path: str = "frontier.sqlite"):
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            "url TEXT PRIMARY KEY, site TEXT NOT NULL, kind TEXT NOT NULL, city TEXT, "
+            "sort_key TEXT NOT NULL, state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "error TEXT, records TEXT, updated REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state, sort_key)")
+
+    def add(self, url: str, site: str, kind: str, city: Optional[str], sort_key: str) -> bool:
+        """Queue ``url`` unless any site has already queued it; returns whether it was new."""
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO frontier (url, site, kind, city, sort_key, state, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (normalize_url(url), site, kind, city, sort_key, PENDING, time.time()))
+        return cursor.rowcount == 1
+
+    def pending(self) -> List[Tuple[str, str, str, Optional[str], str]]:
+        """``(url, site, kind, city, sort_key)`` of every pending URL in crawl order."""
+        return self._conn.execute(
+            "SELECT url, site, kind, city, sort_key FROM frontier WHERE state = ? ORDER BY sort_key",
+            (PENDING,)).fetchall()
+
+    def done(self, url: str, records: List[Dict[str, Any]], children: Iterable[Tuple] = ()) -> List[Tuple]:
+        """Store ``url``'s records and queue its new ``(url, site, kind, city, sort_key)`` children
+        in one transaction; returns the children that were not already known."""
+        added = []
+        with self._conn:
+            self._conn.execute("BEGIN")
+            for child in children:
+                if self.add(*child):
+                    added.append((normalize_url(child[0]), *child[1:]))
+            self._conn.execute(
+                "UPDATE frontier SET state = ?, records = ?, error = NULL, updated = ? WHERE url = ?",
+                (DONE, json.dumps(records, ensure_ascii=False), time.time(), url))
+        return added
+
+    def failed(self, url: str, error: str, max_attempts: int) -> str:
+        """Count a failed attempt on ``url``; it stays pending until ``max_attempts`` is reached.
+        Returns the URL's new state."""
+        self._conn.execute(
+            "UPDATE frontier SET attempts = attempts + 1, error = ?, "
+            "state = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END, updated = ? WHERE url = ?",
+            (error, max_attempts, FAILED, PENDING, time.time(), url))
+        return self._conn.execute("SELECT state FROM frontier WHERE url = ?", (url,)).fetchone()[0]
+
+    def retry_failed(self) -> int:
+        """Put every failed URL back in the queue with a fresh attempt budget."""
+        return self._conn.execute(
+            "UPDATE frontier SET state = ?, attempts = 0 WHERE state = ?", (PENDING, FAILED)).rowcount
+
+    def results(self, site: str) -> Iterator[Tuple[str, Optional[str], str, Optional[List[Dict[str, Any]]], str]]:
+        """``(url, city, state, records, error)`` of every URL of ``site`` in crawl order."""
+        for url, city, state, records, error in self._conn.execute(
+                "SELECT url, city, state, records, error FROM frontier WHERE site = ? ORDER BY sort_key",
+                (site,)):
+            yield url, city, state, json.loads(records) if records else None, error
+
+    def stats(self) -> Dict[str, int]:
+        counts = dict(self._conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall())
+        return {state: counts.get(state, 0) for state in (PENDING, DONE, FAILED)}
+
+    def close(self):
+        self._conn.close()
@@ -1,9 +1,21 @@
+import argparse
+import asyncio
+import os
+import sys
 import time
 
 import requests
 import json
 from bs4 import BeautifulSoup
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+from async_fetch import AsyncFetcher, FetchError, DEFAULT_HEADERS, record_response
+from metrics import REGISTRY
+from page_store import PageStore
+import html_backend
+from html_backend import DEFAULT_BACKEND, etree
+
 site_prefix = "Ghazaland"
 
 cities_map = {
@@ -36,25 +48,29 @@ cities_map = {
 }
 
 
-def fetch_html_url(url):
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/122.0.0.0 Safari/537.36"
-        ),
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.9",
-    }
-
-    response = requests.get(url, headers=headers)
+@REGISTRY.timer("crawler_fetch", site="ghazaland")
+def fetch_html_url(url, store=None):
+    if store:
+        return store.fetch(url, headers=DEFAULT_HEADERS)
+    response = requests.get(url, headers=DEFAULT_HEADERS)
+    record_response(url, response.status_code, len(response.content))
     if response.status_code == 200:
         return response.text
     else:
         raise Exception(f"Request failed with status code {response.status_code}")
 
 
-def parse_recipe(html):
+@REGISTRY.timer("crawler_parse", site="ghazaland", page="recipe")
+def parse_recipe(html, backend=DEFAULT_BACKEND):
+    return RECIPE_PARSERS[backend](html)
+
+
+@REGISTRY.timer("crawler_parse", site="ghazaland", page="listing")
+def parse_foods_urls(html, backend=DEFAULT_BACKEND):
+    return LISTING_PARSERS[backend](html)
+
+
+def parse_recipe_bs4(html):
 
     soup = BeautifulSoup(html, "html.parser")
 
@@ -106,8 +122,76 @@ def parse_recipe(html):
     return [recipe]
 
 
-def parse_foods_urls(html):
-    soup = BeautifulSoup(html, "html")
+def parse_recipe_lxml(html):
+    """Same fields as ``parse_recipe_bs4`` collected in one walk over the lxml tree.
+
+    Each CSS selector of the BeautifulSoup version becomes a check on the current element plus
+    a count of how many open ancestors carry the class the selector is scoped to.
+    """
+    root = html_backend.parse(html)
+    found = {}
+    ingredients = []
+    steps = []
+    scopes = {"entry": 0, "media-single-content": 0, "single-category": 0,
+              "ingredients-box": 0, "cooking-steps-box": 0}
+    opened = []
+
+    for event, el in etree.iterwalk(root, events=("start", "end")):
+        if event == "end":
+            for scope in opened.pop():
+                scopes[scope] -= 1
+            continue
+
+        tag = el.tag
+        classes = html_backend.classes(el)
+        if tag == "h1" and "name" not in found and "article-title" in classes:
+            found["name"] = html_backend.text(el, strip=True)
+        elif tag == "a":
+            href = el.get("href") or ""
+            if scopes["entry"] and "city" not in found and "/recipe-cuisine/" in href:
+                found["city"] = html_backend.text(el, strip=True)
+            if (scopes["single-category"] and "group" not in found
+                    and ("/category/lunch/" in href or "/category/dinner/" in href)):
+                found["group"] = html_backend.text(el, strip=True)
+        elif tag == "img" and scopes["media-single-content"] and "image" not in found:
+            found["image"] = el.get("src", "")
+        elif tag == "li":
+            if scopes["ingredients-box"]:
+                ingredients.append(html_backend.text(el, strip=True))
+            if scopes["cooking-steps-box"]:
+                steps.append(html_backend.text(el, strip=True))
+        elif tag == "p":
+            parent = html_backend.classes(el.getparent())
+            if "p-first-letter" in parent and "first_letter" not in found:
+                found["first_letter"] = html_backend.text(el, strip=True)
+            if "entry-content" in parent and "entry_content" not in found:
+                found["entry_content"] = html_backend.text(el, strip=True)
+        elif tag == "link" and "source" not in found and "canonical" in (el.get("rel") or "").split():
+            found["source"] = el.get("href", "")
+        if "notes" not in found and ("recipe-notes" in classes or "notes-box" in classes):
+            found["notes"] = html_backend.text(el, strip=True)
+
+        scoped = [c for c in classes if c in scopes and (c != "entry" or tag == "div")]
+        for scope in scoped:
+            scopes[scope] += 1
+        opened.append(scoped)
+
+    recipe = {
+        "name": found.get("name", ""),
+        "city": found.get("city", ""),
+        "image": found.get("image", ""),
+        "group": found.get("group", ""),
+        "ingredients": [ingredient for ingredient in ingredients if ingredient],
+        "instructions": [instruction for instruction in steps[0].split(".") if instruction],
+        "notes": found.get("notes", ""),
+        "description": found.get("first_letter") or found.get("entry_content", ""),
+        "source": found.get("source", ""),
+    }
+    return [recipe]
+
+
+def parse_foods_urls_bs4(html):
+    soup = BeautifulSoup(html, "html.parser")
     second_links = []
 
     for div in soup.select('ul.grid_list.js-masonry li.post div.grid-content'):
@@ -118,20 +202,80 @@ def parse_foods_urls(html):
     return second_links
 
 
-def main():
+if etree:
+    GRID_CONTENT = etree.XPath(
+        f"//ul[{html_backend.has_class('grid_list')} and {html_backend.has_class('js-masonry')}]"
+        f"//li[{html_backend.has_class('post')}]//div[{html_backend.has_class('grid-content')}]")
+
+
+def parse_foods_urls_lxml(html):
+    second_links = []
+
+    for div in GRID_CONTENT(html_backend.parse(html)):
+        a_tags = div.xpath(".//a")
+        if len(a_tags) >= 2:
+            second_links.append(a_tags[1].attrib['href'])
+
+    return second_links
+
+
+RECIPE_PARSERS = {"lxml": parse_recipe_lxml, "bs4": parse_recipe_bs4}
+LISTING_PARSERS = {"lxml": parse_foods_urls_lxml, "bs4": parse_foods_urls_bs4}
+
+
+async def crawl_city(fetcher, listing_urls, store=None):
+    """Fetch every listing page of a city and, as soon as each one is parsed, its recipe pages."""
+
+    @REGISTRY.timer("crawler_fetch", site="ghazaland")
+    async def fetch(url):
+        return await store.afetch(url, fetcher) if store else await fetcher.fetch(url)
+
+    async def recipe(url):
+        try:
+            return parse_recipe(await fetch(url))
+        except (FetchError, IndexError) as e:
+            print(f"Failed {url}: {e}")
+            return []
+
+    async def listing(url):
+        try:
+            foods_urls = parse_foods_urls(await fetch(url))
+        except FetchError as e:
+            print(f"Failed {url}: {e}")
+            return []
+        return await asyncio.gather(*(recipe(food_url) for food_url in foods_urls))
+
+    city_recipes = []
+    for recipes_per_listing in await asyncio.gather(*(listing(url) for url in listing_urls)):
+        for recipes in recipes_per_listing:
+            city_recipes += recipes
+    return city_recipes
+
+
+async def crawl(cities=None, store=None, **fetcher_options):
+    """Crawl all cities concurrently; returns ``{city: recipes}`` in the order of ``cities``."""
+    cities = cities or cities_map
+    async with AsyncFetcher(**fetcher_options) as fetcher:
+        results = await asyncio.gather(*(crawl_city(fetcher, urls, store) for urls in cities.values()))
+        print(f"Fetched {fetcher.requests} pages ({fetcher.bytes / 1024:.0f} KiB)")
+    return dict(zip(cities.keys(), results))
+
+
+def main_serial(store=None):
     cities_foods_urls = {}
     for city in cities_map.keys():
         foods_urls = []
         for city_url in cities_map[city]:
-            html = fetch_html_url(city_url)
+            html = fetch_html_url(city_url, store)
             foods_urls += parse_foods_urls(html)
         cities_foods_urls[city] = foods_urls
 
     for city in cities_foods_urls.keys():
         city_recipes = []
         for city_food_url in cities_foods_urls[city]:
-            html = fetch_html_url(city_food_url)
-            time.sleep(0.5)
+            html = fetch_html_url(city_food_url, store)
+            if not (store and store.offline):
+                time.sleep(0.5)
             city_recipes += parse_recipe(html)
 
         with open(f'{site_prefix}_{city}_recipes.json', 'w', encoding='utf-8') as f:
@@ -139,5 +283,36 @@ def main():
         print(f"Extracted {len(city_recipes)} recipes. Saved to {site_prefix}_{city}_recipes.json")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Crawl ghazaland recipes per city.")
+    parser.add_argument("--serial", action="store_true", help="use the original one-request-at-a-time crawler")
+    parser.add_argument("--concurrency", type=int, default=4, help="simultaneous requests to the site")
+    parser.add_argument("--rate", type=float, default=2.0, help="requests per second to the site")
+    parser.add_argument("--store", default=None, help="keep fetched pages in this directory and revalidate them")
+    parser.add_argument("--offline", action="store_true", help="replay pages from --store without any network")
+    parser.add_argument("--metrics", default=None,
+                        help="write fetch/parse histograms and counters here at the end "
+                             "(Prometheus text for .prom/.txt, JSON otherwise)")
+    args = parser.parse_args()
+    if args.offline and not args.store:
+        parser.error("--offline requires --store")
+    store = PageStore(args.store, offline=args.offline) if args.store else None
+    if args.serial:
+        main_serial(store)
+    else:
+        started = time.perf_counter()
+        results = asyncio.run(crawl(store=store, per_host_concurrency=args.concurrency, rate=args.rate))
+        for city, city_recipes in results.items():
+            with open(f'{site_prefix}_{city}_recipes.json', 'w', encoding='utf-8') as f:
+                json.dump(city_recipes, f, ensure_ascii=False, indent=2)
+            print(f"Extracted {len(city_recipes)} recipes. Saved to {site_prefix}_{city}_recipes.json")
+        print(f"Crawl took {time.perf_counter() - started:.1f}s")
+        if store:
+            print(f"Page store: {store.summary()}")
+    if args.metrics:
+        REGISTRY.write(args.metrics)
+        print(f"Metrics written to {args.metrics}")
+
+
 if __name__ == '__main__':
     main()
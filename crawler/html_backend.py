@@ -0,0 +1,50 @@
+from typing import List
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # BeautifulSoup's html.parser keeps working without lxml
+    lxml = etree = None
+
+BACKENDS = ("lxml", "bs4")
+DEFAULT_BACKEND = "lxml" if lxml else "bs4"
+
+# BeautifulSoup's get_text() leaves out comments and the contents of these elements.
+NON_TEXT_TAGS = ("script", "style", "template")
+
+if lxml:
+    _UTF8_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+    _TEXT_NODES = etree.XPath(
+        "descendant::text()[not(" + " or ".join(f"parent::{tag}" for tag in NON_TEXT_TAGS) + ")]",
+        smart_strings=False)
+
+
+def parse(html: str):
+    """Parse a whole document with libxml2's HTML parser and return its ``<html>`` element."""
+    if not html.strip():
+        html = "<html></html>"
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:  # str input carrying an XML encoding declaration
+        return lxml.html.document_fromstring(html.encode("utf-8"), parser=_UTF8_PARSER)
+
+
+def strings(element) -> List[str]:
+    """The text nodes under ``element`` in document order, as BeautifulSoup would list them."""
+    return _TEXT_NODES(element)
+
+
+def text(element, separator: str = "", strip: bool = False) -> str:
+    """Equivalent of BeautifulSoup's ``get_text(separator, strip)`` for an lxml element."""
+    if strip:
+        return separator.join(part for part in (s.strip() for s in _TEXT_NODES(element)) if part)
+    return separator.join(_TEXT_NODES(element))
+
+
+def classes(element) -> List[str]:
+    return (element.get("class") or "").split()
+
+
+def has_class(name: str) -> str:
+    """XPath predicate matching elements whose ``class`` attribute contains the token ``name``."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
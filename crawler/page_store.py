@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Optional, Dict, Iterator, Tuple
+
+import requests
+
+from async_fetch import AsyncFetcher, FetchError, record_response
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from metrics import REGISTRY
+
+
+class PageStore:
+    """On-disk archive of fetched pages keyed by URL.
+
+    Each page is kept as ``<root>/<hh>/<sha256>.html`` next to a ``.json`` file holding the
+    URL and its ``ETag``/``Last-Modified`` validators. Refetches are sent as conditional
+    requests and a ``304 Not Modified`` reuses the stored body. With ``offline`` the network
+    is never touched and only stored pages are served.
+    """
+
+    def __init__(self, root: str = "pages", offline: bool = False):
+        self.root = root
+        self.offline = offline
+        self.downloaded = 0
+        self.not_modified = 0
+        self.replayed = 0
+
+    def _path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], digest)
+
+    def get(self, url: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        path = self._path(url)
+        try:
+            with open(path + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(path + ".html", encoding="utf-8") as f:
+                return f.read(), meta
+        except FileNotFoundError:
+            return None
+
+    def put(self, url: str, html: str, headers=None):
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        headers = headers or {}
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+        with open(path + ".html", "w", encoding="utf-8") as f:
+            f.write(html)
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    def _conditional_headers(self, meta: Optional[Dict[str, str]]) -> Dict[str, str]:
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def _offline(self, url: str, stored) -> str:
+        if stored is None:
+            raise FetchError(f"{url} is not in the page store at {self.root} (offline mode)")
+        self.replayed += 1
+        REGISTRY.counter("crawler_page_store_total", outcome="replayed").inc()
+        return stored[0]
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None, session=None) -> str:
+        stored = self.get(url)
+        if self.offline:
+            return self._offline(url, stored)
+        response = (session or requests).get(
+            url, headers={**(headers or {}), **self._conditional_headers(stored and stored[1])})
+        record_response(url, response.status_code, len(response.content))
+        if response.status_code == 304 and stored:
+            self.not_modified += 1
+            REGISTRY.counter("crawler_page_store_total", outcome="not_modified").inc()
+            return stored[0]
+        response.raise_for_status()
+        self.downloaded += 1
+        REGISTRY.counter("crawler_page_store_total", outcome="downloaded").inc()
+        self.put(url, response.text, response.headers)
+        return response.text
+
+    async def afetch(self, url: str, fetcher: AsyncFetcher) -> str:
+        stored = self.get(url)
+        if self.offline:
+            return self._offline(url, stored)
+        response = await fetcher.get(url, headers=self._conditional_headers(stored and stored[1]))
+        if response.status_code == 304 and stored:
+            self.not_modified += 1
+            REGISTRY.counter("crawler_page_store_total", outcome="not_modified").inc()
+            return stored[0]
+        if response.status_code != 200:
+            raise FetchError(f"Request failed with status code {response.status_code}")
+        self.downloaded += 1
+        REGISTRY.counter("crawler_page_store_total", outcome="downloaded").inc()
+        self.put(url, response.text, response.headers)
+        return response.text
+
+    def pages(self) -> Iterator[Tuple[str, str]]:
+        """Yield ``(url, html)`` for every stored page."""
+        if not os.path.isdir(self.root):
+            return
+        for shard in sorted(os.listdir(self.root)):
+            directory = os.path.join(self.root, shard)
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(".json"):
+                    with open(os.path.join(directory, name), encoding="utf-8") as f:
+                        url = json.load(f)["url"]
+                    with open(os.path.join(directory, name[:-5] + ".html"), encoding="utf-8") as f:
+                        yield url, f.read()
+
+    def summary(self) -> str:
+        return (f"{self.downloaded} downloaded, {self.not_modified} not modified, "
+                f"{self.replayed} replayed from {self.root}")
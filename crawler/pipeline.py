@@ -0,0 +1,111 @@
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from metrics import REGISTRY
+
+
+class StageStats:
+    """Items handled by one pipeline stage and the wall time spent on them."""
+
+    def __init__(self, name: str, workers: int = 1):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.started = time.perf_counter()
+
+    def add(self, seconds: float, items: int = 1):
+        self.items += items
+        self.busy += seconds
+        REGISTRY.histogram("crawler_stage_seconds", stage=self.name).observe(seconds)
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        per_item = self.busy / self.items * 1000 if self.items else 0
+        utilization = self.busy / (elapsed * self.workers) if elapsed else 0
+        return (f"{self.name}: {self.items} pages, {self.items / elapsed:,.1f} pages/s, "
+                f"{per_item:.1f} ms/page, {self.workers} workers {utilization:.0%} busy")
+
+
+class ParseStage:
+    """Bounded queue of raw pages drained by a pool of parser processes.
+
+    ``await stage.put(item, *args)`` blocks while the queue is full, which holds fetchers back
+    when parsing falls behind; ``parse(*args)`` then runs in a worker process and
+    ``on_result(item, result, error)`` is called back on the event loop. ``parse`` must be a
+    module-level function so it can be sent to the workers. With ``processes=0`` pages are
+    parsed inline on the event loop instead.
+    """
+
+    def __init__(
+            self,
+            parse: Callable[..., Any],
+            on_result: Callable[[Any, Any, Optional[BaseException]], None],
+            processes: Optional[int] = None,
+            queue_size: Optional[int] = None
+    ):
+        self.parse = parse
+        self.on_result = on_result
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self.queue = asyncio.Queue(queue_size or max(self.processes, 1) * 4)
+        self.stats = StageStats("Parse", max(self.processes, 1))
+        self.blocked = 0.0
+        self.max_depth = 0
+        self._depth_total = 0
+        self._puts = 0
+        self._executor = None
+        self._consumers = []
+
+    async def __aenter__(self):
+        if self.processes:
+            self._executor = ProcessPoolExecutor(self.processes)
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(max(self.processes, 1))]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if exc_info[0] is None:
+            await self.queue.join()
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        if self._executor:
+            self._executor.shutdown(cancel_futures=True)
+
+    async def put(self, item: Any, *args: Any):
+        depth = self.queue.qsize()
+        self.max_depth = max(self.max_depth, depth)
+        self._depth_total += depth
+        self._puts += 1
+        started = time.perf_counter()
+        await self.queue.put((item, args))
+        self.blocked += time.perf_counter() - started
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item, args = await self.queue.get()
+            started = time.perf_counter()
+            result, error = None, None
+            try:
+                if self._executor:
+                    result = await loop.run_in_executor(self._executor, self.parse, *args)
+                else:
+                    result = self.parse(*args)
+            except Exception as e:
+                error = e
+            self.stats.add(time.perf_counter() - started)
+            try:
+                self.on_result(item, result, error)
+            finally:
+                self.queue.task_done()
+
+    def summary(self) -> str:
+        mean_depth = self._depth_total / self._puts if self._puts else 0
+        return (f"{self.stats.summary()}\n"
+                f"Parse queue: capacity {self.queue.maxsize}, max depth {self.max_depth}, "
+                f"mean depth {mean_depth:.1f}, producers waited {self.blocked:.1f}s in total")
@@ -0,0 +1,55 @@
+import argparse
+import random
+import time
+
+from crawler_roostanet import iter_recipes_from_text, parse_recipes_regex
+
+WORDS = "برنج نمک آب گوشت پیاز سیر روغن زردچوبه فلفل لوبیا نخود سبزی".split()
+
+
+def words(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def synthetic_page(blocks, seed=0):
+    """Page text shaped like ``page_text`` of a roostanet province page with ``blocks`` recipes."""
+    rng = random.Random(seed)
+    parts = ["\n\nروستانت\n" + words(rng, 200) + "\n"]
+    for _ in range(blocks):
+        ingredients = "\n".join(f"{words(rng, 2)}\xa0{rng.randint(1, 5)} عدد" for _ in range(rng.randint(3, 12)))
+        instructions = "\n".join(words(rng, 30) for _ in range(rng.randint(1, 4)))
+        parts.append(
+            f"\nنام غذا\n{words(rng, 2)}\n\nشهر\nزنجان\n\nگروه\n{words(rng, 1)}\n\n"
+            f"مواد لازم\n\n{ingredients}\n\xa0\n\nطرز تهیه\n{instructions}\n\n"
+            f"نکات\n{words(rng, 8)}\n\nتوضیحات\n{words(rng, 12)}\n\nمنبع\n{words(rng, 3)}\n")
+    parts.append(words(rng, 100))
+    return "".join(parts)
+
+
+def best_of(repeat, parse, text):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        recipes = parse(text)
+        best = min(best, time.perf_counter() - started)
+    return best, recipes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark roostanet's block parser on synthetic pages.")
+    parser.add_argument("--blocks", type=int, nargs="+", default=[1000, 2000, 5000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'blocks':>7} {'MiB':>6} {'regex ms':>9} {'single-pass ms':>15} {'µs/block':>9} {'speedup':>8}  same")
+    for blocks in args.blocks:
+        text = synthetic_page(blocks)
+        regex_time, expected = best_of(args.repeat, parse_recipes_regex, text)
+        scan_time, recipes = best_of(args.repeat, lambda t: list(iter_recipes_from_text(t)), text)
+        print(f"{blocks:>7} {len(text.encode('utf-8')) / 2 ** 20:>6.1f} {regex_time * 1000:>9.1f} "
+              f"{scan_time * 1000:>15.1f} {scan_time / blocks * 1e6:>9.1f} {regex_time / scan_time:>7.1f}x"
+              f"  {recipes == expected}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,20 @@
+import argparse
+import os
+import sys
+
 import requests
 import re
 import json
 from bs4 import BeautifulSoup
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+from async_fetch import record_response
+from metrics import REGISTRY
+from page_store import PageStore
+import html_backend
+from html_backend import DEFAULT_BACKEND
+
 cities_url = {
     "zanjan": "https://roostanet.ir/fa/6124",
     "azerbaijan_west": "https://roostanet.ir/fa/6079",
@@ -13,17 +25,97 @@ cities_url = {
 }
 
 
-def fetch_recipe_page(url):
+@REGISTRY.timer("crawler_fetch", site="roostanet")
+def fetch_recipe_page(url, store=None):
+    if store:
+        return store.fetch(url)
     response = requests.get(url)
+    record_response(url, response.status_code, len(response.content))
     response.raise_for_status()
     return response.text
 
 
-def parse_recipes(html):
-    soup = BeautifulSoup(html, 'html.parser')
+def page_text(html, backend=DEFAULT_BACKEND):
+    if backend == 'lxml':
+        return html_backend.text(html_backend.parse(html), separator='\n')
+    return BeautifulSoup(html, 'html.parser').get_text(separator='\n')
+
+
+FIELDS = [
+    ('name', 'نام غذا'),
+    ('city', 'شهر'),
+    ('group', 'گروه'),
+    ('ingredients', 'مواد لازم'),
+    ('instructions', 'طرز تهیه'),
+    ('notes', 'نکات'),
+    ('description', 'توضیحات'),
+    ('source', 'منبع'),
+]
+# Fields whose value may run over several lines; the others must sit on one line.
+MULTILINE_FIELDS = {'ingredients', 'instructions'}
+LABELS = re.compile('|'.join(re.escape(label) for _, label in FIELDS))
+FIELD_INDEX = {label: i for i, (_, label) in enumerate(FIELDS)}
+
+
+def _ingredient_lines(value):
+    return [line for line in (ing.strip() for ing in value.replace('\xa0', '').split('\n')) if line]
+
+
+def _recipe(text, end, labels):
+    """Slice one block's fields out of ``text`` given the ``(field, start, end)`` of each label in it.
+
+    A field runs from its label to the first occurrence of the next field's label, like
+    ``label\\s*(.*?)\\s*next_label``; the last one (source) runs to the end of its line.
+    A one-line field that spans lines is retried from the label's next occurrence.
+    """
+    recipe = {}
+    for i, (field, _) in enumerate(FIELDS):
+        value = None
+        for f, _, label_end in labels:
+            if f != i:
+                continue
+            if i + 1 == len(FIELDS):
+                value = text[label_end:end].lstrip().split('\n', 1)[0].strip()
+                break
+            stop = next((s for f, s, _ in labels if f == i + 1 and s >= label_end), None)
+            if stop is None:
+                break
+            candidate = text[label_end:stop].strip()
+            if field in MULTILINE_FIELDS or '\n' not in candidate:
+                value = candidate
+                break
+        if field == 'ingredients' and value is not None:
+            value = _ingredient_lines(value)
+        recipe[field] = value
+    return recipe
+
 
-    text = soup.get_text(separator='\n')
+def iter_recipes_from_text(text):
+    """Yield one recipe per ``نام غذا`` block of a page's text, finding every label in a single scan."""
+    labels = None
+    for match in LABELS.finditer(text):
+        field = FIELD_INDEX[match.group()]
+        if field == 0:
+            if labels is not None:
+                yield _recipe(text, match.start(), labels)
+            labels = []
+        if labels is not None:
+            labels.append((field, match.start(), match.end()))
+    if labels is not None:
+        yield _recipe(text, len(text), labels)
 
+
+@REGISTRY.timer("crawler_parse", site="roostanet")
+def iter_recipes(html, backend=DEFAULT_BACKEND):
+    return iter_recipes_from_text(page_text(html, backend))
+
+
+def parse_recipes(html, backend=DEFAULT_BACKEND):
+    return list(iter_recipes(html, backend))
+
+
+def parse_recipes_regex(text):
+    """The original per-block regex parser, kept as the reference for ``iter_recipes_from_text``."""
     blocks = text.split('نام غذا')[1:]
     recipes = []
     for block in blocks:
@@ -52,14 +144,40 @@ def parse_recipes(html):
     return recipes
 
 
+def write_json_array(path, items):
+    """Write ``items`` as ``json.dump(list(items), f, ensure_ascii=False, indent=2)`` would,
+    one item at a time; returns how many were written."""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in items:
+            f.write(',\n  ' if count else '[\n  ')
+            f.write(json.dumps(item, ensure_ascii=False, indent=2).replace('\n', '\n  '))
+            count += 1
+        f.write('\n]' if count else '[]')
+    return count
+
+
 def main():
-    for city in cities_url.keys():
-        html = fetch_recipe_page(cities_url[city])
-        recipes = parse_recipes(html)
+    parser = argparse.ArgumentParser(description="Crawl roostanet recipes per city.")
+    parser.add_argument("--store", default=None, help="keep fetched pages in this directory and revalidate them")
+    parser.add_argument("--offline", action="store_true", help="replay pages from --store without any network")
+    parser.add_argument("--metrics", default=None,
+                        help="write fetch/parse histograms and counters here at the end "
+                             "(Prometheus text for .prom/.txt, JSON otherwise)")
+    args = parser.parse_args()
+    if args.offline and not args.store:
+        parser.error("--offline requires --store")
+    store = PageStore(args.store, offline=args.offline) if args.store else None
 
-        with open(f'{city}_recipes.json', 'w', encoding='utf-8') as f:
-            json.dump(recipes, f, ensure_ascii=False, indent=2)
-        print(f"Extracted {len(recipes)} recipes. Saved to {city}_recipes.json")
+    for city in cities_url.keys():
+        html = fetch_recipe_page(cities_url[city], store)
+        count = write_json_array(f'{city}_recipes.json', iter_recipes(html))
+        print(f"Extracted {count} recipes. Saved to {city}_recipes.json")
+    if store:
+        print(f"Page store: {store.summary()}")
+    if args.metrics:
+        REGISTRY.write(args.metrics)
+        print(f"Metrics written to {args.metrics}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,282 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin
+
+CRAWLER_DIR = os.path.dirname(os.path.abspath(__file__))
+for site_dir in ("ghazaland", "roostanet", "wiki_book"):
+    sys.path.append(os.path.join(CRAWLER_DIR, site_dir))
+
+import crawler_ghazaland
+import crawler_roostanet
+import crawler_wiki_book
+from async_fetch import AsyncFetcher, FetchError
+from frontier import Frontier, DONE, FAILED, PENDING
+from page_store import PageStore
+from pipeline import ParseStage, StageStats
+from metrics import REGISTRY
+
+Records = List[Dict]
+Links = List[Tuple[str, str]]
+
+
+@dataclass
+class Site:
+    """How the scheduler crawls one site.
+
+    ``seeds`` yields ``(url, kind, city)`` start pages; ``handle(kind, url, html)`` returns the
+    records parsed from a page and the ``(url, kind)`` links to crawl next, which inherit the
+    page's city. Outputs are written per city as ``<output dir>/<name>/<output_file(city)>``.
+    """
+    name: str
+    seeds: Callable[[], Iterable[Tuple[str, str, Optional[str]]]]
+    handle: Callable[[str, str, str], Tuple[Records, Links]]
+    output_file: Callable[[Optional[str]], str]
+    failure_record: Optional[Callable[[str, str], Dict]] = None
+
+
+def ghazaland_seeds():
+    for city, urls in crawler_ghazaland.cities_map.items():
+        for url in urls:
+            yield url, "listing", city
+
+
+def ghazaland_page(kind, url, html):
+    if kind == "listing":
+        return [], [(urljoin(url, href), "recipe") for href in crawler_ghazaland.parse_foods_urls(html)]
+    return crawler_ghazaland.parse_recipe(html), []
+
+
+def roostanet_seeds():
+    for city, url in crawler_roostanet.cities_url.items():
+        yield url, "city", city
+
+
+def wiki_book_seeds():
+    for url in crawler_wiki_book.recipe_urls:
+        yield url, "recipe", "kordestan"
+
+
+def wiki_book_failure(url, error):
+    return {'url': url, 'error': error, 'title': '', 'ingredients': [], 'instructions': []}
+
+
+SITES = {
+    "ghazaland": Site(
+        "ghazaland", ghazaland_seeds, ghazaland_page,
+        lambda city: f"{crawler_ghazaland.site_prefix}_{city}_recipes.json"),
+    "roostanet": Site(
+        "roostanet", roostanet_seeds,
+        lambda kind, url, html: (crawler_roostanet.parse_recipes(html), []),
+        lambda city: f"{city}_recipes.json"),
+    "wiki_book": Site(
+        "wiki_book", wiki_book_seeds,
+        lambda kind, url, html: ([crawler_wiki_book.parse_recipe_html(html, url)], []),
+        lambda city: f"{city}_recipes.json",
+        wiki_book_failure),
+}
+
+
+def parse_page(site_name, kind, url, html):
+    """Run a site's page handler; module-level so parser processes can receive it."""
+    return SITES[site_name].handle(kind, url, html)
+
+
+class Scheduler:
+    """Crawls every site from one persistent ``Frontier``.
+
+    Fetches go through a shared ``AsyncFetcher``, so each host gets its own concurrency limit
+    and request rate whichever site queued the URL. Fetched pages are parsed by a
+    ``ParseStage`` process pool while the fetchers carry on. A page's records and newly found
+    links are committed together, so a crashed crawl resumes from the pages still pending.
+    """
+
+    def __init__(
+            self,
+            frontier: Frontier,
+            sites: Dict[str, Site] = None,
+            store: PageStore = None,
+            workers: int = 16,
+            max_attempts: int = 3,
+            processes: Optional[int] = None,
+            **fetcher_options
+    ):
+        self.frontier = frontier
+        self.sites = sites or SITES
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.processes = processes
+        self.fetcher_options = fetcher_options
+        self.fetched = 0
+        self.failures = 0
+        self.fetch_stats = StageStats("Fetch", workers)
+        self.parser = None
+
+    def seed(self) -> int:
+        added = 0
+        for site in self.sites.values():
+            for i, (url, kind, city) in enumerate(site.seeds()):
+                added += self.frontier.add(url, site.name, kind, city, f"{i:06d}")
+        return added
+
+    async def _fetch(self, fetcher: AsyncFetcher, url: str) -> str:
+        return await self.store.afetch(url, fetcher) if self.store else await fetcher.fetch(url)
+
+    async def _process(self, fetcher: AsyncFetcher, queue: asyncio.Queue, row) -> bool:
+        """Fetch ``row``'s page and hand it to the parsers; returns whether it was handed over."""
+        url, site_name, kind, city, sort_key = row
+        started = time.perf_counter()
+        try:
+            html = await self._fetch(fetcher, url)
+        except FetchError as e:
+            REGISTRY.counter("crawler_fetch_errors_total", site=site_name, error=type(e).__name__).inc()
+            if self.frontier.failed(url, str(e), self.max_attempts) == PENDING:
+                queue.put_nowait(row)
+            else:
+                self.failures += 1
+                print(f"Failed {url}: {e}")
+            return False
+        self.fetch_stats.add(time.perf_counter() - started)
+        await self.parser.put((queue, row), site_name, kind, url, html)
+        return True
+
+    def _parsed(self, item, result, error):
+        queue, (url, site_name, kind, city, sort_key) = item
+        try:
+            if error is not None:
+                REGISTRY.counter("crawler_parse_errors_total", site=site_name, error=type(error).__name__).inc()
+                self.frontier.failed(url, f"{type(error).__name__}: {error}", 1)
+                self.failures += 1
+                print(f"Failed to parse {url}: {type(error).__name__}: {error}")
+                return
+            records, links = result
+            REGISTRY.counter("crawler_records_total", site=site_name).inc(len(records))
+            children = [(link, site_name, link_kind, city, f"{sort_key}.{i:06d}")
+                        for i, (link, link_kind) in enumerate(links)]
+            for child in self.frontier.done(url, records, children):
+                queue.put_nowait(child)
+        except Exception as e:
+            self._unexpected(queue, item[1], e, 1)
+        finally:
+            queue.task_done()
+
+    def _unexpected(self, queue: asyncio.Queue, row, error: Exception, max_attempts: int):
+        """Record a failure outside fetching proper (a page store write, a parser hand-off, a
+        frontier update) so the URL is retried or failed instead of staying pending."""
+        url, site_name = row[0], row[1]
+        REGISTRY.counter("crawler_worker_errors_total", site=site_name, error=type(error).__name__).inc()
+        try:
+            state = self.frontier.failed(url, f"{type(error).__name__}: {error}", max_attempts)
+        except Exception as e:
+            print(f"Failed {url}: {type(error).__name__}: {error} (and could not record it: {e})")
+            self.failures += 1
+            return
+        if state == PENDING:
+            queue.put_nowait(row)
+        else:
+            self.failures += 1
+            print(f"Failed {url}: {type(error).__name__}: {error}")
+
+    async def _worker(self, fetcher: AsyncFetcher, queue: asyncio.Queue):
+        while True:
+            row = await queue.get()
+            handed_over = False
+            try:
+                handed_over = await self._process(fetcher, queue, row)
+            except Exception as e:
+                # Keep the worker alive: once every worker has died, queue.join() never returns.
+                self._unexpected(queue, row, e, self.max_attempts)
+            finally:
+                if not handed_over:
+                    queue.task_done()
+
+    async def run(self):
+        """Crawl until no URL of the selected sites is pending."""
+        queue = asyncio.Queue()
+        for row in self.frontier.pending():
+            if row[1] in self.sites:
+                queue.put_nowait(row)
+        async with AsyncFetcher(**self.fetcher_options) as fetcher, \
+                ParseStage(parse_page, self._parsed, self.processes) as self.parser:
+            workers = [asyncio.create_task(self._worker(fetcher, queue)) for _ in range(self.workers)]
+            try:
+                await queue.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                self.fetched = fetcher.requests
+
+    def export(self, output_dir: str = ".") -> Dict[str, int]:
+        """Write every site's records per city, in crawl order; returns records written per file."""
+        written = {}
+        for site in self.sites.values():
+            by_city = {}
+            for url, city, state, records, error in self.frontier.results(site.name):
+                if state == DONE:
+                    by_city.setdefault(city, []).extend(records)
+                elif state == FAILED and site.failure_record:
+                    by_city.setdefault(city, []).append(site.failure_record(url, error))
+            os.makedirs(os.path.join(output_dir, site.name), exist_ok=True)
+            for city, records in by_city.items():
+                path = os.path.join(output_dir, site.name, site.output_file(city))
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(records, f, ensure_ascii=False, indent=2)
+                written[path] = len(records)
+        return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl all recipe sites from one resumable URL frontier.")
+    parser.add_argument("--db", default="frontier.sqlite", help="SQLite frontier; rerun with it to resume")
+    parser.add_argument("--site", choices=list(SITES), action="append", help="only crawl these sites")
+    parser.add_argument("--output-dir", default=".", help="outputs go to <dir>/<site>/ with each crawler's names")
+    parser.add_argument("--workers", type=int, default=16, help="pages in flight across all sites")
+    parser.add_argument("--concurrency", type=int, default=4, help="simultaneous requests per host")
+    parser.add_argument("--rate", type=float, default=2.0, help="requests per second per host")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="parser processes (default: one per core, 0 parses on the fetching thread)")
+    parser.add_argument("--max-attempts", type=int, default=3, help="fetch attempts before a URL is marked failed")
+    parser.add_argument("--retry-failed", action="store_true", help="requeue URLs that failed in earlier runs")
+    parser.add_argument("--store", default=None, help="keep fetched pages in this directory and revalidate them")
+    parser.add_argument("--offline", action="store_true", help="replay pages from --store without any network")
+    parser.add_argument("--metrics", default=None,
+                        help="write fetch/parse histograms and counters here at the end "
+                             "(Prometheus text for .prom/.txt, JSON otherwise)")
+    args = parser.parse_args()
+    if args.offline and not args.store:
+        parser.error("--offline requires --store")
+
+    frontier = Frontier(args.db)
+    store = PageStore(args.store, offline=args.offline) if args.store else None
+    scheduler = Scheduler(
+        frontier, {name: SITES[name] for name in args.site or SITES}, store, args.workers, args.max_attempts,
+        args.processes, per_host_concurrency=args.concurrency, rate=args.rate)
+    if args.retry_failed:
+        print(f"Requeued {frontier.retry_failed()} failed URLs")
+    print(f"Seeded {scheduler.seed()} new URLs; frontier: {frontier.stats()}")
+
+    started = time.perf_counter()
+    asyncio.run(scheduler.run())
+    print(f"Crawl took {time.perf_counter() - started:.1f}s: {scheduler.fetched} pages fetched, "
+          f"{scheduler.failures} URLs failed; frontier: {frontier.stats()}")
+    print(scheduler.fetch_stats.summary())
+    print(scheduler.parser.summary())
+    if store:
+        print(f"Page store: {store.summary()}")
+    for path, count in scheduler.export(args.output_dir).items():
+        print(f"Extracted {count} recipes. Saved to {path}")
+    frontier.close()
+    if args.metrics:
+        REGISTRY.write(args.metrics)
+        print(f"Metrics written to {args.metrics}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ghazaland"))
+from crawler_ghazaland import crawl_city
+from async_fetch import AsyncFetcher
+from fixture_server import FixtureServer, ghazaland_pages
+
+LISTINGS = ["/recipe-cuisine/ardabil/page/1/", "/recipe-cuisine/ardabil/page/2/"]
+
+
+def crawl(server, **fetcher_options):
+    async def run():
+        async with AsyncFetcher(**fetcher_options) as fetcher:
+            return await crawl_city(fetcher, [server.url(path) for path in LISTINGS])
+    return asyncio.run(run())
+
+
+def fixture(**options):
+    server = FixtureServer({}, **options)
+    server.pages.update(ghazaland_pages(server.base_url, listings=2, recipes_per_listing=5))
+    return server
+
+
+def test_crawl_city_returns_recipes_in_listing_order():
+    with fixture() as server:
+        recipes = crawl(server, per_host_concurrency=4, rate=1000, burst=10)
+    assert [recipe["name"] for recipe in recipes] == [f"ardabil {n}-{i}" for n in (1, 2) for i in range(5)]
+    assert recipes[0]["ingredients"] == ["rice", "ardabil 1-0 spices"]
+    assert recipes[0]["source"] == server.url("/recipe/ardabil-1-0/")
+    assert len(server.requests()) == 12
+
+
+def test_per_host_concurrency_limit():
+    with fixture(default_delay=0.05) as server:
+        crawl(server, per_host_concurrency=2, rate=1000, burst=10)
+    # Never more than two requests at once, but the two slots are actually used.
+    assert server.max_in_flight == 2
+
+
+def test_token_bucket_rate():
+    rate = 20
+    with fixture() as server:
+        crawl(server, per_host_concurrency=4, rate=rate, burst=1)
+    starts = [started for _, started, _ in server.requests()]
+    # 12 requests at 20/s with no burst take at least 11 intervals of 50ms.
+    assert starts[-1] - starts[0] >= (len(starts) - 1) / rate * 0.9
+    assert starts[-1] - starts[0] < (len(starts) - 1) / rate + 1.0
+
+
+def test_recipes_are_fetched_while_other_listings_load():
+    # The second listing is slow: the first listing's recipes should not wait for it.
+    with fixture(delays={LISTINGS[1]: 0.5}, default_delay=0.01) as server:
+        crawl(server, per_host_concurrency=4, rate=1000, burst=10)
+    slow_listing_ended = next(ended for path, _, ended in server.requests() if path == LISTINGS[1])
+    first_recipes = server.requests("/recipe/ardabil-1-")
+    assert len(first_recipes) == 5
+    assert all(ended < slow_listing_ended for _, _, ended in first_recipes)
+
+
+def test_a_failing_listing_only_loses_its_own_recipes():
+    with fixture() as server:
+        del server.pages[LISTINGS[0]]
+        recipes = crawl(server, per_host_concurrency=4, rate=1000, burst=10)
+    assert [recipe["name"] for recipe in recipes] == [f"ardabil 2-{i}" for i in range(5)]
@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import scheduler
+from fixture_server import FixtureServer, ghazaland_pages
+from frontier import Frontier
+
+LISTINGS = ["/recipe-cuisine/ardabil/page/1/", "/recipe-cuisine/ardabil/page/2/"]
+
+
+class BrokenStore:
+    """Fetches through the fetcher but fails, as a full disk would, on the ``broken`` URLs."""
+
+    def __init__(self, broken):
+        self.broken = broken
+        self.calls = {}
+
+    async def afetch(self, url, fetcher):
+        self.calls[url] = self.calls.get(url, 0) + 1
+        if url in self.broken:
+            raise OSError(28, "No space left on device")
+        return await fetcher.fetch(url)
+
+
+def test_unexpected_errors_fail_the_url_and_keep_workers_alive(tmp_path, monkeypatch):
+    with FixtureServer({}) as server:
+        server.pages.update(ghazaland_pages(server.base_url, listings=2, recipes_per_listing=3))
+        site = scheduler.Site(
+            "ghazaland", lambda: [(server.url(path), "listing", "ardabil") for path in LISTINGS],
+            scheduler.ghazaland_page, lambda city: f"{city}.json")
+        monkeypatch.setitem(scheduler.SITES, "ghazaland", site)
+        broken = {server.url("/recipe/ardabil-1-0/"), server.url("/recipe/ardabil-2-2/")}
+        store = BrokenStore(broken)
+        frontier = Frontier(str(tmp_path / "frontier.sqlite"))
+        crawl = scheduler.Scheduler(frontier, {"ghazaland": site}, store=store, workers=1, max_attempts=2,
+                                    rate=1000, burst=10)
+        crawl.seed()
+        # A single worker keeps draining the queue after each unexpected error.
+        asyncio.run(asyncio.wait_for(crawl.run(), 30))
+
+    assert frontier.stats() == {"pending": 0, "done": 6, "failed": 2}
+    assert crawl.failures == 2
+    assert all(store.calls[url] == 2 for url in broken)
+    frontier.close()
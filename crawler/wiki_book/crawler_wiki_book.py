@@ -1,10 +1,47 @@
+import argparse
+import hashlib
+import os
+import sys
+
 import requests
 from bs4 import BeautifulSoup
 import json
 import re
 
-def fetch_html(url):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+from async_fetch import record_response
+from metrics import REGISTRY
+from page_store import PageStore
+import html_backend
+from html_backend import DEFAULT_BACKEND
+
+recipe_urls = [
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D8%A7%D9%88%D9%85%D8%A7%D8%AC',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D9%82%D9%88%D8%B1%D9%85%D9%87_%D8%A2%D8%B0%D8%B1%DB%8C',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D8%AF%D9%88%D8%BA',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%A8%DA%AF%D9%88%D8%B4%D8%AA_%D8%BA%D9%88%D8%B1%D9%87',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D9%BE%D8%B1%D9%BE%D9%88%D9%84%D9%87',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D8%AF%D8%A7%D9%86%D9%87_%DA%A9%D9%88%D9%84%D8%A7%D9%86%D9%87',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D8%B9%D8%AF%D8%B3_%D8%A8%D9%84%D8%BA%D9%88%D8%B1',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D9%87%D8%A7%D9%84%D8%A7%D9%88',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D8%B3%D9%87_%D9%86%DA%AF%D9%87_%D8%B3%DB%8C%D8%B1',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A8%D8%B1%D9%88%DB%8C%D8%B4%DB%8C%D9%86',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%AE%D9%88%D8%B1%D8%B4_%D8%AA%D8%B1%D9%87',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%AE%D9%88%D8%B1%D8%B4_%D8%B1%DB%8C%D9%88%D8%A7%D8%B3',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%AF%D9%86%D8%AF%D9%87_%DA%A9%D8%A8%D8%A7%D8%A8',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%B4%D9%84%DA%A9%DB%8C%D9%86%D9%87',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%B9%D8%AF%D8%B3%DB%8C_%D8%A8%D8%A7_%D8%B1%D8%B4%D8%AA%D9%87',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D9%82%D8%A7%DB%8C%D8%B1%D9%85%D9%87',
+    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%DA%A9%D9%87_%D9%84%D8%A7%D9%86%D9%87'
+]
+
+@REGISTRY.timer("crawler_fetch", site="wiki_book")
+def fetch_html(url, store=None):
+    if store:
+        return store.fetch(url)
     resp = requests.get(url)
+    record_response(url, resp.status_code, len(resp.content))
     resp.raise_for_status()
     return resp.text
 
@@ -24,8 +61,32 @@ def extract_list_from_element(elem):
     parts = [part.strip() for part in raw.split('\n') if part.strip()]
     return parts
 
-def parse_recipe_page(url):
-    html = fetch_html(url)
+def extract_list_from_element_lxml(elem):
+    items = []
+    if elem is None:
+        return items
+    for tag in elem.xpath('ul|ol'):
+        for li in tag.iter('li'):
+            text = html_backend.text(li, strip=True)
+            if text:
+                items.append(text)
+        if items:
+            return items
+
+    raw = html_backend.text(elem, separator="\n")
+    parts = [part.strip() for part in raw.split('\n') if part.strip()]
+    return parts
+
+def parse_recipe_page(url, store=None, backend=DEFAULT_BACKEND):
+    return parse_recipe_html(fetch_html(url, store), url, backend)
+
+@REGISTRY.timer("crawler_parse", site="wiki_book")
+def parse_recipe_html(html, url, backend=DEFAULT_BACKEND):
+    if backend == 'lxml':
+        return parse_recipe_html_lxml(html, url)
+    return parse_recipe_html_bs4(html, url)
+
+def parse_recipe_html_bs4(html, url):
     soup = BeautifulSoup(html, 'html.parser')
 
     title_tag = soup.find(['h1', 'h2'])
@@ -70,47 +131,148 @@ def parse_recipe_page(url):
     }
 
 
-def crawl_recipes(urls, output_file='kordestan_recipes.json'):
+def parse_recipe_html_lxml(html, url):
+    root = html_backend.parse(html)
+
+    title_tag = next(iter(root.xpath('(//h1|//h2)[1]')), None)
+    title = html_backend.text(title_tag, strip=True) if title_tag is not None else ''
+
+    content = next(iter(root.xpath(f"//div[{html_backend.has_class('mw-parser-output')}]")), root)
+    headers = content.xpath('.//*[self::h2 or self::h3 or self::h4 or self::p]')
+
+    ingredients = []
+    ing_header = next((tag for tag in headers if 'مواد لازم' in html_backend.text(tag)), None)
+    if ing_header is not None:
+        target = next(iter(ing_header.xpath('following-sibling::*[1]')), None)
+        ingredients = extract_list_from_element_lxml(target)
+
+    instructions = []
+    instr_section = next(iter(root.xpath("//section[@id='content-collapsible-block-1']")), None)
+    if instr_section is not None:
+        for p in instr_section.iter('p'):
+            text = html_backend.text(p, strip=True)
+            if text:
+                instructions.append(text)
+    else:
+        instr_header = next((tag for tag in headers if 'طرز تهیه' in html_backend.text(tag)), None)
+        if instr_header is not None:
+            for sib in instr_header.xpath('following-sibling::*'):
+                if re.match(r'h[1-6]', sib.tag):
+                    break
+                if sib.tag in ['ul','ol','p']:
+                    instructions.extend(extract_list_from_element_lxml(sib))
+
+    instructions = [
+        inst for inst in instructions
+        if not re.match(r'^(مواد لازم|طرز تهیه)', inst)
+    ]
+
+    return {
+        'title': title,
+        'ingredients': ingredients,
+        'instructions': instructions,
+        'url': url
+    }
+
+
+REVISION_ID = re.compile(r'"wgRevisionId"\s*:\s*(\d+)')
+
+
+def page_fingerprint(html):
+    """Content hash of a page plus its MediaWiki revision id when the page embeds one."""
+    revision = REVISION_ID.search(html)
+    return {
+        'sha256': hashlib.sha256(html.encode('utf-8')).hexdigest(),
+        'revision': int(revision.group(1)) if revision else None,
+    }
+
+
+def same_content(old, new):
+    if not old:
+        return False
+    if old.get('revision') is not None and new['revision'] is not None:
+        return old['revision'] == new['revision']
+    return old.get('sha256') == new['sha256']
+
+
+def fingerprints_file(output_file):
+    return os.path.splitext(output_file)[0] + '_fingerprints.json'
+
+
+def load_previous(output_file):
+    """Records of the last run keyed by URL, and the fingerprints their pages had then."""
+    try:
+        with open(output_file, encoding='utf-8') as f:
+            records = {record['url']: record for record in json.load(f)}
+        with open(fingerprints_file(output_file), encoding='utf-8') as f:
+            fingerprints = json.load(f)
+    except FileNotFoundError:
+        return {}, {}
+    return records, fingerprints
+
+
+def crawl_recipes(urls, output_file='kordestan_recipes.json', store=None, full=False):
+    """Crawl ``urls`` into ``output_file``, reparsing only pages whose content changed since
+    the last run unless ``full``; a page that fails to fetch keeps its previous record."""
+    previous, old_fingerprints = ({}, {}) if full else load_previous(output_file)
     results = []
+    fingerprints = {}
+    changed = unchanged = 0
     for url in urls:
         try:
-            data = parse_recipe_page(url)
+            html = fetch_html(url, store)
+            fingerprints[url] = fingerprint = page_fingerprint(html)
+            if url in previous and 'error' not in previous[url] and same_content(old_fingerprints.get(url), fingerprint):
+                results.append(previous[url])
+                unchanged += 1
+                continue
+            data = parse_recipe_html(html, url)
             results.append(data)
+            changed += 1
             print(f"✔ Crawled {url} → {len(data['instructions'])} instructions")
         except Exception as e:
             print(f"✖ Failed {url}: {e}")
-            results.append({
+            if url in previous and 'error' not in previous[url]:
+                results.append(previous[url])
+                fingerprints[url] = old_fingerprints.get(url)
+                continue
+            error = {
                 'url': url,
                 'error': str(e),
                 'title': '',
                 'ingredients': [],
                 'instructions': []
-            })
+            }
+            changed += previous.get(url) != error
+            results.append(error)
 
-    # ذخیره در JSON
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
-    print(f"\n✅ All done! Results saved to '{output_file}'")
+    print(f"{changed} pages changed, {unchanged} unchanged")
+    if changed or list(previous) != list(urls):
+        # ذخیره در JSON
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ All done! Results saved to '{output_file}'")
+    else:
+        print(f"\n✅ All done! '{output_file}' is up to date")
+    with open(fingerprints_file(output_file), 'w', encoding='utf-8') as f:
+        json.dump(fingerprints, f, ensure_ascii=False, indent=2)
+    if store:
+        print(f"Page store: {store.summary()}")
 
 if __name__ == '__main__':
-    urls = [
-    'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D8%A7%D9%88%D9%85%D8%A7%D8%AC',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D9%82%D9%88%D8%B1%D9%85%D9%87_%D8%A2%D8%B0%D8%B1%DB%8C',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D8%AF%D9%88%D8%BA',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%A8%DA%AF%D9%88%D8%B4%D8%AA_%D8%BA%D9%88%D8%B1%D9%87',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D9%BE%D8%B1%D9%BE%D9%88%D9%84%D9%87',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D8%AF%D8%A7%D9%86%D9%87_%DA%A9%D9%88%D9%84%D8%A7%D9%86%D9%87',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D8%B9%D8%AF%D8%B3_%D8%A8%D9%84%D8%BA%D9%88%D8%B1',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D9%87%D8%A7%D9%84%D8%A7%D9%88',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A2%D8%B4_%D8%B3%D9%87_%D9%86%DA%AF%D9%87_%D8%B3%DB%8C%D8%B1',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%A8%D8%B1%D9%88%DB%8C%D8%B4%DB%8C%D9%86',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%AE%D9%88%D8%B1%D8%B4_%D8%AA%D8%B1%D9%87',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%AE%D9%88%D8%B1%D8%B4_%D8%B1%DB%8C%D9%88%D8%A7%D8%B3',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%AF%D9%86%D8%AF%D9%87_%DA%A9%D8%A8%D8%A7%D8%A8',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%B4%D9%84%DA%A9%DB%8C%D9%86%D9%87',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D8%B9%D8%AF%D8%B3%DB%8C_%D8%A8%D8%A7_%D8%B1%D8%B4%D8%AA%D9%87',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%D9%82%D8%A7%DB%8C%D8%B1%D9%85%D9%87',
-        'https://fa.m.wikibooks.org/wiki/%DA%A9%D8%AA%D8%A7%D8%A8_%D8%A2%D8%B4%D9%BE%D8%B2%DB%8C/%DA%A9%D9%87_%D9%84%D8%A7%D9%86%D9%87'
-    ]
+    parser = argparse.ArgumentParser(description="Crawl Kurdish recipes from the Persian wikibooks cookbook.")
+    parser.add_argument("--store", default=None, help="keep fetched pages in this directory and revalidate them")
+    parser.add_argument("--offline", action="store_true", help="replay pages from --store without any network")
+    parser.add_argument("--full", action="store_true", help="reparse every page even if it has not changed")
+    parser.add_argument("--metrics", default=None,
+                        help="write fetch/parse histograms and counters here at the end "
+                             "(Prometheus text for .prom/.txt, JSON otherwise)")
+    args = parser.parse_args()
+    if args.offline and not args.store:
+        parser.error("--offline requires --store")
 
-    crawl_recipes(urls)
+    crawl_recipes(recipe_urls, store=PageStore(args.store, offline=args.offline) if args.store else None,
+                  full=args.full)
+    if args.metrics:
+        REGISTRY.write(args.metrics)
+        print(f"Metrics written to {args.metrics}")
@@ -0,0 +1,64 @@
+import json
+from typing import Dict, List, Any, Iterable, Iterator, Tuple, Collection
+
+from json_stream import JsonStructureError, validate
+from rate_limit import estimate_text_tokens
+
+BATCH_CONTRACT = """You will receive several input recipes at once as a JSON array whose elements look like
+{"id": <number>, "input": <recipe JSON>}. Apply the transformation rules above to every element independently.
+Respond only with a JSON array containing exactly one element per input, in the form
+{"id": <the same id>, "output": <transformed JSON>}. Do not merge, skip or reorder recipes."""
+
+
+def pack_batches(
+        indexed_items: Iterable[Tuple[int, Dict[str, Any]]],
+        token_budget: int,
+        max_size: int
+) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    """Group ``(index, item)`` pairs so each group's input stays under ``token_budget`` tokens."""
+    group, used = [], 0
+    for index, item in indexed_items:
+        cost = estimate_text_tokens(json.dumps(item, ensure_ascii=False))
+        if group and (len(group) >= max_size or used + cost > token_budget):
+            yield group
+            group, used = [], 0
+        group.append((index, item))
+        used += cost
+    if group:
+        yield group
+
+
+def build_batch_messages(system_prompt: str, group: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, str]]:
+    payload = json.dumps([{"id": index, "input": item} for index, item in group], ensure_ascii=False)
+    return [
+        {
+            "role": "system",
+            "content": system_prompt
+        },
+        {
+            "role": "system",
+            "content": BATCH_CONTRACT
+        },
+        {
+            "role": "user",
+            "content": "Here are the input JSON objects:\n```json\n" + payload + "\n```"
+        }
+    ]
+
+
+def split_batch_response(text: str, ids: Collection[int], schema: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+    """Map each requested id to its transformed record; ids with missing or invalid output are left out."""
+    start = text.find("[")
+    if start < 0:
+        raise ValueError(f"No JSON array found in batch response:\n{text}")
+    entries, _ = json.JSONDecoder().raw_decode(text, start)
+    outputs = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict) or entry.get("id") not in ids or entry["id"] in outputs:
+            continue
+        try:
+            validate(entry.get("output"), schema)
+        except JsonStructureError:
+            continue
+        outputs[entry["id"]] = entry["output"]
+    return outputs
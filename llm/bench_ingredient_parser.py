@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import time
+from fractions import Fraction
+
+from ingredient_parser import parse_ingredient, canonical_unit
+from persian import PERSIAN_DIGITS, normalize
+from rate_limit import estimate_text_tokens
+
+DEFAULT_INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output", "aggregated_with_id.json")
+
+
+def to_persian_digits(text: str) -> str:
+    return "".join(PERSIAN_DIGITS[int(ch)] if ch.isdigit() else ch for ch in text)
+
+
+def raw_line(ingredient) -> str:
+    """Rebuild a crawler-style ``"name: amount unit"`` line from an LLM-produced ingredient."""
+    amount = ingredient.get("amount")
+    if isinstance(amount, (int, float)):
+        if float(amount).is_integer():
+            amount = str(int(amount))
+        else:
+            fraction = Fraction(amount).limit_denominator(8)
+            amount = f"{fraction.numerator}/{fraction.denominator}"
+        amount = to_persian_digits(amount)
+    quantity = " ".join(str(part) for part in (amount, ingredient.get("unit")) if part)
+    return f"{ingredient.get('name', '')}: {quantity}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local ingredient parser against the LLM's output.")
+    parser.add_argument("--input", default=DEFAULT_INPUT)
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the corpus for the timing run")
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") as f:
+        records = json.load(f)
+    expected = [ingredient for record in records for ingredient in record.get("ingredients", [])]
+    lines = [raw_line(ingredient) for ingredient in expected]
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        parsed = [parse_ingredient(line) for line in lines]
+    elapsed = time.perf_counter() - started
+
+    same_name = same_amount = same_unit = 0
+    for want, got in zip(expected, parsed):
+        same_name += normalize(str(want.get("name") or "")) == normalize(got["name"])
+        amount = want.get("amount")
+        if isinstance(amount, (int, float)):
+            same_amount += got["amount"] is not None and abs(got["amount"] - amount) < 0.01
+        else:
+            same_amount += got["amount"] is None
+        want_unit = amount if isinstance(amount, str) and not want.get("unit") else want.get("unit")
+        same_unit += canonical_unit(want_unit) == canonical_unit(got["unit"])
+
+    total = len(lines)
+    saved = estimate_text_tokens(json.dumps(parsed, ensure_ascii=False))
+    print(f"Ingredients:         {total} from {len(records)} recipes")
+    print(f"Throughput:          {total * args.repeat / elapsed:,.0f} lines/s "
+          f"({elapsed / (total * args.repeat) * 1e6:.1f} µs/line)")
+    print(f"Round-trip vs LLM:   name {same_name / total:.1%}, amount {same_amount / total:.1%}, "
+          f"unit {same_unit / total:.1%}")
+    print(f"Completion tokens no longer generated by the model: ~{saved} ({saved / len(records):.0f}/recipe)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any
+
+
+class ResponseCache:
+    """Persistent SQLite store of raw completion bodies keyed by a hash of the request.
+
+    Entries are evicted least-recently-used first once their total size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, path: str = "llm_cache.sqlite", max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, body TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self._evict()
+
+    @staticmethod
+    def make_key(**request: Any) -> str:
+        canonical = json.dumps(request, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def put(self, key: str, body: str):
+        size = len(body.encode("utf-8"))
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, body, size, time.time()))
+            self._size += size - (row[0] if row else 0)
+            self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes:
+            victims = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 64").fetchall()
+            if not victims:
+                break
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key, _ in victims])
+            self._size -= sum(size for _, size in victims)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": self._size}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,90 @@
+import json
+import os
+from typing import Dict, Any, Iterator
+
+
+class JsonlCheckpoint:
+    """Append-only JSONL output plus a checkpoint of the input indexes already written.
+
+    Every record is appended to ``path`` and flushed before ``<index> <output length>`` is
+    appended to the checkpoint file. Reopening truncates the output back to the last
+    checkpointed length, so a record torn by a crash is dropped and simply redone. An output
+    without a usable checkpoint (deleted, or from an older run) is scanned instead: its
+    complete ``{"index": ...}`` lines are kept and the checkpoint is rebuilt from them.
+    """
+
+    def __init__(self, path: str, checkpoint_path: str = None):
+        self.path = path
+        self.checkpoint_path = checkpoint_path or path + ".ckpt"
+        self.completed = set()
+
+        output_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        output_length, checkpoint_length = 0, 0
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "rb") as f:
+                for line in f:
+                    parts = line.split()
+                    if not line.endswith(b"\n") or len(parts) != 2:
+                        break
+                    self.completed.add(int(parts[0]))
+                    output_length = int(parts[1])
+                    checkpoint_length += len(line)
+
+        rebuilt = []
+        if output_length > output_size or (output_size and not self.completed):
+            # The checkpoint does not describe this output; never throw paid-for lines away.
+            self.completed.clear()
+            output_length, rebuilt = self._scan_output()
+            checkpoint_length = 0
+
+        self._out = open(self.path, "ab")
+        self._out.truncate(output_length)
+        self._out.seek(output_length)
+        self._checkpoint = open(self.checkpoint_path, "ab")
+        self._checkpoint.truncate(checkpoint_length)
+        if rebuilt:
+            self._checkpoint.write("".join(f"{index} {end}\n" for index, end in rebuilt).encode("ascii"))
+            self._checkpoint.flush()
+            os.fsync(self._checkpoint.fileno())
+
+    def _scan_output(self):
+        """Length of the output's complete records and ``(index, end offset)`` for each; only a
+        torn last line is left out."""
+        length, rebuilt = 0, []
+        with open(self.path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                if not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    try:
+                        index = json.loads(line)["index"]
+                    except (ValueError, KeyError, TypeError):
+                        index = None
+                    if not isinstance(index, int):
+                        raise ValueError(f"{self.path}:{number} is not a checkpointed record; "
+                                         f"refusing to overwrite it")
+                    self.completed.add(index)
+                    rebuilt.append((index, length + len(line)))
+                length += len(line)
+        return length, rebuilt
+
+    def write(self, index: int, record: Dict[str, Any]):
+        line = json.dumps({"index": index, "record": record}, ensure_ascii=False) + "\n"
+        self._out.write(line.encode("utf-8"))
+        self._out.flush()
+        os.fsync(self._out.fileno())
+        self._checkpoint.write(f"{index} {self._out.tell()}\n".encode("ascii"))
+        self._checkpoint.flush()
+        os.fsync(self._checkpoint.fileno())
+        self.completed.add(index)
+
+    def close(self):
+        self._out.close()
+        self._checkpoint.close()
+
+
+def iter_jsonl_records(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,302 @@
+import argparse
+import bisect
+import json
+import time
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from persian import normalize
+
+# Province -> capital, plus other spellings (English names, older or shortened forms).
+PROVINCES = {
+    "آذربایجان شرقی": ("تبریز", ["East Azerbaijan", "آذربایجان خاوری"]),
+    "آذربایجان غربی": ("ارومیه", ["West Azerbaijan", "آذربایجان باختری"]),
+    "اردبیل": ("اردبیل", ["Ardabil"]),
+    "اصفهان": ("اصفهان", ["Isfahan", "Esfahan"]),
+    "البرز": ("کرج", ["Alborz"]),
+    "ایلام": ("ایلام", ["Ilam"]),
+    "بوشهر": ("بوشهر", ["Bushehr"]),
+    "تهران": ("تهران", ["Tehran"]),
+    "چهارمحال و بختیاری": ("شهرکرد", ["Chaharmahal and Bakhtiari", "چهارمحال بختیاری"]),
+    "خراسان جنوبی": ("بیرجند", ["South Khorasan"]),
+    "خراسان رضوی": ("مشهد", ["Razavi Khorasan", "خراسان"]),
+    "خراسان شمالی": ("بجنورد", ["North Khorasan"]),
+    "خوزستان": ("اهواز", ["Khuzestan"]),
+    "زنجان": ("زنجان", ["Zanjan"]),
+    "سمنان": ("سمنان", ["Semnan"]),
+    "سیستان و بلوچستان": ("زاهدان", ["Sistan and Baluchestan", "سیستان بلوچستان"]),
+    "فارس": ("شیراز", ["Fars"]),
+    "قزوین": ("قزوین", ["Qazvin"]),
+    "قم": ("قم", ["Qom"]),
+    "کردستان": ("سنندج", ["Kurdistan", "Kordestan"]),
+    "کرمان": ("کرمان", ["Kerman"]),
+    "کرمانشاه": ("کرمانشاه", ["Kermanshah", "باختران"]),
+    "کهگیلویه و بویراحمد": ("یاسوج", ["Kohgiluyeh and Boyer-Ahmad", "کهگیلویه بویراحمد"]),
+    "گلستان": ("گرگان", ["Golestan"]),
+    "گیلان": ("رشت", ["Gilan", "Guilan"]),
+    "لرستان": ("خرم‌آباد", ["Lorestan"]),
+    "مازندران": ("ساری", ["Mazandaran"]),
+    "مرکزی": ("اراک", ["Markazi"]),
+    "هرمزگان": ("بندرعباس", ["Hormozgan"]),
+    "همدان": ("همدان", ["Hamadan"]),
+    "یزد": ("یزد", ["Yazd"]),
+}
+
+# City, province, latitude, longitude, other spellings.
+CITIES = [
+    ("تبریز", "آذربایجان شرقی", 38.0800, 46.2919, ["Tabriz"]),
+    ("مراغه", "آذربایجان شرقی", 37.3917, 46.2392, ["Maragheh"]),
+    ("مرند", "آذربایجان شرقی", 38.4329, 45.7749, ["Marand"]),
+    ("میانه", "آذربایجان شرقی", 37.4211, 47.7150, ["Mianeh"]),
+    ("اهر", "آذربایجان شرقی", 38.4774, 47.0699, ["Ahar"]),
+    ("سراب", "آذربایجان شرقی", 37.9408, 47.5367, ["Sarab"]),
+    ("بناب", "آذربایجان شرقی", 37.3404, 46.0561, ["Bonab"]),
+    ("آذرشهر", "آذربایجان شرقی", 37.7589, 45.9783, ["Azarshahr"]),
+    ("شبستر", "آذربایجان شرقی", 38.1803, 45.7028, ["Shabestar"]),
+    ("جلفا", "آذربایجان شرقی", 38.9403, 45.6308, ["Jolfa"]),
+    ("ارومیه", "آذربایجان غربی", 37.5527, 45.0761, ["Urmia", "Orumiyeh"]),
+    ("مهاباد", "آذربایجان غربی", 36.7631, 45.7222, ["Mahabad"]),
+    ("نقده", "آذربایجان غربی", 36.9553, 45.3880, ["Naqadeh"]),
+    ("خوی", "آذربایجان غربی", 38.5503, 44.9521, ["Khoy"]),
+    ("میاندوآب", "آذربایجان غربی", 36.9694, 46.1028, ["Miandoab"]),
+    ("سلماس", "آذربایجان غربی", 38.1973, 44.7653, ["Salmas"]),
+    ("بوکان", "آذربایجان غربی", 36.5210, 46.2089, ["Bukan"]),
+    ("ماکو", "آذربایجان غربی", 39.2953, 44.5162, ["Maku"]),
+    ("پیرانشهر", "آذربایجان غربی", 36.6944, 45.1417, ["Piranshahr"]),
+    ("سردشت", "آذربایجان غربی", 36.1553, 45.4794, ["Sardasht"]),
+    ("تکاب", "آذربایجان غربی", 36.4009, 47.1133, ["Takab"]),
+    ("اردبیل", "اردبیل", 38.2498, 48.2933, ["Ardabil"]),
+    ("خلخال", "اردبیل", 37.6189, 48.5258, ["Khalkhal"]),
+    ("سرعین", "اردبیل", 38.1484, 48.0715, ["Sareyn", "Sarein"]),
+    ("هشتجین", "اردبیل", 37.3636, 48.3236, ["Hashtjin"]),
+    ("گیوی", "اردبیل", 37.6803, 48.3394, ["Givi", "کوثر"]),
+    ("مشگین‌شهر", "اردبیل", 38.3989, 47.6819, ["Meshginshahr", "مشکین‌شهر"]),
+    ("پارس‌آباد", "اردبیل", 39.6482, 47.9174, ["Parsabad"]),
+    ("گرمی", "اردبیل", 39.0373, 48.0800, ["Germi"]),
+    ("نمین", "اردبیل", 38.4269, 48.4839, ["Namin"]),
+    ("نیر", "اردبیل", 38.0347, 47.9986, ["Nir"]),
+    ("بیله‌سوار", "اردبیل", 39.3568, 48.3551, ["Bileh Savar"]),
+    ("اصفهان", "اصفهان", 32.6539, 51.6660, ["Isfahan", "Esfahan"]),
+    ("کاشان", "اصفهان", 33.9850, 51.4100, ["Kashan"]),
+    ("کرج", "البرز", 35.8400, 50.9391, ["Karaj"]),
+    ("ایلام", "ایلام", 33.6374, 46.4227, ["Ilam"]),
+    ("بوشهر", "بوشهر", 28.9234, 50.8203, ["Bushehr"]),
+    ("تهران", "تهران", 35.6892, 51.3890, ["Tehran"]),
+    ("شهرکرد", "چهارمحال و بختیاری", 32.3256, 50.8644, ["Shahrekord"]),
+    ("بیرجند", "خراسان جنوبی", 32.8649, 59.2262, ["Birjand"]),
+    ("مشهد", "خراسان رضوی", 36.2605, 59.6168, ["Mashhad"]),
+    ("نیشابور", "خراسان رضوی", 36.2133, 58.7958, ["Nishapur", "Neyshabur"]),
+    ("سبزوار", "خراسان رضوی", 36.2126, 57.6819, ["Sabzevar"]),
+    ("بجنورد", "خراسان شمالی", 37.4750, 57.3290, ["Bojnurd"]),
+    ("اهواز", "خوزستان", 31.3183, 48.6706, ["Ahvaz"]),
+    ("آبادان", "خوزستان", 30.3392, 48.3043, ["Abadan"]),
+    ("دزفول", "خوزستان", 32.3811, 48.4058, ["Dezful"]),
+    ("زنجان", "زنجان", 36.6736, 48.4787, ["Zanjan"]),
+    ("ابهر", "زنجان", 36.1468, 49.2180, ["Abhar"]),
+    ("خرمدره", "زنجان", 36.2031, 49.1914, ["Khorramdarreh"]),
+    ("قیدار", "زنجان", 36.1190, 48.5903, ["Qeydar"]),
+    ("ماهنشان", "زنجان", 36.7444, 47.6725, ["Mahneshan"]),
+    ("آب‌بر", "زنجان", 36.9246, 48.9560, ["Ab Bar", "طارم"]),
+    ("سمنان", "سمنان", 35.5769, 53.3953, ["Semnan"]),
+    ("زاهدان", "سیستان و بلوچستان", 29.4963, 60.8629, ["Zahedan"]),
+    ("شیراز", "فارس", 29.5918, 52.5837, ["Shiraz"]),
+    ("کازرون", "فارس", 29.6195, 51.6541, ["Kazerun"]),
+    ("قزوین", "قزوین", 36.2688, 50.0041, ["Qazvin"]),
+    ("قم", "قم", 34.6416, 50.8746, ["Qom"]),
+    ("سنندج", "کردستان", 35.3144, 46.9923, ["Sanandaj"]),
+    ("بیجار", "کردستان", 35.8668, 47.6051, ["Bijar"]),
+    ("سقز", "کردستان", 36.2499, 46.2735, ["Saqqez"]),
+    ("مریوان", "کردستان", 35.5219, 46.1760, ["Marivan"]),
+    ("بانه", "کردستان", 35.9975, 45.8853, ["Baneh"]),
+    ("قروه", "کردستان", 35.1679, 47.8038, ["Qorveh"]),
+    ("کامیاران", "کردستان", 34.7956, 46.9355, ["Kamyaran"]),
+    ("دیواندره", "کردستان", 35.9139, 47.0239, ["Divandarreh"]),
+    ("کرمان", "کرمان", 30.2839, 57.0834, ["Kerman"]),
+    ("بم", "کرمان", 29.1060, 58.3570, ["Bam"]),
+    ("رفسنجان", "کرمان", 30.4067, 55.9939, ["Rafsanjan"]),
+    ("کرمانشاه", "کرمانشاه", 34.3142, 47.0650, ["Kermanshah", "باختران"]),
+    ("یاسوج", "کهگیلویه و بویراحمد", 30.6682, 51.5880, ["Yasuj"]),
+    ("گرگان", "گلستان", 36.8427, 54.4439, ["Gorgan"]),
+    ("گنبد کاووس", "گلستان", 37.2500, 55.1672, ["Gonbad-e Kavus", "گنبد"]),
+    ("رشت", "گیلان", 37.2808, 49.5832, ["Rasht"]),
+    ("رودبار", "گیلان", 36.8233, 49.4247, ["Rudbar"]),
+    ("فومن", "گیلان", 37.2240, 49.3125, ["Fuman"]),
+    ("لاهیجان", "گیلان", 37.2072, 50.0039, ["Lahijan"]),
+    ("بندر انزلی", "گیلان", 37.4727, 49.4622, ["Bandar Anzali", "انزلی"]),
+    ("آستارا", "گیلان", 38.4291, 48.8720, ["Astara"]),
+    ("تالش", "گیلان", 37.8016, 48.9075, ["Talesh", "هشتپر"]),
+    ("لنگرود", "گیلان", 37.1970, 50.1538, ["Langarud"]),
+    ("آستانه اشرفیه", "گیلان", 37.2595, 49.9444, ["Astaneh-ye Ashrafiyeh"]),
+    ("رودسر", "گیلان", 37.1379, 50.2880, ["Rudsar"]),
+    ("صومعه‌سرا", "گیلان", 37.3117, 49.3219, ["Sowme'eh Sara"]),
+    ("ماسال", "گیلان", 37.3621, 49.1318, ["Masal"]),
+    ("ماسوله", "گیلان", 37.1539, 48.9886, ["Masuleh"]),
+    ("رضوانشهر", "گیلان", 37.5507, 49.1400, ["Rezvanshahr"]),
+    ("خرم‌آباد", "لرستان", 33.4878, 48.3558, ["Khorramabad"]),
+    ("بروجرد", "لرستان", 33.8973, 48.7516, ["Borujerd"]),
+    ("ساری", "مازندران", 36.5633, 53.0601, ["Sari"]),
+    ("آمل", "مازندران", 36.4696, 52.3507, ["Amol"]),
+    ("بابل", "مازندران", 36.5386, 52.6786, ["Babol"]),
+    ("رامسر", "مازندران", 36.9031, 50.6583, ["Ramsar"]),
+    ("نوشهر", "مازندران", 36.6490, 51.4960, ["Nowshahr"]),
+    ("چالوس", "مازندران", 36.6550, 51.4206, ["Chalus"]),
+    ("اراک", "مرکزی", 34.0917, 49.6892, ["Arak"]),
+    ("ساوه", "مرکزی", 35.0213, 50.3566, ["Saveh"]),
+    ("بندرعباس", "هرمزگان", 27.1832, 56.2666, ["Bandar Abbas"]),
+    ("قشم", "هرمزگان", 26.9492, 56.2691, ["Qeshm"]),
+    ("همدان", "همدان", 34.7989, 48.5146, ["Hamadan"]),
+    ("ملایر", "همدان", 34.2969, 48.8235, ["Malayer"]),
+    ("یزد", "یزد", 31.8974, 54.3569, ["Yazd"]),
+]
+
+# Words that qualify a place name without being part of it ("استان گیلان", "شهر رشت").
+QUALIFIERS = ("استان ", "شهرستان ", "شهر ")
+# Keys shorter than this are only matched exactly; one edit away they collide too easily.
+MIN_FUZZY_LENGTH = 4
+
+
+class Place(NamedTuple):
+    name: str
+    province: str
+    latitude: float
+    longitude: float
+    kind: str  # "city" or "province"; a province is located at its capital
+
+
+def name_key(text: str) -> str:
+    """Spelling-insensitive form of a place name: normalized Persian letters and digits,
+    alef-madda as alef, no qualifier words, spaces or zero-width non-joiners, lower case."""
+    text = normalize(text or "").lower()
+    for qualifier in QUALIFIERS:
+        if text.startswith(qualifier):
+            text = text[len(qualifier):]
+    return text.replace("آ", "ا").replace(" ", "")
+
+
+def deletions(key: str) -> Iterator[str]:
+    return (key[:i] + key[i + 1:] for i in range(len(key)))
+
+
+class Gazetteer:
+    """Offline lookup of Iranian provinces and cities by name.
+
+    Names are matched exactly after ``name_key`` normalization, then as an unambiguous
+    prefix (``"چهارمحال"``), then within one edit (``"گیلانی"``, ``"اورمیه"``) through an
+    index of single-character deletions, so no lookup scans the table. ``resolve`` results
+    are memoized per ``(province, city)`` pair, so a corpus costs one lookup per distinct
+    location.
+    """
+
+    def __init__(self, provinces: Dict[str, Tuple[str, List[str]]] = PROVINCES,
+                 cities: List[Tuple[str, str, float, float, List[str]]] = CITIES):
+        self._places: Dict[str, List[Place]] = {}
+        self._add_places(cities, provinces)
+        self._keys = sorted(self._places)
+        self._near: Dict[str, List[str]] = {}
+        for key in self._keys:
+            if len(key) >= MIN_FUZZY_LENGTH:
+                for variant in {key, *deletions(key)}:
+                    self._near.setdefault(variant, []).append(key)
+        self._memo: Dict[Tuple[str, str], Tuple[Optional[Place], Optional[Place]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _add_places(self, cities, provinces):
+        located = {}
+        for name, province, latitude, longitude, aliases in cities:
+            place = Place(name, province, latitude, longitude, "city")
+            located[name, province] = place
+            for spelling in [name, *aliases]:
+                self._places.setdefault(name_key(spelling), []).append(place)
+        for province, (capital, aliases) in provinces.items():
+            city = located[capital, province]
+            place = Place(province, province, city.latitude, city.longitude, "province")
+            for spelling in [province, *aliases]:
+                self._places.setdefault(name_key(spelling), []).append(place)
+
+    def lookup(self, name: str) -> List[Place]:
+        """Every place ``name`` may refer to: exact spellings first, then prefix, then fuzzy matches."""
+        key = name_key(name)
+        if not key:
+            return []
+        if key in self._places:
+            return self._places[key]
+        if len(key) < MIN_FUZZY_LENGTH - 1:
+            return []
+        start = bisect.bisect_left(self._keys, key)
+        end = bisect.bisect_left(self._keys, key + "\uffff")
+        prefixed = {place for match in self._keys[start:end] for place in self._places[match]}
+        if len({(place.name, place.kind) for place in prefixed}) == 1:
+            return sorted(prefixed)
+        near = {match for variant in {key, *deletions(key)} for match in self._near.get(variant, ())}
+        return sorted({place for match in near for place in self._places[match]})
+
+    @staticmethod
+    def _pick(places: List[Place], kind: str, province: Optional[Place] = None) -> Optional[Place]:
+        """The one place of ``kind`` among ``places``, preferring those in ``province``; None if ambiguous."""
+        candidates = {place for place in places if place.kind == kind}
+        if province is not None:
+            candidates = {place for place in candidates if place.province == province.name} or candidates
+        return candidates.pop() if len(candidates) == 1 else None
+
+    def resolve(self, province: Optional[str], city: Optional[str]) -> Tuple[Optional[Place], Optional[Place]]:
+        """The province and city places of a location; either may be None when not recognized.
+
+        A city field that only names a province (``"گیلان"``, ``"گیلانی"``) resolves no city, and
+        one that is not a string (a list, a number) resolves nothing.
+        """
+        province = province if isinstance(province, str) else None
+        city = city if isinstance(city, str) else None
+        memo_key = (province or "", city or "")
+        if memo_key in self._memo:
+            self.hits += 1
+            return self._memo[memo_key]
+        self.misses += 1
+        province_place = self._pick(self.lookup(province or ""), "province")
+        city_place = self._pick(self.lookup(city or ""), "city", province_place)
+        if province_place is None and city_place is not None:
+            province_place = self._pick(self.lookup(city_place.province), "province")
+        self._memo[memo_key] = province_place, city_place
+        return province_place, city_place
+
+    def locate(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Post-processing stage: canonical province and city names and coordinates from the
+        table (the city's, else the province capital's) in place of whatever the record had.
+        A location that is not an object is left unresolved."""
+        location = record.get("location")
+        location = dict(location) if isinstance(location, dict) else {}
+        province, city = self.resolve(location.get("province"), location.get("city"))
+        if province is not None:
+            location["province"] = province.name
+        if city is not None:
+            location["city"] = city.name
+        place = city or province
+        location["coordinates"] = {"latitude": place.latitude, "longitude": place.longitude} if place else None
+        return {**record, "location": location}
+
+    def stats(self) -> Dict[str, int]:
+        return {"locations": len(self._memo), "hits": self.hits, "misses": self.misses}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill location coordinates of transformed recipes from the "
+                                                 "offline gazetteer.")
+    parser.add_argument("--input", default="transformed_aggregated.json")
+    parser.add_argument("--output", default=None, help="defaults to overwriting --input")
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") as f:
+        records = json.load(f)
+    gazetteer = Gazetteer()
+    started = time.perf_counter()
+    located = [gazetteer.locate(record) for record in records]
+    elapsed = time.perf_counter() - started
+    with open(args.output or args.input, "w", encoding="utf-8") as f:
+        json.dump(located, f, ensure_ascii=False, indent=2)
+
+    unresolved = sum(record["location"]["coordinates"] is None for record in located)
+    print(f"Located {len(located) - unresolved}/{len(located)} records in {elapsed * 1e3:.1f}ms "
+          f"({elapsed / max(len(located), 1) * 1e6:.1f}µs/record); {gazetteer.stats()}")
+
+
+if __name__ == '__main__':
+    main()
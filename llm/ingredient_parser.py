@@ -0,0 +1,173 @@
+import re
+from typing import Optional, Dict, List, Union, Iterable
+
+from persian import normalize, ZWNJ
+
+Amount = Optional[Union[int, float]]
+
+NUMBER_WORDS = {
+    "یک چهارم": 0.25,
+    "سه چهارم": 0.75,
+    "یک سوم": 1 / 3,
+    "دو سوم": 2 / 3,
+    "یک دوم": 0.5,
+    "نیم": 0.5,
+    "نصف": 0.5,
+    "ربع": 0.25,
+    "یک": 1,
+    "یه": 1,
+    "دو": 2,
+    "سه": 3,
+    "چهار": 4,
+    "پنج": 5,
+    "شش": 6,
+    "هفت": 7,
+    "هشت": 8,
+    "نه": 9,
+    "ده": 10,
+    "دوازده": 12,
+}
+
+VULGAR_FRACTIONS = {"½": 0.5, "¼": 0.25, "¾": 0.75, "⅓": 1 / 3, "⅔": 2 / 3}
+
+# Canonical unit -> spellings. A space in a spelling also matches no space or a dot, so
+# "ق غ" covers "ق.غ", "ق. غ" and "قاشق غذا خوری" covers "قاشق غذاخوری".
+UNITS = {
+    "کیلوگرم": ["کیلو گرم", "کیلو", "کیلوگرمی"],
+    "میلی لیتر": ["میلی لیتر", "سی سی", "cc", "ml"],
+    "گرم": ["گرم", "گرمی", "گ", "g"],
+    "لیتر": ["لیتر"],
+    "پیمانه": ["پیمانه"],
+    "لیوان": ["لیوان"],
+    "فنجان": ["فنجان"],
+    "استکان": ["استکان"],
+    "قاشق غذاخوری": ["قاشق غذا خوری", "قاشق غذا خور", "قاشق غذخوری", "ق غذا خوری", "ق غ"],
+    "قاشق سوپخوری": ["قاشق سو پ خوری", "ق سوپ خوری", "ق س"],
+    "قاشق چایخوری": ["قاشق چای خوری", "ق چای خوری", "ق چ"],
+    "قاشق مرباخوری": ["قاشق مربا خوری", "قاشق مربا حوری", "ق مربا خوری", "ق م"],
+    "قاشق": ["قاشق"],
+    "عدد": ["عدد", "دانه", "دونه", "تا"],
+    "حبه": ["حبه"],
+    "بوته": ["بوته"],
+    "دسته": ["دسته"],
+    "مشت": ["مشت"],
+    "تکه": ["تکه", "تیکه"],
+    "قالب": ["قالب"],
+    "بسته": ["بسته"],
+    "قوطی": ["قوطی"],
+    "ورق": ["ورق"],
+    "برگ": ["برگ"],
+    "شاخه": ["شاخه"],
+    "سیر": ["سیر"],
+    "پیاله": ["پیاله"],
+    "بشقاب": ["بشقاب"],
+}
+
+QUALITATIVE = ["به مقدار", "به میزان", "به اندازه", "بمقدار", "بمیزان", "به دلخواه", "مقداری", "مقدار",
+               "کمی", "قدری", "خیلی کم", "برای"]
+
+
+def _spelling_pattern(spelling: str) -> str:
+    return r"\.?\s*".join(re.escape(part) for part in spelling.split(" "))
+
+
+def _alternation(words: Iterable[str]) -> str:
+    return "|".join(sorted(words, key=len, reverse=True))
+
+
+_UNIT_BY_SPELLING = {}
+for _canonical, _spellings in UNITS.items():
+    for _spelling in [_canonical, *_spellings]:
+        _UNIT_BY_SPELLING[re.sub(r"[\s.]", "", _spelling)] = _canonical
+
+_NUMERIC = r"\d+\s*/\s*\d+|\d+(?:\.\d+)?|[" + "".join(VULGAR_FRACTIONS) + "]"
+_VALUE = rf"(?:{_NUMERIC}|(?:{_alternation(map(_spelling_pattern, NUMBER_WORDS))})(?!\w))"
+_QUANTITY = (rf"(?P<value>{_VALUE})"
+             rf"(?:\s*(?:و\s*)?(?P<extra>نیم(?!\w)|\d+\s*/\s*\d+|[{''.join(VULGAR_FRACTIONS)}]))?"
+             rf"(?:\s*(?:تا|الی|-|–|—|~)\s*(?P<upper>{_VALUE}))?")
+
+QUANTITY_AT_START = re.compile(rf"^{_QUANTITY}\s*")
+QUANTITY_INSIDE = re.compile(rf"(?:(?<=\s)|^)(?P<value>{_NUMERIC})(?:\s*(?:تا|الی|-|–)\s*(?P<upper>{_NUMERIC}))?\s*")
+UNIT_AT_START = re.compile(
+    rf"^(?P<unit>{_alternation(_spelling_pattern(s) for s in [*UNITS, *(s for v in UNITS.values() for s in v)])})"
+    r"(?!\w)\s*")
+QUALITATIVE_INSIDE = re.compile(rf"(?:(?<=\s)|^)(?:{_alternation(map(_spelling_pattern, QUALITATIVE))})(?!\w)")
+COLON = re.compile(r"\s*[:：]\s*")
+NUMBER_WORD_VALUES = {re.sub(r"\s", "", word): value for word, value in NUMBER_WORDS.items()}
+
+
+def _value(token: str) -> float:
+    token = re.sub(r"\s", "", token)
+    if token in VULGAR_FRACTIONS:
+        return VULGAR_FRACTIONS[token]
+    if token in NUMBER_WORD_VALUES:
+        return NUMBER_WORD_VALUES[token]
+    if "/" in token:
+        numerator, denominator = token.split("/")
+        return int(numerator) / int(denominator) if int(denominator) else float(numerator)
+    return float(token)
+
+
+def _amount(value: float) -> Amount:
+    return int(value) if float(value).is_integer() else round(value, 3)
+
+
+def canonical_unit(unit: Optional[str]) -> Optional[str]:
+    """Canonical spelling of a unit phrase's leading unit, keeping any trailing qualifier."""
+    if not unit:
+        return unit or None
+    unit = normalize(unit)
+    match = UNIT_AT_START.match(unit)
+    if not match:
+        return unit
+    canonical = _UNIT_BY_SPELLING[re.sub(r"[\s.]", "", match.group("unit"))]
+    rest = unit[match.end():]
+    return f"{canonical} {rest}" if rest else canonical
+
+
+def parse_quantity(text: str) -> (Amount, Optional[str], str):
+    """Split ``text`` (already normalized) into amount, unit and whatever follows them."""
+    text = text.replace(ZWNJ, " ")
+    match = QUANTITY_AT_START.match(text)
+    if not match:
+        return None, None, text
+    value = _value(match.group("value"))
+    if match.group("extra"):
+        value += _value(match.group("extra"))
+    rest = text[match.end():]
+    unit_match = UNIT_AT_START.match(rest)
+    if not unit_match:
+        return _amount(value), None, rest
+    unit = _UNIT_BY_SPELLING[re.sub(r"[\s.]", "", unit_match.group("unit"))]
+    return _amount(value), unit, rest[unit_match.end():]
+
+
+def parse_ingredient(text: str) -> Dict[str, Union[str, Amount]]:
+    """Parse an ingredient line such as ``"گل نسترن: ۵۰۰ گرم"`` into name, amount and unit."""
+    text = normalize(str(text), zwnj=ZWNJ)
+    plain = text.replace(ZWNJ, " ")
+    parts = COLON.split(text, maxsplit=1)
+    if len(parts) == 2:
+        name, quantity = parts
+        amount, unit, rest = parse_quantity(quantity)
+        unit = " ".join(part for part in (unit, rest) if part) or None
+        return {"name": name, "amount": amount, "unit": unit}
+
+    amount, unit, rest = parse_quantity(text)
+    if amount is not None:
+        return {"name": text[len(text) - len(rest):], "amount": amount, "unit": unit}
+
+    inside = QUANTITY_INSIDE.search(plain)
+    if inside:
+        amount, unit, rest = parse_quantity(text[inside.start():])
+        unit = " ".join(part for part in (unit, rest) if part) or None
+        return {"name": text[:inside.start()].strip(), "amount": amount, "unit": unit}
+
+    qualitative = QUALITATIVE_INSIDE.search(plain)
+    if qualitative and qualitative.start() > 0:
+        return {"name": text[:qualitative.start()].strip(), "amount": None, "unit": plain[qualitative.start():]}
+    return {"name": text, "amount": None, "unit": None}
+
+
+def parse_ingredients(lines: Optional[Iterable[str]]) -> List[Dict[str, Union[str, Amount]]]:
+    return [parse_ingredient(line) for line in lines or [] if str(line).strip()]
@@ -0,0 +1,245 @@
+import json
+from typing import Optional, Dict, Any, List
+
+ANY = {}
+
+STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+RECIPE_SCHEMA = {
+    "type": "object",
+    "required": ["title", "ingredients", "instructions"],
+    "properties": {
+        "title": {"type": "string"},
+        "location": {
+            "type": ["object", "null"],
+            "properties": {
+                "province": {"type": ["string", "null"]},
+                "city": {"type": ["string", "null"]},
+            },
+        },
+        "ingredients": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "amount": {"type": ["number", "string", "null"]},
+                    "unit": {"type": ["string", "null"]},
+                },
+            },
+        },
+        "instructions": STRING_LIST,
+        "meal_type": STRING_LIST,
+        "occasion": STRING_LIST,
+        "images": {"type": ["object", "null"], "additionalProperties": {"type": ["string", "null"]}},
+    },
+}
+
+VALUE_TYPES = {'"': "string", "{": "object", "[": "array", "t": "boolean", "f": "boolean", "n": "null"}
+WHITESPACE = " \t\r\n"
+
+
+class JsonStructureError(ValueError):
+    pass
+
+
+class _Frame:
+    __slots__ = ("kind", "schema", "state", "key", "seen")
+
+    def __init__(self, kind: str, schema: Dict[str, Any]):
+        self.kind = kind
+        self.schema = schema
+        # object: key -> colon -> value -> after; array: value -> after
+        self.state = "first" if kind == "object" else "first_value"
+        self.key = None
+        self.seen = set()
+
+
+class JsonObjectScanner:
+    """Incrementally locates the first top-level JSON object in a stream of text chunks.
+
+    Text before the opening brace is skipped. Each character is visited once, so the scan is
+    linear in the input. When a schema is given, keys and value types are checked as soon as
+    they appear and a ``JsonStructureError`` is raised at the first violation.
+    """
+
+    def __init__(self, schema: Optional[Dict[str, Any]] = None):
+        self.schema = schema
+        self.complete = False
+        self._parts: List[str] = []
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._key_chars: List[str] = []
+
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> bool:
+        """Consume ``chunk``; return True once the object has been closed."""
+        if self.complete:
+            return True
+        start = 0
+        if not self._stack:
+            start = chunk.find("{")
+            if start < 0:
+                return False
+        for position in range(start, len(chunk)):
+            self._step(chunk[position])
+            if self.complete:
+                self._parts.append(chunk[start:position + 1])
+                return True
+        self._parts.append(chunk[start:])
+        return False
+
+    def _fail(self, message: str):
+        path = ".".join(str(frame.key) for frame in self._stack if frame.key is not None)
+        raise JsonStructureError(f"{message} at '{path or '$'}'")
+
+    def _child_schema(self, frame: _Frame) -> Dict[str, Any]:
+        if frame.kind == "array":
+            return frame.schema.get("items", ANY)
+        properties = frame.schema.get("properties")
+        if properties is not None and frame.key in properties:
+            return properties[frame.key]
+        return frame.schema.get("additionalProperties", ANY)
+
+    def _check_key(self, frame: _Frame, key: str):
+        frame.key = key
+        frame.seen.add(key)
+        schema = frame.schema
+        if "properties" in schema and key not in schema["properties"] and "additionalProperties" not in schema:
+            self._fail(f"Unexpected key '{key}'")
+
+    def _begin_value(self, frame: Optional[_Frame], ch: str):
+        kind = VALUE_TYPES.get(ch, "number" if ch == "-" or ch.isdigit() else None)
+        if kind is None:
+            self._fail(f"Unexpected character {ch!r}")
+        schema = self._child_schema(frame) if frame else (self.schema or ANY)
+        allowed = schema.get("type")
+        if allowed is not None:
+            allowed = [allowed] if isinstance(allowed, str) else allowed
+            if kind not in allowed:
+                self._fail(f"Expected {'/'.join(allowed)}, got {kind}")
+        if frame:
+            frame.state = "after"
+        if kind == "string":
+            self._in_string = True
+            self._string_is_key = False
+        elif kind in ("object", "array"):
+            self._stack.append(_Frame(kind, schema))
+
+    def _close(self, ch: str):
+        frame = self._stack.pop()
+        if (ch == "}") != (frame.kind == "object"):
+            self._fail(f"Mismatched {ch!r}")
+        missing = [key for key in frame.schema.get("required", ()) if key not in frame.seen]
+        if missing:
+            self._fail(f"Missing required keys {missing}")
+        if not self._stack:
+            self.complete = True
+
+    def _step(self, ch: str):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._string_is_key:
+                    key = json.loads('"' + "".join(self._key_chars) + '"')
+                    self._key_chars = []
+                    self._check_key(self._stack[-1], key)
+                    self._stack[-1].state = "colon"
+                return
+            if self._string_is_key:
+                self._key_chars.append(ch)
+            return
+        if ch in WHITESPACE:
+            return
+        if not self._stack:
+            self._begin_value(None, ch)
+            return
+
+        frame = self._stack[-1]
+        state = frame.state
+        if frame.kind == "object":
+            if state in ("first", "key"):
+                if ch == '"':
+                    self._in_string = True
+                    self._string_is_key = True
+                elif ch == "}" and state == "first":
+                    self._close(ch)
+                else:
+                    self._fail(f"Expected a key, got {ch!r}")
+            elif state == "colon":
+                if ch != ":":
+                    self._fail(f"Expected ':', got {ch!r}")
+                frame.state = "value"
+            elif state == "value":
+                self._begin_value(frame, ch)
+            elif ch == ",":
+                frame.state = "key"
+            elif ch == "}":
+                self._close(ch)
+            elif ch in "]{[\":":
+                self._fail(f"Unexpected {ch!r}")
+        else:
+            if state in ("first_value", "value"):
+                if ch == "]" and state == "first_value":
+                    self._close(ch)
+                else:
+                    self._begin_value(frame, ch)
+            elif ch == ",":
+                frame.state = "value"
+            elif ch == "]":
+                self._close(ch)
+            elif ch in "}{[\":":
+                self._fail(f"Unexpected {ch!r}")
+
+
+def scan_json_object(text: str, schema: Optional[Dict[str, Any]] = None) -> str:
+    scanner = JsonObjectScanner(schema)
+    if not scanner.feed(text):
+        raise ValueError(f"No JSON object found in response:\n{text}")
+    return scanner.text()
+
+
+def json_type(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    return "array" if isinstance(value, list) else "object" if isinstance(value, dict) else type(value).__name__
+
+
+def validate(value: Any, schema: Dict[str, Any], path: str = "$"):
+    """Check an already parsed value against the same schema format the scanner uses."""
+    kind = json_type(value)
+    allowed = schema.get("type")
+    if allowed is not None:
+        allowed = [allowed] if isinstance(allowed, str) else allowed
+        if kind not in allowed:
+            raise JsonStructureError(f"Expected {'/'.join(allowed)}, got {kind} at '{path}'")
+    if kind == "array":
+        for position, element in enumerate(value):
+            validate(element, schema.get("items", ANY), f"{path}[{position}]")
+    elif kind == "object":
+        missing = [key for key in schema.get("required", ()) if key not in value]
+        if missing:
+            raise JsonStructureError(f"Missing required keys {missing} at '{path}'")
+        properties = schema.get("properties")
+        for key, element in value.items():
+            if properties is not None and key in properties:
+                child = properties[key]
+            elif properties is not None and "additionalProperties" not in schema:
+                raise JsonStructureError(f"Unexpected key '{key}' at '{path}'")
+            else:
+                child = schema.get("additionalProperties", ANY)
+            validate(element, child, f"{path}.{key}")
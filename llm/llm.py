@@ -1,9 +1,28 @@
+import argparse
+import asyncio
 import json
+import os
 import re
-from typing import Optional, Dict, List
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Any, Callable, Iterable, Container, Tuple
+import openai
 from openai import OpenAI, AsyncOpenAI
 from openai.types.chat import ChatCompletion
 
+from batching import build_batch_messages, pack_batches, split_batch_response
+from cache import ResponseCache
+from gazetteer import Gazetteer
+from checkpoint import JsonlCheckpoint, iter_jsonl_records
+from ingredient_parser import parse_ingredients
+from rate_limit import RateLimiter, estimate_text_tokens, estimate_tokens
+from retry import Retrier, CircuitOpenError, InvalidOutputError
+from json_stream import JsonObjectScanner, JsonStructureError, RECIPE_SCHEMA, scan_json_object
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from metrics import REGISTRY, Registry
+
 
 class LLMError(Exception):
     pass
@@ -13,16 +32,76 @@ class LLMAPIError(LLMError):
     pass
 
 
+class LLMRateLimitError(LLMAPIError):
+    pass
+
+
+class LLMCircuitOpenError(LLMAPIError):
+    pass
+
+
+class LLMSchemaError(LLMError):
+    pass
+
+
+def wrap_api_error(error: Exception) -> LLMError:
+    if isinstance(error, InvalidOutputError):
+        return LLMSchemaError(f"Invalid response: {str(error)}")
+    if isinstance(error, CircuitOpenError):
+        return LLMCircuitOpenError(str(error))
+    if isinstance(error, openai.RateLimitError):
+        return LLMRateLimitError(f"API Error: {str(error)}")
+    return LLMAPIError(f"API Error: {str(error)}")
+
+
 class LLMClient:
     def __init__(
             self,
             api_key: str,
             base_url: str,
-            default_model: str
+            default_model: str,
+            cache: Optional[ResponseCache] = None,
+            rate_limiter: Optional[RateLimiter] = None,
+            retrier: Optional[Retrier] = None,
+            metrics: Optional[Registry] = None,
+            stream_usage: bool = True
     ):
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
-        self.async_client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+        # Retries are owned by ``self.retrier`` so the SDK's own retry loop is disabled.
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.async_client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
         self.default_model = default_model
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retrier = retrier or Retrier()
+        self.metrics = metrics or REGISTRY
+        # Ask streams to end with a usage chunk; off for backends that reject stream_options.
+        self.stream_usage = stream_usage
+
+    def _cache_key(self, use_cache: bool, stream: bool, **request) -> Optional[str]:
+        if self.cache is None or not use_cache or stream:
+            return None
+        return self.cache.make_key(**request)
+
+    def _cached(self, key: Optional[str]) -> Optional[ChatCompletion]:
+        body = self.cache.get(key) if key else None
+        return ChatCompletion.model_validate_json(body) if body else None
+
+    def _store(self, key: Optional[str], response: ChatCompletion):
+        if key:
+            self.cache.put(key, response.model_dump_json())
+
+    def _count_usage(self, model: str, usage, estimated: bool = False):
+        if usage:
+            self._count_tokens(model, usage.prompt_tokens, usage.completion_tokens, estimated)
+
+    def _count_tokens(self, model: str, prompt_tokens: int, completion_tokens: int, estimated: bool = False):
+        self.metrics.counter("llm_prompt_tokens_total", model=model, estimated=estimated).inc(prompt_tokens)
+        self.metrics.counter("llm_completion_tokens_total", model=model, estimated=estimated).inc(completion_tokens)
+
+    async def _acquire(self, tokens: int):
+        if self.rate_limiter:
+            with self.metrics.timer("llm_rate_limit_wait"):
+                await self.rate_limiter.acquire(tokens)
 
     def chat_completion(
             self,
@@ -31,20 +110,32 @@ class LLMClient:
             temperature: float = 0.7,
             max_tokens: Optional[int] = None,
             stream: bool = False,
+            use_cache: bool = True,
             **kwargs
     ) -> ChatCompletion:
         model = model or self.default_model
+        key = self._cache_key(use_cache, stream, model=model, messages=messages, temperature=temperature,
+                              max_tokens=max_tokens, **kwargs)
+        cached = self._cached(key)
+        self.metrics.counter("llm_requests_total", cached=cached is not None).inc()
+        if cached is not None:
+            return cached
         try:
-            return self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                stream=stream,
-                **kwargs
-            )
+            with self.metrics.timer("llm_request", method="chat", model=model):
+                response = self.retrier.call(lambda: self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=stream,
+                    **kwargs
+                ))
         except Exception as e:
-            raise LLMAPIError(f"API Error: {str(e)}") from e
+            raise wrap_api_error(e) from e
+        if not stream:
+            self._count_usage(model, response.usage)
+        self._store(key, response)
+        return response
 
     async def async_chat_completion(
             self,
@@ -53,43 +144,127 @@ class LLMClient:
             temperature: float = 0.7,
             max_tokens: Optional[int] = None,
             stream: bool = False,
+            use_cache: bool = True,
             **kwargs
     ) -> ChatCompletion:
         model = model or self.default_model
+        key = self._cache_key(use_cache, stream, model=model, messages=messages, temperature=temperature,
+                              max_tokens=max_tokens, **kwargs)
+        cached = self._cached(key)
+        self.metrics.counter("llm_requests_total", cached=cached is not None).inc()
+        if cached is not None:
+            return cached
+        estimate = estimate_tokens(messages) + (max_tokens or 0)
+        await self._acquire(estimate)
         try:
-            return await self.async_client.chat.completions.create(
+            with self.metrics.timer("llm_request", method="chat", model=model):
+                response = await self.retrier.acall(lambda: self.async_client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=stream,
+                    **kwargs
+                ))
+        except Exception as e:
+            raise wrap_api_error(e) from e
+        if not stream:
+            self._count_usage(model, response.usage)
+        if self.rate_limiter and not stream and response.usage:
+            self.rate_limiter.adjust(response.usage.total_tokens - estimate)
+        self._store(key, response)
+        return response
+
+    async def async_json_completion(
+            self,
+            messages: List[Dict[str, str]],
+            model: Optional[str] = None,
+            temperature: float = 0.7,
+            max_tokens: Optional[int] = None,
+            schema: Optional[Dict[str, Any]] = None,
+            on_tokens: Optional[Callable[[int], None]] = None,
+            **kwargs
+    ) -> Dict[str, Any]:
+        """Stream a completion into an incremental JSON scanner and return the parsed object.
+
+        The request is aborted as soon as the output violates ``schema`` (or once the object
+        is closed), and invalid output is retried under the retrier's ``output`` policy.
+        ``on_tokens`` is called with the total tokens of every attempt, reported or estimated.
+        """
+        model = model or self.default_model
+
+        if self.stream_usage and "stream_options" not in kwargs:
+            kwargs = {**kwargs, "stream_options": {"include_usage": True}}
+
+        async def attempt():
+            started = time.perf_counter()
+            stream = await self.async_client.chat.completions.create(
                 model=model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
-                stream=stream,
+                stream=True,
                 **kwargs
             )
+            scanner = JsonObjectScanner(schema)
+            first = True
+            usage = None
+            received = []
+            try:
+                async for chunk in stream:
+                    usage = getattr(chunk, "usage", None) or usage
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    received.append(delta)
+                    if first:
+                        self.metrics.histogram("llm_first_token_seconds", model=model).observe(
+                            time.perf_counter() - started)
+                        first = False
+                    # Once the object is closed only the finish and usage chunks should follow;
+                    # read on for the usage, but stop paying for any text after the object.
+                    if scanner.complete:
+                        if delta.strip():
+                            break
+                    else:
+                        scanner.feed(delta)
+            except JsonStructureError as e:
+                raise InvalidOutputError(str(e)) from e
+            finally:
+                await stream.close()
+                if usage is not None:
+                    prompt_tokens, completion_tokens, estimated = usage.prompt_tokens, usage.completion_tokens, False
+                else:
+                    # No usage chunk (not supported, or the stream was cut short): estimate it.
+                    prompt_tokens, completion_tokens, estimated = (
+                        estimate_tokens(messages), estimate_text_tokens("".join(received)), True)
+                self._count_tokens(model, prompt_tokens, completion_tokens, estimated)
+                if on_tokens:
+                    on_tokens(prompt_tokens + completion_tokens)
+            if not scanner.complete:
+                raise InvalidOutputError("Response ended before the JSON object was closed")
+            try:
+                return json.loads(scanner.text())
+            except ValueError as e:
+                raise InvalidOutputError(str(e)) from e
+
+        self.metrics.counter("llm_requests_total", cached=False).inc()
+        await self._acquire(estimate_tokens(messages) + (max_tokens or 0))
+        try:
+            with self.metrics.timer("llm_request", method="stream", model=model):
+                return await self.retrier.acall(attempt)
         except Exception as e:
-            raise LLMAPIError(f"API Error: {str(e)}") from e
+            raise wrap_api_error(e) from e
 
 
 def extract_json(text: str) -> str:
-    match = re.search(r'\{.*\}', text, flags=re.DOTALL)
-    if not match:
-        raise ValueError(f"No JSON object found in response:\n{text}")
-    return match.group(0)
-
+    return scan_json_object(text)
 
 
-def main():
-    deepseek = LLMClient(api_key="tpsg-7GOMHqSkUrXtv0XNxKE7Zj0Aof0WjoK", base_url="https://api.metisai.ir/openai/v1")
-
-    with open("aggregated_azarbaijan_west.json", "r", encoding="utf-8") as f:
-        inputs = json.load(f)
+BATCH_MAX_COMPLETION_TOKENS = 16000
 
-    results = []
 
-    for idx, item in enumerate(inputs, start=1):
-        messages = [
-            {
-                "role": "system",
-                "content": """```
+SYSTEM_PROMPT = """```
                 You are a JSON transformation assistant. Your task is to read a given input JSON representing a recipe and output a new JSON with exactly the following structure:
 
                 ```json
@@ -97,11 +272,7 @@ def main():
                   "title": string,
                   "location": {
                     "province": string,
-                    "city": string,
-                    "coordinates": {
-                      "latitude": number,
-                      "longitude": number
-                    }
+                    "city": string
                   },
                   "ingredients": [
                     {
@@ -128,7 +299,7 @@ def main():
 
                 **Transformation rules:**
                 1. **title**: copy from `input.title`.
-                2. **location**: location.province: always set to "گیلان". if missing, set `city`, and `coordinates.latitude`/`longitude` to empty string or null.
+                2. **location**: location.province: always set to "گیلان". if missing, set `city` to empty string or null.
                 3. **ingredients**: each entry in `input.ingredients` is a string like `"گل نسترن: ۵۰۰ گرم"`.  
                    - Split on the first colon.  
                    - Parse the part before the colon as `name`.  
@@ -150,32 +321,387 @@ def main():
                 ```  
                 Please output only the transformed JSON.```
                 """
-            },
-            {
-                "role": "user",
-                "content": "Here is the input JSON:\n```json\n" + json.dumps(item, ensure_ascii=False) + "\n```"
-            }
-        ]
-
-        response = deepseek.chat_completion(
-            messages=messages,
-            model="gpt-4o-mini",
-            temperature=0,
-            max_tokens=1500)
 
-        output_file = "output_azarbaijan_west.json"
-        content = response.choices[0].message.content.strip()
 
-        json_str = extract_json(content)
+def build_messages(item: Dict[str, Any]) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": "Here is the input JSON:\n```json\n" + json.dumps(item, ensure_ascii=False) + "\n```"
+        }
+    ]
+
+
+RESIDUAL_PROMPT = """You annotate Persian recipes whose title, ingredients and steps have already been parsed.
+Infer only the remaining fields and respond with JSON of exactly this structure:
+
+{"location": {"province": string, "city": string},
+ "meal_type": [string, …], "occasion": [string, …]}
+
+1. location: location.province: always set to "گیلان". if missing, set `city` to empty string or null.
+2. meal_type: infer one or more appropriate types (e.g. "غذای اصلی", "پیش‌غذا", "دسر", "دریایی") based on the nature of the dish; if you cannot determine, output an empty array.
+3. occasion: infer suitable occasions (e.g. "ناهار", "شام", "مهمانی", "ویژه تعطیلات") from cultural context; if unclear, output an empty array.
+4. Respond **only** with valid JSON. Do not wrap it in markdown, do not add any extra text, and ensure there are no trailing commas or comments."""
+
+RESIDUAL_SCHEMA = {
+    "type": "object",
+    "required": ["meal_type", "occasion"],
+    "properties": {
+        "location": RECIPE_SCHEMA["properties"]["location"],
+        "meal_type": RECIPE_SCHEMA["properties"]["meal_type"],
+        "occasion": RECIPE_SCHEMA["properties"]["occasion"],
+    },
+}
+
+SENTENCE_BOUNDARY = re.compile(r"(?<!\d)\.(?!\d)|[!?؟]|\n")
+
+
+def split_instructions(instructions: Any) -> List[str]:
+    if isinstance(instructions, str):
+        instructions = [instructions]
+    steps = []
+    for paragraph in instructions or []:
+        steps.extend(step.strip() for step in SENTENCE_BOUNDARY.split(str(paragraph)) if step.strip())
+    return steps
+
+
+def prepare_locally(item: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of the target record that need no model: title, ingredients, steps and images."""
+    image = item.get("image")
+    return {
+        "title": item.get("title") or item.get("name") or "",
+        "ingredients": parse_ingredients(item.get("ingredients")),
+        "instructions": split_instructions(item.get("instructions")),
+        "images": {"final_image": image} if image else {},
+    }
+
+
+def build_residual_messages(item: Dict[str, Any], prepared: Dict[str, Any]) -> List[Dict[str, str]]:
+    summary = {
+        "title": prepared["title"],
+        "city": item.get("city") or "",
+        "ingredients": [ingredient["name"] for ingredient in prepared["ingredients"]],
+    }
+    return [
+        {
+            "role": "system",
+            "content": RESIDUAL_PROMPT
+        },
+        {
+            "role": "user",
+            "content": "Here is the input JSON:\n```json\n" + json.dumps(summary, ensure_ascii=False) + "\n```"
+        }
+    ]
+
+
+def merge_residual(prepared: Dict[str, Any], residual: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": prepared["title"],
+        "location": residual.get("location"),
+        "ingredients": prepared["ingredients"],
+        "instructions": prepared["instructions"],
+        "meal_type": residual.get("meal_type", []),
+        "occasion": residual.get("occasion", []),
+        "images": prepared["images"],
+    }
+
+
+@dataclass
+class TransformResult:
+    index: int
+    record: Optional[Dict[str, Any]]
+    latency: float
+    total_tokens: int = 0
+    error: Optional[str] = None
+    batch_size: int = 1
+
+
+async def transform_one(
+        client: LLMClient,
+        index: int,
+        item: Dict[str, Any],
+        model: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        stream: bool,
+        local: bool = False
+) -> TransformResult:
+    if local:
+        prepared = prepare_locally(item)
+        messages, schema = build_residual_messages(item, prepared), RESIDUAL_SCHEMA
+    else:
+        messages, schema = build_messages(item), RECIPE_SCHEMA
+    started = time.perf_counter()
+    record, error, total_tokens = None, None, 0
+    streamed_tokens = []
+    try:
+        if stream:
+            record = await client.async_json_completion(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                schema=schema,
+                on_tokens=streamed_tokens.append)
+        else:
+            response = await client.async_chat_completion(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens)
+            if response.usage:
+                total_tokens = response.usage.total_tokens
+            record = json.loads(extract_json(response.choices[0].message.content.strip()))
+        if local:
+            record = merge_residual(prepared, record)
+    except (LLMError, ValueError) as e:
+        error = str(e)
+    total_tokens += sum(streamed_tokens)
+    return TransformResult(index, record, time.perf_counter() - started, total_tokens, error)
+
+
+async def transform_group(
+        client: LLMClient,
+        group: List[Tuple[int, Dict[str, Any]]],
+        model: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        stream: bool
+) -> List[TransformResult]:
+    """Transform several items in one request; items missing from the answer are redone one by one."""
+    started = time.perf_counter()
+    outputs, total_tokens = {}, 0
+    try:
+        response = await client.async_chat_completion(
+            messages=build_batch_messages(SYSTEM_PROMPT, group),
+            model=model,
+            temperature=temperature,
+            max_tokens=min(max_tokens * len(group), BATCH_MAX_COMPLETION_TOKENS))
+        if response.usage:
+            total_tokens = response.usage.total_tokens
+        outputs = split_batch_response(response.choices[0].message.content, [index for index, _ in group],
+                                       RECIPE_SCHEMA)
+    except (LLMError, ValueError):
+        pass
+    latency = time.perf_counter() - started
+    share = total_tokens // len(group)
+
+    results = []
+    for index, item in group:
+        if index in outputs:
+            results.append(TransformResult(index, outputs[index], latency, share, batch_size=len(group)))
+        else:
+            result = await transform_one(client, index, item, model, temperature, max_tokens, stream)
+            result.latency += latency
+            result.total_tokens += share
+            results.append(result)
+    return results
+
+
+async def transform_batch(
+        client: LLMClient,
+        items: Iterable[Dict[str, Any]],
+        model: Optional[str] = None,
+        temperature: float = 0,
+        max_tokens: int = 1500,
+        concurrency: int = 8,
+        on_result: Optional[Callable[[TransformResult], None]] = None,
+        skip: Container[int] = (),
+        stream: bool = False,
+        batch_size: int = 1,
+        batch_tokens: int = 6000,
+        local: bool = False,
+        gazetteer: Optional[Gazetteer] = None
+) -> List[TransformResult]:
+    """Transform items through ``async_chat_completion`` with at most ``concurrency`` requests in flight.
+
+    Results are returned sorted by input index. When ``on_result`` is given every result is
+    handed to it as soon as it completes instead of being collected. Indexes in ``skip`` are
+    not sent at all. Request budgets are enforced by the client's ``rate_limiter``. With
+    ``stream`` each response is validated against ``RECIPE_SCHEMA`` while it arrives.
+
+    A ``batch_size`` above one packs up to that many items (at most ``batch_tokens`` input
+    tokens) into each request so the system prompt is paid once per group. With ``local`` the
+    ingredients, steps and title are parsed in-process and the model only infers location,
+    meal_type and occasion (not combinable with batching).
+
+    With a ``gazetteer`` every record's location is completed in a post-processing stage:
+    canonical province and city names and table coordinates, which the model no longer emits.
+    """
+    pending = ((index, item) for index, item in enumerate(items) if index not in skip)
+    if batch_size > 1:
+        jobs = pack_batches(pending, batch_tokens, batch_size)
+    else:
+        jobs = ([job] for job in pending)
+    results = []
+
+    async def worker():
+        for group in jobs:
+            if len(group) > 1:
+                done = await transform_group(client, group, model, temperature, max_tokens, stream)
+            else:
+                index, item = group[0]
+                done = [await transform_one(client, index, item, model, temperature, max_tokens, stream, local)]
+            for result in done:
+                if gazetteer and isinstance(result.record, dict):
+                    try:
+                        result.record = gazetteer.locate(result.record)
+                    except Exception as e:  # one odd answer must not take down the whole run
+                        result.record, result.error = None, f"Post-processing failed: {e!r}"
+                client.metrics.counter("llm_records_total", status="ok" if result.error is None else "failed").inc()
+                client.metrics.histogram("llm_record_seconds").observe(result.latency)
+                if on_result:
+                    on_result(result)
+                else:
+                    results.append(result)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    results.sort(key=lambda r: r.index)
+    return results
+
+
+def token_summary(count: int, tokens: int, batched: int) -> str:
+    if not count:
+        return "no records"
+    return f"{tokens / count:.0f} tokens/record, {batched}/{count} records answered in batches"
+
+
+def latency_summary(latencies: List[float]) -> str:
+    if not latencies:
+        return "no requests"
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return (f"n={len(ordered)} mean={sum(ordered) / len(ordered):.2f}s "
+            f"p50={pick(0.5):.2f}s p95={pick(0.95):.2f}s max={ordered[-1]:.2f}s")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Transform crawled recipes into the target schema with an LLM.")
+    parser.add_argument("--input", default="aggregated_azarbaijan_west.json")
+    parser.add_argument("--output", default="transformed_aggregated.json")
+    parser.add_argument("--jsonl", default=None,
+                        help="stream records to this JSONL file as they finish and resume from its checkpoint")
+    parser.add_argument("--api-key", default="tpsg-7GOMHqSkUrXtv0XNxKE7Zj0Aof0WjoK")
+    parser.add_argument("--base-url", default="https://api.metisai.ir/openai/v1")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum requests in flight")
+    parser.add_argument("--rpm", type=float, default=None, help="requests-per-minute budget")
+    parser.add_argument("--tpm", type=float, default=None, help="tokens-per-minute budget")
+    parser.add_argument("--cache", default="llm_cache.sqlite", help="response cache database")
+    parser.add_argument("--cache-max-mb", type=float, default=256)
+    parser.add_argument("--no-cache", action="store_true", help="bypass the response cache")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream responses and abort early on schema violations (bypasses the cache)")
+    parser.add_argument("--no-stream-usage", action="store_true",
+                        help="do not send stream_options (for backends that reject it); "
+                             "streamed token counts are then estimated")
+    parser.add_argument("--batch-size", type=int, default=1, help="recipes packed into one request")
+    parser.add_argument("--batch-tokens", type=int, default=6000, help="input token budget per batched request")
+    parser.add_argument("--local-ingredients", action="store_true",
+                        help="parse ingredients and steps locally and only ask the model for the remaining fields")
+    parser.add_argument("--no-gazetteer", action="store_true",
+                        help="leave locations as the model wrote them instead of resolving coordinates offline")
+    parser.add_argument("--metrics", default=None,
+                        help="write latency histograms and token counters here at the end "
+                             "(Prometheus text for .prom/.txt, JSON otherwise)")
+    args = parser.parse_args()
+    if args.local_ingredients and args.batch_size > 1:
+        parser.error("--local-ingredients cannot be combined with --batch-size")
+    return args
+
+
+def main():
+    args = parse_args()
+    cache = None if args.no_cache else ResponseCache(args.cache, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    deepseek = LLMClient(api_key=args.api_key, base_url=args.base_url, default_model=args.model,
+                         cache=cache, rate_limiter=RateLimiter(rpm=args.rpm, tpm=args.tpm),
+                         stream_usage=not args.no_stream_usage)
+    gazetteer = None if args.no_gazetteer else Gazetteer()
+
+    if args.input.endswith(".jsonl"):
+        inputs = iter_jsonl_records(args.input)
+    else:
+        with open(args.input, "r", encoding="utf-8") as f:
+            inputs = json.load(f)
+
+    def report(result: TransformResult):
+        status = "ok" if result.error is None else f"failed: {result.error}"
+        print(result.index + 1, f"{result.latency:.2f}s", status)
+
+    started = time.perf_counter()
+    if args.jsonl:
+        checkpoint = JsonlCheckpoint(args.jsonl)
+        resumed = len(checkpoint.completed)
+        latencies, failed, tokens, batched = [], 0, 0, 0
+
+        def on_result(result: TransformResult):
+            nonlocal failed, tokens, batched
+            report(result)
+            latencies.append(result.latency)
+            tokens += result.total_tokens
+            batched += result.batch_size > 1
+            if result.error is None:
+                checkpoint.write(result.index, result.record)
+            else:
+                failed += 1
+
+        try:
+            asyncio.run(transform_batch(
+                deepseek,
+                inputs,
+                temperature=0,
+                max_tokens=1500,
+                concurrency=args.concurrency,
+                on_result=on_result,
+                skip=checkpoint.completed,
+                stream=args.stream,
+                batch_size=args.batch_size,
+                batch_tokens=args.batch_tokens,
+                local=args.local_ingredients,
+                gazetteer=gazetteer))
+        finally:
+            checkpoint.close()
+        print(f"Transformed {len(latencies) - failed}/{len(latencies)} items ({resumed} already done) "
+              f"in {time.perf_counter() - started:.2f}s ({latency_summary(latencies)}); "
+              f"records appended to {args.jsonl}")
+        print(token_summary(len(latencies), tokens, batched))
+    else:
+        results = asyncio.run(transform_batch(
+            deepseek,
+            inputs,
+            temperature=0,
+            max_tokens=1500,
+            concurrency=args.concurrency,
+            stream=args.stream,
+            batch_size=args.batch_size,
+            batch_tokens=args.batch_tokens,
+            local=args.local_ingredients,
+            gazetteer=gazetteer))
+        for result in results:
+            report(result)
 
-        print(idx, content)
+        print(f"Transformed {sum(r.error is None for r in results)}/{len(results)} items "
+              f"in {time.perf_counter() - started:.2f}s ({latency_summary([r.latency for r in results])})")
+        print(token_summary(len(results), sum(r.total_tokens for r in results),
+                            sum(r.batch_size > 1 for r in results)))
 
-        transformed = json.loads(json_str)
-        results.append(transformed)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([r.record for r in results if r.error is None], f, ensure_ascii=False, indent=2)
 
-    with open("transformed_aggregated.json", "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    print("Retries:", deepseek.retrier.stats.snapshot())
+    if gazetteer:
+        print("Gazetteer:", gazetteer.stats())
+    if cache:
+        print("Cache:", cache.stats())
+        cache.close()
+    if args.metrics:
+        deepseek.metrics.write(args.metrics)
+        print(f"Metrics written to {args.metrics}")
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
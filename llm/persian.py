@@ -0,0 +1,43 @@
+import re
+
+PERSIAN_DIGITS = "۰۱۲۳۴۵۶۷۸۹"
+ARABIC_INDIC_DIGITS = "٠١٢٣٤٥٦٧٨٩"
+ZWNJ = "‌"
+
+DIGIT_TABLE = str.maketrans({
+    **{digit: str(value) for value, digit in enumerate(PERSIAN_DIGITS)},
+    **{digit: str(value) for value, digit in enumerate(ARABIC_INDIC_DIGITS)},
+    "٫": ".",
+    "٬": "",
+})
+
+CHARACTER_TABLE = str.maketrans({
+    "ي": "ی",
+    "ى": "ی",
+    "ك": "ک",
+    "ة": "ه",
+    "ۀ": "ه",
+    "أ": "ا",
+    "إ": "ا",
+    "ٱ": "ا",
+    "ـ": None,
+    "‎": None,
+    "‏": None,
+    " ": " ",
+    **{chr(code): None for code in range(0x064B, 0x0653)},
+})
+
+WHITESPACE = re.compile(r"\s+")
+ZWNJ_RUN = re.compile(r"\s*" + ZWNJ + r"[\s" + ZWNJ + r"]*")
+
+
+def normalize_digits(text: str) -> str:
+    return text.translate(DIGIT_TABLE)
+
+
+def normalize(text: str, zwnj: str = " ") -> str:
+    """Map Arabic letter and digit forms to Persian/ASCII ones, drop diacritics and tatweel,
+    replace zero-width non-joiners with ``zwnj`` and collapse whitespace."""
+    text = text.translate(CHARACTER_TABLE).translate(DIGIT_TABLE)
+    text = ZWNJ_RUN.sub(lambda run: " " if run.group().strip(ZWNJ) else zwnj, text)
+    return WHITESPACE.sub(" ", text).strip()
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from typing import Optional, Dict, List
+
+
+# Rough upper bound; Persian text averages well under 3 characters per token.
+CHARS_PER_TOKEN = 3
+
+
+def estimate_text_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(estimate_text_tokens(message["content"]) for message in messages)
+
+
+class RateLimiter:
+    """Token buckets enforcing a requests-per-minute and a tokens-per-minute budget."""
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm or 0)
+        self._tokens = float(tpm or 0)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int = 0):
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+        async with self._lock:
+            while True:
+                self._refill()
+                wait = 0.0
+                if self.rpm and self._requests < 1:
+                    wait = (1 - self._requests) * 60 / self.rpm
+                if self.tpm and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self.rpm:
+                self._requests -= 1
+            self._tokens -= tokens
+
+    def adjust(self, tokens: int):
+        """Charge (or refund, if negative) tokens once the real usage of a request is known."""
+        if self.tpm:
+            self._tokens -= tokens
@@ -0,0 +1,227 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Callable, Awaitable, TypeVar
+
+import httpx
+import openai
+
+T = TypeVar("T")
+
+RATE_LIMIT = "rate_limit"
+SERVER = "server"
+CONNECTION = "connection"
+CLIENT = "client"
+OUTPUT = "output"
+
+
+class InvalidOutputError(ValueError):
+    """A response arrived but is unusable (e.g. aborted on a schema violation); worth asking again."""
+
+
+def classify(error: BaseException) -> Optional[str]:
+    """The failure class of ``error``; None for exceptions that did not come from the API call."""
+    if isinstance(error, InvalidOutputError):
+        return OUTPUT
+    if isinstance(error, openai.RateLimitError):
+        return RATE_LIMIT
+    if isinstance(error, openai.APIConnectionError):
+        return CONNECTION
+    if isinstance(error, openai.APIStatusError):
+        return SERVER if error.status_code >= 500 or error.status_code in (408, 409) else CLIENT
+    if isinstance(error, httpx.HTTPError):
+        # openai does not wrap transport errors raised while iterating a stream.
+        return CONNECTION
+    return None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait, from ``Retry-After`` / ``retry-after-ms`` headers."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 1
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int, server_hint: Optional[float] = None) -> float:
+        if server_hint is not None:
+            return min(server_hint, self.max_delay) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+DEFAULT_POLICIES = {
+    RATE_LIMIT: RetryPolicy(max_attempts=6, base_delay=1.0, max_delay=60.0),
+    SERVER: RetryPolicy(max_attempts=4, base_delay=0.5, max_delay=20.0),
+    CONNECTION: RetryPolicy(max_attempts=4, base_delay=0.5, max_delay=10.0),
+    CLIENT: RetryPolicy(max_attempts=1),
+    OUTPUT: RetryPolicy(max_attempts=3, base_delay=0.0),
+}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Fails fast after ``failure_threshold`` consecutive server/connection failures.
+
+    After ``reset_timeout`` seconds a single probe call is let through; its outcome closes or
+    re-opens the circuit. Safe to share between threads and coroutines.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_neutral(self):
+        """An outcome that says nothing about the backend's health (a rate limit): the state
+        is kept, but a half-open probe slot is freed for the next call."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class RetryStats:
+    def __init__(self):
+        self.calls = 0
+        self.attempts = 0
+        self.retries: Dict[str, int] = {}
+        self.gave_up: Dict[str, int] = {}
+        self.waited = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "attempts": self.attempts,
+                "retries": dict(self.retries),
+                "gave_up": dict(self.gave_up),
+                "waited_seconds": round(self.waited, 3),
+                "circuit_rejections": self.rejected,
+            }
+
+
+class Retrier:
+    """Runs calls under per-failure-class retry policies and one shared circuit breaker."""
+
+    def __init__(
+            self,
+            policies: Optional[Dict[str, RetryPolicy]] = None,
+            breaker: Optional[CircuitBreaker] = None
+    ):
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = RetryStats()
+
+    def _before_attempt(self, first: bool):
+        if not self.breaker.allow():
+            with self.stats._lock:
+                self.stats.rejected += 1
+            raise CircuitOpenError(f"Circuit open; not calling the API for up to {self.breaker.reset_timeout}s")
+        with self.stats._lock:
+            self.stats.calls += first
+            self.stats.attempts += 1
+
+    def _after_failure(self, error: BaseException, attempt: int) -> float:
+        """Record a failed attempt; return how long to wait, or re-raise when giving up."""
+        kind = classify(error)
+        if kind is None:
+            # A local bug says nothing about the backend: keep the breaker's state (only a
+            # half-open probe slot is freed) and let the error through unretried.
+            self.breaker.record_neutral()
+            raise error
+        # Only an unhealthy backend trips the breaker: the API answered a client or output
+        # error fine, and a rate limit is routine under load and waits out Retry-After.
+        if kind in (CLIENT, OUTPUT):
+            self.breaker.record_success()
+        elif kind in (SERVER, CONNECTION):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_neutral()
+        policy = self.policies[kind]
+        with self.stats._lock:
+            if attempt >= policy.max_attempts:
+                self.stats.gave_up[kind] = self.stats.gave_up.get(kind, 0) + 1
+                raise error
+            delay = policy.delay(attempt, retry_after(error))
+            self.stats.retries[kind] = self.stats.retries.get(kind, 0) + 1
+            self.stats.waited += delay
+        return delay
+
+    def call(self, fn: Callable[[], T]) -> T:
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before_attempt(attempt == 1)
+            try:
+                result = fn()
+            except Exception as e:
+                time.sleep(self._after_failure(e, attempt))
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before_attempt(attempt == 1)
+            try:
+                result = await fn()
+            except Exception as e:
+                await asyncio.sleep(self._after_failure(e, attempt))
+                continue
+            self.breaker.record_success()
+            return result
@@ -0,0 +1,186 @@
+import argparse
+import json
+import random
+import re
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+INPUT_JSON = re.compile(r'```json\n(.*)\n```', flags=re.DOTALL)
+
+
+def fake_transform(item):
+    ingredients = []
+    for ingredient in item.get("ingredients") or []:
+        name, _, rest = str(ingredient).partition(":")
+        ingredients.append({"name": name.strip(), "amount": None, "unit": rest.strip()})
+    instructions = item.get("instructions") or []
+    if isinstance(instructions, str):
+        instructions = [instructions]
+    return {
+        "title": item.get("title") or item.get("name") or "",
+        "location": {
+            "province": "گیلان",
+            "city": item.get("city") or ""
+        },
+        "ingredients": ingredients,
+        "instructions": instructions,
+        "meal_type": [],
+        "occasion": [],
+        "images": {}
+    }
+
+
+def completion_body(model, content, prompt_chars):
+    prompt_tokens = prompt_chars // 3
+    completion_tokens = len(content) // 3
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers ``POST .../chat/completions`` like an OpenAI-compatible server would.
+
+    ``error_rate`` and ``rate_limit_rate`` inject 500 and 429 responses (the latter with a
+    ``Retry-After`` header) and ``malformed_rate`` answers with output that breaks the recipe
+    schema, so client retry behaviour can be exercised locally. ``"stream": true`` requests
+    are answered as server-sent events, and a JSON array of ``{"id", "input"}`` objects (the
+    batched contract) is answered with an array of ``{"id", "output"}`` objects.
+    """
+
+    delay = 0.0
+    error_rate = 0.0
+    rate_limit_rate = 0.0
+    retry_after = 1.0
+    malformed_rate = 0.0
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            self.send_json(429, {"error": {"message": "Rate limit exceeded (stub)", "type": "rate_limit"}},
+                           {"Retry-After": str(self.retry_after)})
+            return
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.send_json(500, {"error": {"message": "Injected server error (stub)", "type": "server_error"}})
+            return
+        messages = request.get("messages", [])
+        match = INPUT_JSON.search(messages[-1]["content"]) if messages else None
+        item = json.loads(match.group(1)) if match else {}
+        if messages and "already been parsed" in messages[0]["content"]:
+            record = self.transform(item)
+            answer = {"location": record["location"], "meal_type": [], "occasion": []}
+        elif isinstance(item, list):
+            answer = [{"id": entry["id"], "output": self.transform(entry["input"])} for entry in item]
+        else:
+            answer = self.transform(item)
+        content = json.dumps(answer, ensure_ascii=False)
+
+        if request.get("stream"):
+            usage = completion_body(request.get("model", "stub"), content,
+                                    sum(len(m.get("content", "")) for m in messages))["usage"]
+            include_usage = (request.get("stream_options") or {}).get("include_usage")
+            self.send_stream(request.get("model", "stub"), content, usage if include_usage else None)
+            return
+        time.sleep(self.delay)
+        body = completion_body(request.get("model", "stub"), content,
+                               sum(len(m.get("content", "")) for m in messages))
+        self.send_json(200, body)
+
+    def transform(self, item):
+        record = fake_transform(item)
+        if random.random() < self.malformed_rate:
+            record = {"recipe": record}
+        return record
+
+    def send_stream(self, model, content, usage=None, pieces=20):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        def send(choices, **extra):
+            chunk = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": choices, **extra}
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        size = max(1, len(content) // pieces)
+        try:
+            for start in range(0, len(content), size):
+                time.sleep(self.delay / pieces)
+                send([{"index": 0, "delta": {"content": content[start:start + size]}, "finish_reason": None}])
+            send([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if usage:
+                # As OpenAI answers stream_options.include_usage: a last chunk without choices.
+                send([], usage=usage)
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host="127.0.0.1", port=8000, delay=0.0, error_rate=0.0, rate_limit_rate=0.0, retry_after=1.0,
+          malformed_rate=0.0):
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "delay": delay,
+        "error_rate": error_rate,
+        "rate_limit_rate": rate_limit_rate,
+        "retry_after": retry_after,
+        "malformed_rate": malformed_rate,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub for exercising llm.py offline.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--delay", type=float, default=0.2, help="seconds to wait before answering each request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="fraction of answers that violate the recipe schema")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.delay, args.error_rate, args.rate_limit_rate, args.retry_after,
+                   args.malformed_rate)
+    print(f"Stub serving on http://{args.host}:{args.port}/v1 (delay {args.delay}s)")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
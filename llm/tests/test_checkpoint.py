@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from checkpoint import JsonlCheckpoint, iter_jsonl_records
+
+
+def write_records(path, indexes):
+    checkpoint = JsonlCheckpoint(path)
+    for index in indexes:
+        checkpoint.write(index, {"value": index})
+    checkpoint.close()
+
+
+def test_resume_drops_a_torn_record(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    write_records(path, range(3))
+    with open(path, "ab") as f:
+        f.write(b'{"index": 3, "rec')
+    checkpoint = JsonlCheckpoint(path)
+    assert checkpoint.completed == {0, 1, 2}
+    checkpoint.close()
+    assert [record["index"] for record in iter_jsonl_records(path)] == [0, 1, 2]
+
+
+def test_missing_checkpoint_is_rebuilt_from_the_output(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    write_records(path, [4, 1, 7])
+    os.remove(path + ".ckpt")
+    with open(path, "ab") as f:
+        f.write(b'{"index": 9, "rec')
+
+    checkpoint = JsonlCheckpoint(path)
+    assert checkpoint.completed == {4, 1, 7}
+    checkpoint.write(2, {"value": 2})
+    checkpoint.close()
+    assert [record["index"] for record in iter_jsonl_records(path)] == [4, 1, 7, 2]
+
+    # The rebuilt checkpoint is used as is on the next run.
+    checkpoint = JsonlCheckpoint(path)
+    assert checkpoint.completed == {4, 1, 7, 2}
+    checkpoint.close()
+
+
+def test_foreign_output_is_not_overwritten(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    content = '{"index": 0, "record": {}}\nnot a record\n'
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    with pytest.raises(ValueError):
+        JsonlCheckpoint(path)
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == content
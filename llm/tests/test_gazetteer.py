@@ -0,0 +1,37 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+import llm
+from gazetteer import Gazetteer
+from metrics import Registry
+
+
+def test_malformed_locations_stay_unresolved():
+    gazetteer = Gazetteer()
+    for location in ["تبریز", ["تبریز"], 3, None]:
+        assert gazetteer.locate({"location": location})["location"] == {"coordinates": None}
+    located = gazetteer.locate({"location": {"province": ["گیلان"], "city": 7}})
+    assert located["location"] == {"province": ["گیلان"], "city": 7, "coordinates": None}
+    assert gazetteer.locate({"location": {"province": "گیلان", "city": "رشت"}})["location"]["coordinates"]
+
+
+def test_a_failing_post_processing_step_only_fails_its_record(monkeypatch):
+    async def transform_one(client, index, item, *args):
+        return llm.TransformResult(index, dict(item), 0.0)
+
+    class BrokenGazetteer:
+        def locate(self, record):
+            if record["location"] == "bad":
+                raise RuntimeError("boom")
+            return record
+
+    monkeypatch.setattr(llm, "transform_one", transform_one)
+    client = llm.LLMClient(api_key="stub", base_url="http://127.0.0.1:9/v1", default_model="stub",
+                           metrics=Registry())
+    items = [{"location": "ok"}, {"location": "bad"}, {"location": "ok"}]
+    results = asyncio.run(llm.transform_batch(client, items, gazetteer=BrokenGazetteer(), concurrency=1))
+    assert [result.error is None for result in results] == [True, False, True]
+    assert results[1].record is None and "boom" in results[1].error
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import httpx
+import openai
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from retry import CONNECTION, RATE_LIMIT, SERVER, CircuitBreaker, CircuitOpenError, Retrier, RetryPolicy
+
+REQUEST = httpx.Request("POST", "http://127.0.0.1/v1/chat/completions")
+NO_WAIT = RetryPolicy(max_attempts=10, base_delay=0.0, max_delay=0.0)
+
+
+def failing(error_class, status, times):
+    """A call that raises ``error_class`` (HTTP ``status``) ``times`` times, then returns "ok"."""
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) <= times:
+            response = httpx.Response(status, request=REQUEST, headers={"retry-after": "0"})
+            raise error_class("failed", response=response, body=None)
+        return "ok"
+    return call
+
+
+def test_rate_limits_do_not_open_the_breaker():
+    retrier = Retrier({RATE_LIMIT: NO_WAIT}, CircuitBreaker(failure_threshold=2))
+    assert retrier.call(failing(openai.RateLimitError, 429, 5)) == "ok"
+    assert retrier.breaker.state == "closed"
+    assert retrier.stats.retries == {RATE_LIMIT: 5}
+
+
+def test_server_errors_open_the_breaker():
+    retrier = Retrier({SERVER: NO_WAIT}, CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    with pytest.raises(CircuitOpenError):
+        retrier.call(failing(openai.InternalServerError, 500, 5))
+    assert retrier.breaker.state == "open"
+
+
+def test_rate_limited_probe_frees_the_half_open_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    retrier = Retrier({RATE_LIMIT: RetryPolicy(max_attempts=1)}, breaker)
+    with pytest.raises(openai.RateLimitError):
+        retrier.call(failing(openai.RateLimitError, 429, 1))
+    # The probe's slot is free again, so the next call is let through and closes the circuit.
+    assert retrier.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_transport_errors_mid_stream_are_retried():
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) <= 2:
+            raise httpx.RemoteProtocolError("peer closed connection without sending complete message body")
+        return "ok"
+    retrier = Retrier({CONNECTION: NO_WAIT}, CircuitBreaker(failure_threshold=5))
+    assert retrier.call(call) == "ok"
+    assert retrier.stats.retries == {CONNECTION: 2}
+
+
+def test_local_errors_are_not_retried_and_keep_the_breaker_state():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    retrier = Retrier(breaker=breaker)
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise TypeError("bug")
+    with pytest.raises(TypeError):
+        retrier.call(call)
+    assert len(calls) == 1
+    # The earlier server failure still counts: one more opens the circuit.
+    breaker.record_failure()
+    assert breaker.state == "open"
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+from llm import LLMClient, transform_one
+from metrics import Registry
+from stub_server import serve
+
+MESSAGES = [
+    {"role": "system", "content": "Transform the recipe."},
+    {"role": "user", "content": 'Input JSON: {"title": "آش رشته", "ingredients": ["رشته", "نخود"]}'},
+]
+
+
+@pytest.fixture
+def base_url():
+    server = serve(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def token_counts(registry):
+    counters = registry.snapshot()["counters"]
+    return {name: [(series["labels"]["estimated"], series["value"]) for series in counters[name]]
+            for name in ("llm_prompt_tokens_total", "llm_completion_tokens_total")}
+
+
+@pytest.mark.parametrize("stream_usage, estimated", [(True, "False"), (False, "True")])
+def test_streamed_requests_count_tokens(base_url, stream_usage, estimated):
+    registry = Registry()
+    client = LLMClient(api_key="stub", base_url=base_url, default_model="stub", metrics=registry,
+                       stream_usage=stream_usage)
+    tokens = []
+    record = asyncio.run(client.async_json_completion(MESSAGES, on_tokens=tokens.append))
+    assert "ingredients" in record
+    counts = token_counts(registry)
+    # Reported usage when the stream ends with a usage chunk, an estimate otherwise.
+    assert [label for label, _ in counts["llm_prompt_tokens_total"]] == [estimated]
+    assert counts["llm_prompt_tokens_total"][0][1] > 0
+    assert counts["llm_completion_tokens_total"][0][1] > 0
+    assert tokens == [counts["llm_prompt_tokens_total"][0][1] + counts["llm_completion_tokens_total"][0][1]]
+
+
+def test_streamed_records_report_their_tokens(base_url):
+    client = LLMClient(api_key="stub", base_url=base_url, default_model="stub", metrics=Registry())
+    item = {"title": "آش رشته", "ingredients": ["رشته", "نخود"], "instructions": ["بپزید"]}
+    streamed = asyncio.run(transform_one(client, 0, item, None, 0, 1500, stream=True))
+    plain = asyncio.run(transform_one(client, 0, item, None, 0, 1500, stream=False))
+    assert streamed.error is None and plain.error is None
+    assert streamed.total_tokens > 0
+    assert streamed.total_tokens == plain.total_tokens
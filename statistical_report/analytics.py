@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "corpus"))
+from columnar import ColumnarCorpus, analyze
+from jsonstream import iter_records
+from statistical_report import DEFAULT_INPUT, REPORT_FIELDS
+
+
+def write_analytics(result, report):
+    report.write(f"Total number of records: {result['records']}\n")
+    report.write(f"Total tokens: {result['tokens']}\n")
+    report.write(f"Vocabulary size: {result['vocabulary']}\n")
+    report.write(f"Type-token ratio: {result['type_token_ratio']:.4f}\n\n")
+
+    report.write("Character-length histogram per field:\n")
+    for field in sorted(result["fields"]):
+        summary = result["fields"][field]
+        report.write(f"- {field} ({summary['values']} values, average {summary['mean_chars']:.2f} characters, "
+                     f"{summary['mean_words']:.2f} words, longest {summary['max_chars']}):\n")
+        for bucket, count in summary["chars_histogram"].items():
+            report.write(f"    • {bucket:>11}: {count}\n")
+
+    report.write("\nMost frequent values:\n")
+    for field in sorted(result["top"]):
+        report.write(f"- {field}:\n")
+        for value, count in result["top"][field]:
+            report.write(f"    • {value or '(empty)'}: {count}\n")
+
+    report.write("\nPer province:\n")
+    for province, group in sorted(result["groups"].items(), key=lambda item: -item[1]["recipes"]):
+        report.write(f"- {province or '(unknown)'}: {group['recipes']} recipes, "
+                     f"{group['mean_ingredients']:.2f} ingredients and {group['mean_instructions']:.2f} steps "
+                     f"({group['mean_instruction_words']:.1f} words) per recipe, "
+                     f"{group['tokens']} tokens, vocabulary {group['vocabulary']}, "
+                     f"type-token ratio {group['type_token_ratio']:.4f}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Histograms, top values and per-province breakdowns of a recipe "
+                                                 "corpus, computed over columnar NumPy arrays.")
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="JSON array or JSONL corpus")
+    parser.add_argument("--output", default="analytics_report.txt")
+    parser.add_argument("--json", help="also write the raw results as JSON to this path")
+    parser.add_argument("--top", type=int, default=10, help="values to list per categorical field")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    corpus = ColumnarCorpus.from_records(iter_records(args.input), REPORT_FIELDS)
+    loaded = time.perf_counter()
+    result = analyze(corpus, k=args.top)
+    analyzed = time.perf_counter()
+
+    with open(args.output, "w", encoding="utf-8") as report:
+        write_analytics(result, report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print(f"Loaded {corpus.records} records in {loaded - started:.2f}s, analyzed in {analyzed - loaded:.3f}s")
+    print(f"Full report saved to '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Throughput of the columnar analytics against the per-record ``CorpusStats`` loop on a
+synthetic corpus built by perturbing the real records.
+
+    python bench_columnar.py --records 1000000
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "corpus"))
+from columnar import ColumnarCorpus, analyze
+from jsonstream import iter_records
+from statistical_report import DEFAULT_INPUT, REPORT_FIELDS
+from stats import CorpusStats
+
+
+def synthetic_records(templates, count, seed=0):
+    """``count`` records drawn from ``templates`` with a unique title suffix and shuffled
+    province, ingredients and instructions, generated lazily."""
+    rng = random.Random(seed)
+    provinces = sorted({(t.get("location") or {}).get("province") or "" for t in templates})
+    for i in range(count):
+        record = copy.copy(rng.choice(templates))
+        record["title"] = f"{record.get('title') or ''} {i}"
+        record["location"] = dict(record.get("location") or {}, province=rng.choice(provinces))
+        record["ingredients"] = rng.sample(record.get("ingredients") or [], len(record.get("ingredients") or []))
+        record["instructions"] = rng.sample(record.get("instructions") or [], len(record.get("instructions") or []))
+        yield record
+
+
+def timed(label, count, run):
+    started = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:8.2f}s  {count / elapsed:12,.0f} records/s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="real corpus the synthetic records are drawn from")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--compare", type=int, default=None,
+                        help="records for the per-record baseline, 0 to skip it (default: same as --records)")
+    parser.add_argument("--memory", action="store_true", help="trace peak memory of the columnar load (slower)")
+    args = parser.parse_args()
+    compare = args.records if args.compare is None else args.compare
+
+    templates = list(iter_records(args.input))
+    print(f"{args.records:,} synthetic records from {len(templates)} templates")
+
+    if args.memory:
+        tracemalloc.start()
+    corpus, load_seconds = timed("columnar load", args.records,
+                         lambda: ColumnarCorpus.from_records(synthetic_records(templates, args.records), REPORT_FIELDS))
+    if args.memory:
+        print(f"{'':<28} peak {tracemalloc.get_traced_memory()[1] / 2 ** 20:8.1f} MiB")
+        tracemalloc.stop()
+    result, analyze_seconds = timed("columnar analyze", args.records, lambda: analyze(corpus))
+    print(f"{'':<28} {result['tokens']:,} tokens, vocabulary {result['vocabulary']:,}, "
+          f"{len(result['groups'])} provinces")
+
+    if not compare:
+        return
+    baseline, baseline_seconds = timed("per-record CorpusStats", compare,
+                                       lambda: CorpusStats(REPORT_FIELDS).add_all(synthetic_records(templates, compare)))
+    timed("generation alone", compare, lambda: sum(1 for _ in synthetic_records(templates, compare)))
+    columnar_seconds = (load_seconds + analyze_seconds) * compare / args.records
+    print(f"end to end: columnar {columnar_seconds:.2f}s against {baseline_seconds:.2f}s per-record "
+          f"({baseline_seconds / columnar_seconds:.2f}x), both including record generation")
+
+    if compare == args.records:
+        agree = baseline.words == result["tokens"] and all(
+            baseline.chars[name].mean == summary["mean_chars"] and baseline.word_counts[name].mean == summary["mean_words"]
+            for name, summary in result["fields"].items())
+        print(f"averages agree with CorpusStats: {agree}")
+
+
+if __name__ == '__main__':
+    main()
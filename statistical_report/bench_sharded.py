@@ -0,0 +1,51 @@
+"""Scaling of the sharded statistics over process counts on a synthetic JSONL corpus,
+checking every run against the serial pass.
+
+    python bench_sharded.py --records 200000 --processes 1 2 4 8
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "corpus"))
+from bench_columnar import synthetic_records
+from jsonstream import iter_records
+from sharded import sharded_stats
+from statistical_report import DEFAULT_INPUT, REPORT_FIELDS, report_json
+from stats import CATEGORICAL_FIELDS, CorpusStats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="real corpus the synthetic records are drawn from")
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    templates = list(iter_records(args.input))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "corpus.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for record in synthetic_records(templates, args.records):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"{args.records:,} records, {os.path.getsize(path) / 2 ** 20:.1f} MiB JSONL, "
+              f"{os.cpu_count()} cores")
+
+        started = time.perf_counter()
+        serial = report_json(CorpusStats(REPORT_FIELDS, counted=CATEGORICAL_FIELDS).add_all(iter_records(path)))
+        baseline = time.perf_counter() - started
+        print(f"{'serial':<14} {baseline:8.2f}s  {args.records / baseline:10,.0f} records/s")
+
+        for processes in sorted(set(args.processes)):
+            started = time.perf_counter()
+            stats = sharded_stats([path], REPORT_FIELDS, processes, counted=CATEGORICAL_FIELDS)
+            elapsed = time.perf_counter() - started
+            print(f"{f'{processes} processes':<14} {elapsed:8.2f}s  {args.records / elapsed:10,.0f} records/s  "
+                  f"speedup {baseline / elapsed:5.2f}x  identical {report_json(stats) == serial}")
+
+
+if __name__ == '__main__':
+    main()
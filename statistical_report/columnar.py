@@ -0,0 +1,269 @@
+from array import array
+from itertools import chain, count
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from stats import CATEGORICAL_FIELDS, Field
+
+# Records flattened into the columns at once.
+BATCH_RECORDS = 1 << 13
+# Records whose tokens are mapped to their group at once when counting per-group vocabularies.
+CHUNK_RECORDS = 1 << 16
+# Character-length histogram bucket edges: 0, 1, 2-3, 4-7, ... up to 2^16 and beyond.
+HISTOGRAM_EDGES = np.array([0, 1] + [2 ** i for i in range(1, 17)] + [np.iinfo(np.int64).max])
+HISTOGRAM_LABELS = (["0", "1"] + [f"{2 ** i}-{2 ** (i + 1) - 1}" for i in range(1, 16)] + [f"{2 ** 16}+"])
+
+
+def _append(buffer: array, values: np.ndarray):
+    # Columns grow in array.array buffers, which NumPy can later view without a copy;
+    # concatenating per-batch arrays would briefly need twice the corpus' memory.
+    buffer.frombytes(values.astype(np.int32, copy=False).tobytes())
+
+
+class Categorical:
+    """Dictionary encoding: every distinct value gets the next integer code.
+
+    Codes follow insertion order, so ``values`` is just the dictionary's keys and encoding
+    is a single ``setdefault`` that hot loops can inline.
+    """
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        return self.codes.setdefault(value, len(self.codes))
+
+    def encode_all(self, values: List[str]) -> List[int]:
+        codes = self.codes
+        return [codes.setdefault(value, len(codes)) for value in values]
+
+    @property
+    def values(self) -> List[str]:
+        return list(self.codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+
+class FieldColumn:
+    """One row per value of a ``Field``: owning record, character length, word count and,
+    for categorical fields, the value's code."""
+
+    def __init__(self, name: str, categorical: bool):
+        self.name = name
+        self.categories = Categorical() if categorical else None
+        self._owner = array("i")
+        self._chars = array("i")
+        self._words = array("i")
+        self._codes = array("i")
+        self.owner = self.chars = self.words = self.codes = None
+
+    def extend(self, owner: np.ndarray, chars: np.ndarray, words: np.ndarray, codes: Optional[np.ndarray]):
+        _append(self._owner, owner)
+        _append(self._chars, chars)
+        _append(self._words, words)
+        if codes is not None:
+            _append(self._codes, codes)
+
+    def freeze(self):
+        self.owner = np.frombuffer(self._owner, dtype=np.int32)
+        self.chars = np.frombuffer(self._chars, dtype=np.int32)
+        self.words = np.frombuffer(self._words, dtype=np.int32)
+        self.codes = np.frombuffer(self._codes, dtype=np.int32) if self.categories is not None else None
+
+
+def flatten(field: Field, records: List[Dict[str, Any]]) -> Tuple[np.ndarray, List[str]]:
+    """``field.values`` of every record in a batch, concatenated, plus the index in ``records``
+    of each value's owner. Each path segment is one comprehension over the whole batch and
+    fan-outs repeat the owners with NumPy, instead of walking the path record by record."""
+    owners = np.arange(len(records), dtype=np.int32)
+    level: List[Any] = records
+    last = len(field._segments) - 1
+    for depth, (key, fan_out) in enumerate(field._segments):
+        children = [value.get(key) if isinstance(value, dict) else None for value in level]
+        if fan_out:
+            children = [child or () for child in children]
+            owners = np.repeat(owners, np.fromiter(map(len, children), dtype=np.int64, count=len(children)))
+            level = list(chain.from_iterable(children))
+        else:
+            missing = {} if depth < last else ""
+            level = [missing if child is None else child for child in children]
+    return owners, list(map(field.convert, level))
+
+
+class ColumnarCorpus:
+    """A record stream flattened once into NumPy columns.
+
+    Every ``Field`` becomes a ``FieldColumn`` and every whitespace token of every value is
+    dictionary-encoded into ``tokens``, with ``tokens_per_record`` marking record boundaries.
+    Records are consumed as they stream, a batch at a time, so only the columns and one
+    batch are held in memory.
+    """
+
+    def __init__(self, fields: List[Field]):
+        self.fields = fields
+        self.records = 0
+        self.columns = {field.name: FieldColumn(field.name, field.name in CATEGORICAL_FIELDS) for field in fields}
+        self.vocabulary = Categorical()
+        self._tokens = array("i")
+        self._tokens_per_record = array("i")
+        self.tokens = self.tokens_per_record = None
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], fields: List[Field],
+                     batch_records: int = BATCH_RECORDS) -> "ColumnarCorpus":
+        corpus = cls(fields)
+        batch: List[Dict[str, Any]] = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == batch_records:
+                corpus._add_batch(batch)
+                batch = []
+        if batch:
+            corpus._add_batch(batch)
+        corpus._freeze()
+        return corpus
+
+    def _add_batch(self, records: List[Dict[str, Any]]):
+        """Flatten a batch field by field, so each column grows by whole arrays.
+
+        Values repeat heavily (units, names, provinces, shared instruction steps), so each
+        distinct value of the batch is measured, split and encoded once and every value then
+        gathers its distinct value's tokens with NumPy. Tokens come out grouped by field and
+        are put back in record order with one stable sort.
+        """
+        token_codes, token_owners = [], []
+        for field in self.fields:
+            owners, values = flatten(field, records)
+            positions = dict(zip(dict.fromkeys(values), count()))
+            index = np.fromiter(map(positions.__getitem__, values), dtype=np.int64, count=len(values))
+            distinct = list(positions)
+            splits = list(map(str.split, distinct))
+            distinct_words = np.fromiter(map(len, splits), dtype=np.int64, count=len(splits))
+            distinct_chars = np.fromiter(map(len, distinct), dtype=np.int32, count=len(distinct))
+            distinct_tokens = self._encode_tokens(list(chain.from_iterable(splits)))
+
+            column = self.columns[field.name]
+            words = distinct_words[index]
+            codes = None
+            if column.categories is not None:
+                codes = np.array(column.categories.encode_all(distinct), dtype=np.int32)[index]
+            column.extend(owners + self.records, distinct_chars[index], words, codes)
+
+            # Token i of value v is distinct_tokens[start of v's distinct value + i].
+            distinct_starts = np.cumsum(distinct_words) - distinct_words
+            value_starts = np.cumsum(words) - words
+            gather = np.repeat(distinct_starts[index] - value_starts, words) + np.arange(words.sum())
+            token_codes.append(distinct_tokens[gather])
+            token_owners.append(np.repeat(owners, words))
+        owners = np.concatenate(token_owners)
+        _append(self._tokens, np.concatenate(token_codes)[np.argsort(owners, kind="stable")])
+        _append(self._tokens_per_record, np.bincount(owners, minlength=len(records)))
+        self.records += len(records)
+
+    def _encode_tokens(self, words: List[str]) -> np.ndarray:
+        # New words are coded in order of first appearance, then the whole batch is looked up
+        # at C speed; a per-word setdefault in Python would dominate the load.
+        codes = self.vocabulary.codes
+        for word in dict.fromkeys(words):
+            if word not in codes:
+                codes[word] = len(codes)
+        return np.fromiter(map(codes.__getitem__, words), dtype=np.int32, count=len(words))
+
+    def _freeze(self):
+        for column in self.columns.values():
+            column.freeze()
+        self.tokens = np.frombuffer(self._tokens, dtype=np.int32)
+        self.tokens_per_record = np.frombuffer(self._tokens_per_record, dtype=np.int32)
+
+    def record_codes(self, name: str) -> np.ndarray:
+        """Per-record code of a single-valued categorical field (-1 where the record has none)."""
+        column = self.columns[name]
+        codes = np.full(self.records, -1, dtype=np.int32)
+        codes[column.owner] = column.codes
+        return codes
+
+
+def top_k(codes: np.ndarray, categories: Categorical, k: int, weights: Optional[np.ndarray] = None):
+    counts = np.bincount(codes, weights=weights, minlength=len(categories))
+    order = np.argsort(-counts, kind="stable")[:k]
+    values = categories.values
+    return [(values[code], int(counts[code])) for code in order if counts[code]]
+
+
+def group_sum(owner: np.ndarray, groups: np.ndarray, group_count: int,
+              weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """Rows (or the sum of ``weights``) per group, for rows owned by records in ``groups``."""
+    row_groups = groups[owner]
+    keep = row_groups >= 0
+    return np.bincount(row_groups[keep], weights=None if weights is None else weights[keep], minlength=group_count)
+
+
+def distinct_tokens_per_group(corpus: ColumnarCorpus, groups: np.ndarray, group_count: int,
+                              chunk_records: int = CHUNK_RECORDS) -> np.ndarray:
+    """Vocabulary size of each group, from a group x vocabulary presence matrix filled a
+    chunk of records at a time so the per-token group array never spans the whole corpus."""
+    present = np.zeros((group_count, len(corpus.vocabulary)), dtype=bool)
+    ends = np.cumsum(corpus.tokens_per_record, dtype=np.int64)
+    for first in range(0, corpus.records, chunk_records):
+        last = min(first + chunk_records, corpus.records)
+        start = ends[first - 1] if first else 0
+        token_groups = np.repeat(groups[first:last], corpus.tokens_per_record[first:last])
+        tokens = corpus.tokens[start:ends[last - 1]]
+        keep = token_groups >= 0
+        present[token_groups[keep], tokens[keep]] = True
+    return present.sum(axis=1)
+
+
+def analyze(corpus: ColumnarCorpus, k: int = 10, group_by: str = "location.province") -> Dict[str, Any]:
+    """All corpus statistics from vectorized reductions over the columns."""
+    tokens = len(corpus.tokens)
+    vocabulary = len(corpus.vocabulary)
+    result = {
+        "records": corpus.records,
+        "tokens": tokens,
+        "vocabulary": vocabulary,
+        "type_token_ratio": vocabulary / tokens if tokens else 0.0,
+        "fields": {},
+        "top": {},
+        "groups": {},
+    }
+
+    for name, column in corpus.columns.items():
+        if not len(column.chars):
+            continue
+        histogram, _ = np.histogram(column.chars, bins=HISTOGRAM_EDGES)
+        result["fields"][name] = {
+            "values": int(len(column.chars)),
+            "mean_chars": float(column.chars.sum(dtype=np.int64) / len(column.chars)),
+            "mean_words": float(column.words.sum(dtype=np.int64) / len(column.words)),
+            "max_chars": int(column.chars.max()),
+            "chars_histogram": {label: int(count) for label, count in zip(HISTOGRAM_LABELS, histogram) if count},
+        }
+        if column.categories is not None:
+            result["top"][name] = top_k(column.codes, column.categories, k)
+
+    group_column = corpus.columns[group_by]
+    group_count = len(group_column.categories)
+    groups = corpus.record_codes(group_by)
+    has_group = groups >= 0
+    recipes = np.bincount(groups[has_group], minlength=group_count)
+    ingredients = group_sum(corpus.columns["ingredients.name"].owner, groups, group_count)
+    instructions = corpus.columns["instructions"]
+    steps = group_sum(instructions.owner, groups, group_count)
+    step_words = group_sum(instructions.owner, groups, group_count, instructions.words)
+    group_tokens = np.bincount(groups[has_group], weights=corpus.tokens_per_record[has_group], minlength=group_count)
+    group_vocabulary = distinct_tokens_per_group(corpus, groups, group_count)
+
+    for code, value in enumerate(group_column.categories.values):
+        result["groups"][value] = {
+            "recipes": int(recipes[code]),
+            "mean_ingredients": float(ingredients[code] / recipes[code]),
+            "mean_instructions": float(steps[code] / recipes[code]),
+            "mean_instruction_words": float(step_words[code] / recipes[code]),
+            "tokens": int(group_tokens[code]),
+            "vocabulary": int(group_vocabulary[code]),
+            "type_token_ratio": float(group_vocabulary[code] / group_tokens[code]) if group_tokens[code] else 0.0,
+        }
+    return result
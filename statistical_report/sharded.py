@@ -0,0 +1,56 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterable, List, NamedTuple, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "corpus"))
+from jsonstream import is_json_array, iter_records, jsonl_ranges
+from stats import CorpusStats, Field
+
+
+class Shard(NamedTuple):
+    """A byte range of a JSONL file, or a whole JSON array file (``end`` is None)."""
+    path: str
+    start: int = 0
+    end: Optional[int] = None
+
+
+def plan_shards(paths: Iterable[str], parts: int) -> List[Shard]:
+    """One shard per JSON array file and ``parts`` byte ranges per JSONL file."""
+    shards = []
+    for path in paths:
+        if is_json_array(path):
+            shards.append(Shard(path))
+        else:
+            shards.extend(Shard(path, start, end) for start, end in jsonl_ranges(path, parts))
+    return shards
+
+
+def shard_stats(shard: Shard, fields: List[Field], relative_accuracy: float = 0.01,
+                counted: Iterable[str] = ()) -> CorpusStats:
+    stats = CorpusStats(fields, relative_accuracy, counted)
+    return stats.add_all(iter_records(shard.path, shard.start, shard.end))
+
+
+def sharded_stats(paths: List[str], fields: List[Field], processes: Optional[int] = None,
+                  parts: Optional[int] = None, relative_accuracy: float = 0.01,
+                  counted: Iterable[str] = ()) -> CorpusStats:
+    """``CorpusStats`` of all records of ``paths``, computed shard by shard in a process pool.
+
+    Partial results are merged in shard order; since every part of ``CorpusStats`` merges
+    exactly, the result equals a serial pass over the same files. With ``processes=0`` the
+    shards run one after another in this process.
+    """
+    processes = (os.cpu_count() or 1) if processes is None else processes
+    shards = plan_shards(paths, parts or max(processes, 1) * 4)
+    run = partial(shard_stats, fields=fields, relative_accuracy=relative_accuracy, counted=counted)
+    total = CorpusStats(fields, relative_accuracy, counted)
+    if not processes:
+        for shard in shards:
+            total.merge(run(shard))
+        return total
+    with ProcessPoolExecutor(processes) as pool:
+        for partial_stats in pool.map(run, shards):
+            total.merge(partial_stats)
+    return total
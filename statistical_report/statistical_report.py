@@ -1,76 +1,115 @@
+import argparse
 import json
-
-with open("../output/aggregated_with_id.json", encoding="utf-8") as f:
-    data = json.load(f)
-
-
-def count_words(text):
-    if text is None:
-        return 0
-    return len(str(text).split())
-
-
-total_records = len(data)
-total_word_count = 0
-char_lengths = {}
-word_lengths = {}
-
-
-for record in data:
-    title = str(record.get("title", "") or "")
-    total_word_count += count_words(title)
-    char_lengths.setdefault("title", []).append(len(title))
-    word_lengths.setdefault("title", []).append(count_words(title))
-
-
-    province = str(record.get("location", {}).get("province", "") or "")
-    city = str(record.get("location", {}).get("city", "") or "")
-    char_lengths.setdefault("location.province", []).append(len(province))
-    word_lengths.setdefault("location.province", []).append(count_words(province))
-    char_lengths.setdefault("location.city", []).append(len(city))
-    word_lengths.setdefault("location.city", []).append(count_words(city))
-    total_word_count += count_words(province) + count_words(city)
-
-    for ing in record.get("ingredients", []):
-        name = str(ing.get("name", "") or "")
-        unit = str(ing.get("unit", "") or "")
-        amount = ing.get("amount", "")
-        amount_str = str(amount) if amount is not None else ""
-
-        for field_name, value in [("ingredients.name", name), ("ingredients.unit", unit), ("ingredients.amount", amount_str)]:
-            char_lengths.setdefault(field_name, []).append(len(value))
-            word_lengths.setdefault(field_name, []).append(count_words(value))
-            total_word_count += count_words(value)
-
-    for instr in record.get("instructions", []):
-        instr_str = str(instr or "")
-        char_lengths.setdefault("instructions", []).append(len(instr_str))
-        word_lengths.setdefault("instructions", []).append(count_words(instr_str))
-        total_word_count += count_words(instr_str)
-
-    for mt in record.get("meal_type", []):
-        mt_str = str(mt or "")
-        char_lengths.setdefault("meal_type", []).append(len(mt_str))
-        word_lengths.setdefault("meal_type", []).append(count_words(mt_str))
-        total_word_count += count_words(mt_str)
-
-    for oc in record.get("occasion", []):
-        oc_str = str(oc or "")
-        char_lengths.setdefault("occasion", []).append(len(oc_str))
-        word_lengths.setdefault("occasion", []).append(count_words(oc_str))
-        total_word_count += count_words(oc_str)
-
-avg_char_lengths = {field: sum(lengths) / len(lengths) for field, lengths in char_lengths.items()}
-avg_word_lengths = {field: sum(lengths) / len(lengths) for field, lengths in word_lengths.items()}
-
-with open("statistical_report.txt", "w", encoding="utf-8") as report:
-    report.write(f"Total number of records: {total_records}\n")
-    report.write(f"Total word count (including numbers): {total_word_count}\n\n")
+import os
+import sys
+from itertools import chain
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "corpus"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from jsonstream import iter_records
+from metrics import REGISTRY
+from sharded import sharded_stats
+from stats import CATEGORICAL_FIELDS, CorpusStats, Field, RunningStats, as_text_keep_zero
+
+DEFAULT_INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output", "aggregated_with_id.json")
+
+REPORT_FIELDS = [
+    Field("title"),
+    Field("location.province"),
+    Field("location.city"),
+    Field("ingredients[].name"),
+    Field("ingredients[].unit"),
+    Field("ingredients[].amount", as_text_keep_zero),
+    Field("instructions[]"),
+    Field("meal_type[]"),
+    Field("occasion[]"),
+]
+
+QUANTILES = (0.5, 0.9, 0.99)
+TOP_K = 20
+
+
+def write_report(stats: CorpusStats, report, detailed: bool = False):
+    report.write(f"Total number of records: {stats.records}\n")
+    report.write(f"Total word count (including numbers): {stats.words}\n\n")
 
     report.write("Average lengths per field:\n")
-    for field in sorted(avg_char_lengths.keys()):
+    for field in sorted(stats.chars.keys()):
         report.write(f"- {field}:\n")
-        report.write(f"    • Average characters: {avg_char_lengths[field]:.2f}\n")
-        report.write(f"    • Average words:      {avg_word_lengths[field]:.2f}\n")
-
-print("Full report saved to 'statistical_report.txt'")
\ No newline at end of file
+        report.write(f"    • Average characters: {stats.chars[field].mean:.2f}\n")
+        report.write(f"    • Average words:      {stats.word_counts[field].mean:.2f}\n")
+
+    if not detailed:
+        return
+    report.write(f"\nDistribution per field (quantiles within {stats.relative_accuracy:.0%}):\n")
+    for field in sorted(stats.chars.keys()):
+        report.write(f"- {field} ({stats.chars[field].count} values):\n")
+        for label, running in (("characters", stats.chars[field]), ("words", stats.word_counts[field])):
+            quantiles = ", ".join(f"p{q * 100:g} {running.quantile(q):.1f}" for q in QUANTILES)
+            report.write(f"    • {label + ':':<11} std {running.variance ** 0.5:.2f}, "
+                         f"min {running.min}, max {running.max}, {quantiles}\n")
+
+
+def summarize(running: RunningStats) -> dict:
+    return {
+        "count": running.count,
+        "mean": running.mean,
+        "std": running.variance ** 0.5,
+        "min": running.min,
+        "max": running.max,
+        "quantiles": {f"p{q * 100:g}": running.quantile(q) for q in QUANTILES},
+    }
+
+
+def report_json(stats: CorpusStats, top_k: int = TOP_K) -> dict:
+    """Everything ``write_report --detailed`` prints, plus the top values of counted fields."""
+    return {
+        "records": stats.records,
+        "words": stats.words,
+        "relative_accuracy": stats.relative_accuracy,
+        "fields": {field: {"characters": summarize(stats.chars[field]), "words": summarize(stats.word_counts[field])}
+                   for field in sorted(stats.chars)},
+        "top": {field: stats.top(field, top_k) for field in sorted(stats.value_counts)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-field length statistics of a recipe corpus.")
+    parser.add_argument("--input", nargs="+", default=[DEFAULT_INPUT],
+                        help="JSON array or JSONL corpus files, e.g. the per-province outputs")
+    parser.add_argument("--output", default="statistical_report.txt")
+    parser.add_argument("--json", help="also write a machine-readable report with top values to this path")
+    parser.add_argument("--detailed", action="store_true",
+                        help="also report spread, extremes and quantiles per field")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="split the input into shards computed by this many processes (default: serial)")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="byte ranges per JSONL input (default: four per process); "
+                             "JSON array inputs are one shard each")
+    parser.add_argument("--metrics", default=None,
+                        help="write stage timings here at the end (Prometheus text for .prom/.txt, JSON otherwise)")
+    args = parser.parse_args()
+
+    counted = CATEGORICAL_FIELDS if args.json else ()
+    with REGISTRY.timer("report_stage", stage="compute"):
+        if args.processes:
+            stats = sharded_stats(args.input, REPORT_FIELDS, args.processes, args.shards, counted=counted)
+        else:
+            stats = CorpusStats(REPORT_FIELDS, counted=counted).add_all(
+                chain.from_iterable(iter_records(path) for path in args.input))
+    REGISTRY.counter("report_records_total").inc(stats.records)
+    with REGISTRY.timer("report_stage", stage="write"):
+        with open(args.output, "w", encoding="utf-8") as report:
+            write_report(stats, report, args.detailed)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report_json(stats), f, ensure_ascii=False, indent=2)
+
+    print(f"Full report saved to '{args.output}'")
+    if args.metrics:
+        REGISTRY.write(args.metrics)
+        print(f"Metrics written to {args.metrics}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+import math
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Fields with a small set of repeated values, worth counting for top-k and group-by reports.
+CATEGORICAL_FIELDS = ("location.province", "location.city", "ingredients.name", "ingredients.unit",
+                      "meal_type", "occasion")
+
+
+def count_words(text):
+    if text is None:
+        return 0
+    return len(str(text).split())
+
+
+def as_text(value) -> str:
+    return str(value or "")
+
+
+def as_text_keep_zero(value) -> str:
+    """Like ``as_text`` but keeps falsy numbers such as ``0``; only ``None`` becomes empty."""
+    return str(value) if value is not None else ""
+
+
+class Field:
+    """A text field to measure, addressed by a dotted path whose ``[]`` segments fan out over lists.
+
+    ``Field("ingredients[].name")`` yields the name of every ingredient of a record and is
+    reported as ``ingredients.name``. A missing key reads as an empty value; a missing list
+    as no values at all.
+    """
+
+    def __init__(self, path: str, convert: Callable[[Any], str] = as_text):
+        self.path = path
+        self.name = path.replace("[]", "")
+        self.convert = convert
+        self._segments = [(segment.rstrip("[]"), segment.endswith("[]")) for segment in path.split(".")]
+
+    def values(self, record: Dict[str, Any]) -> List[str]:
+        # One level of the path at a time rather than a recursive generator: this runs for
+        # every field of every record, so call overhead is most of its cost.
+        level = [record]
+        last = len(self._segments) - 1
+        for depth, (key, fan_out) in enumerate(self._segments):
+            children = []
+            for value in level:
+                child = value.get(key) if isinstance(value, dict) else None
+                if fan_out:
+                    children.extend(child or [])
+                elif child is None:
+                    children.append({} if depth < last else "")
+                else:
+                    children.append(child)
+            level = children
+        return [self.convert(value) for value in level]
+
+
+class QuantileSketch:
+    """Mergeable DDSketch-style quantile sketch for non-negative values.
+
+    Values fall into logarithmic buckets ``(gamma^(i-1), gamma^i]``, so any quantile is
+    returned within ``relative_accuracy`` of a value actually at that rank, using memory
+    that grows with the log of the value range rather than with the number of values.
+    Merging adds bucket counts, so merged sketches equal the sketch of the combined data.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.zeros = 0
+        self.count = 0
+        self.buckets: Dict[int, int] = {}
+
+    def add(self, value: float, count: int = 1):
+        self.count += count
+        if value <= 0:
+            self.zeros += count
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other: "QuantileSketch"):
+        self.count += other.count
+        self.zeros += other.zeros
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class RunningStats:
+    """Count, mean, variance, min/max and quantile sketch of a stream of integers in O(1) memory.
+
+    Sums are kept as exact integers, so the mean equals ``sum(values) / len(values)`` to the
+    last bit and merged partial results are identical to a single pass.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.count = 0
+        self.total = 0
+        self.total_squares = 0
+        self.min = None
+        self.max = None
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value: int):
+        self.count += 1
+        self.total += value
+        self.total_squares += value * value
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+        self.sketch.add(value)
+
+    def merge(self, other: "RunningStats"):
+        self.count += other.count
+        self.total += other.total
+        self.total_squares += other.total_squares
+        for bound, pick in (("min", min), ("max", max)):
+            values = [v for v in (getattr(self, bound), getattr(other, bound)) if v is not None]
+            setattr(self, bound, pick(values) if values else None)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count
+
+    @property
+    def variance(self) -> float:
+        """Population variance, computed exactly from the integer sums."""
+        return (self.total_squares * self.count - self.total * self.total) / (self.count * self.count)
+
+    def quantile(self, q: float) -> Optional[float]:
+        estimate = self.sketch.quantile(q)
+        return None if estimate is None else min(max(estimate, self.min), self.max)
+
+
+class CorpusStats:
+    """Streams records once and keeps character and word ``RunningStats`` per ``Field``,
+    plus exact value counts for the fields named in ``counted`` (for top-k reports).
+
+    Every part is mergeable, so statistics of shards merged in any order equal a single pass.
+    """
+
+    def __init__(self, fields: List[Field], relative_accuracy: float = 0.01, counted: Iterable[str] = ()):
+        self.fields = fields
+        self.relative_accuracy = relative_accuracy
+        self.counted = frozenset(counted)
+        self.records = 0
+        self.words = 0
+        self.chars: Dict[str, RunningStats] = {}
+        self.word_counts: Dict[str, RunningStats] = {}
+        self.value_counts: Dict[str, Counter] = {name: Counter() for name in self.counted}
+
+    def add(self, record: Dict[str, Any]):
+        self.records += 1
+        for field in self.fields:
+            for value in field.values(record):
+                words = count_words(value)
+                self.words += words
+                if field.name not in self.chars:
+                    self.chars[field.name] = RunningStats(self.relative_accuracy)
+                    self.word_counts[field.name] = RunningStats(self.relative_accuracy)
+                self.chars[field.name].add(len(value))
+                self.word_counts[field.name].add(words)
+                if field.name in self.counted:
+                    self.value_counts[field.name][value] += 1
+
+    def add_all(self, records: Iterable[Dict[str, Any]]) -> "CorpusStats":
+        for record in records:
+            self.add(record)
+        return self
+
+    def merge(self, other: "CorpusStats"):
+        self.records += other.records
+        self.words += other.words
+        for name in other.chars:
+            if name not in self.chars:
+                self.chars[name] = RunningStats(self.relative_accuracy)
+                self.word_counts[name] = RunningStats(self.relative_accuracy)
+            self.chars[name].merge(other.chars[name])
+            self.word_counts[name].merge(other.word_counts[name])
+        for name, counts in other.value_counts.items():
+            self.value_counts.setdefault(name, Counter()).update(counts)
+        return self
+
+    def top(self, name: str, k: int) -> List[Tuple[str, int]]:
+        """The ``k`` most frequent values of a counted field; ties go to the smaller value so
+        the result does not depend on the order shards were merged in."""
+        return sorted(self.value_counts[name].items(), key=lambda item: (-item[1], item[0]))[:k]
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "corpus"))
+from columnar import ColumnarCorpus, analyze
+from jsonstream import iter_records
+from statistical_report import DEFAULT_INPUT, REPORT_FIELDS
+from stats import CorpusStats
+
+# Records the path walk has to tolerate: missing and null lists, a string where a list is
+# expected, non-dict ingredients and falsy amounts.
+ODD_RECORDS = [
+    {},
+    {"ingredients": None, "location": "تبریز", "instructions": "یک دو"},
+    {"ingredients": [{"amount": 0}, "نمک"], "meal_type": [], "title": "  "},
+]
+
+
+@pytest.fixture(scope="module")
+def records():
+    return list(iter_records(DEFAULT_INPUT)) + ODD_RECORDS
+
+
+@pytest.mark.parametrize("batch_records", [1, 7, 1 << 13])
+def test_columns_match_a_per_record_pass(records, batch_records):
+    corpus = ColumnarCorpus.from_records(iter(records), REPORT_FIELDS, batch_records=batch_records)
+    baseline = CorpusStats(REPORT_FIELDS, counted=["location.province"]).add_all(records)
+    result = analyze(corpus)
+
+    assert corpus.records == len(records)
+    assert result["tokens"] == baseline.words
+    for name, summary in result["fields"].items():
+        assert summary["values"] == baseline.chars[name].count
+        assert summary["mean_chars"] == baseline.chars[name].mean
+        assert summary["mean_words"] == baseline.word_counts[name].mean
+    assert result["top"]["location.province"] == baseline.top("location.province", 10)
+
+
+def test_tokens_stay_in_record_order(records):
+    corpus = ColumnarCorpus.from_records(iter(records), REPORT_FIELDS, batch_records=5)
+    vocabulary = corpus.vocabulary.values
+    position = 0
+    for record, count in zip(records, corpus.tokens_per_record.tolist()):
+        expected = [word for field in REPORT_FIELDS for value in field.values(record) for word in value.split()]
+        assert [vocabulary[code] for code in corpus.tokens[position:position + count]] == expected
+        position += count